@@ -0,0 +1,90 @@
+from alembic import op
+
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_created_at_id "
+            "ON orders (created_at, id)"
+        )
+
+    op.execute(
+        """
+        CREATE TABLE orders_partitioned (
+            id UUID NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            items JSONB NOT NULL,
+            total_price DOUBLE PRECISION NOT NULL,
+            status orderstatus NOT NULL DEFAULT 'PENDING',
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            CONSTRAINT orders_partitioned_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute(
+        "CREATE INDEX ix_orders_partitioned_user_id_created_at "
+        "ON orders_partitioned (user_id, created_at)"
+    )
+    op.execute("CREATE TABLE orders_default PARTITION OF orders_partitioned DEFAULT")
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month date := date_trunc(
+                'month', COALESCE((SELECT min(created_at) FROM orders), now())
+            )::date;
+            last_month date := (date_trunc('month', now()) + interval '3 months')::date;
+        BEGIN
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF orders_partitioned '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    'orders_p' || to_char(month, 'YYYYMM'),
+                    month,
+                    (month + interval '1 month')::date
+                );
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END $$
+        """
+    )
+
+    op.execute(
+        """
+        CREATE FUNCTION orders_sync_partitioned() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                DELETE FROM orders_partitioned
+                WHERE id = OLD.id AND created_at = OLD.created_at;
+                RETURN OLD;
+            END IF;
+            INSERT INTO orders_partitioned (id, user_id, items, total_price, status, created_at)
+            VALUES (NEW.id, NEW.user_id, NEW.items, NEW.total_price, NEW.status, NEW.created_at)
+            ON CONFLICT (id, created_at) DO UPDATE SET
+                user_id = EXCLUDED.user_id,
+                items = EXCLUDED.items,
+                total_price = EXCLUDED.total_price,
+                status = EXCLUDED.status;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER orders_sync_partitioned "
+        "AFTER INSERT OR UPDATE OR DELETE ON orders "
+        "FOR EACH ROW EXECUTE FUNCTION orders_sync_partitioned()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS orders_sync_partitioned ON orders")
+    op.execute("DROP FUNCTION IF EXISTS orders_sync_partitioned()")
+    op.execute("DROP TABLE IF EXISTS orders_partitioned")
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_orders_created_at_id")
@@ -0,0 +1,34 @@
+import sqlalchemy as sa
+from alembic import op
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+ORDER_TABLES = sa.text(
+    "SELECT relname, relkind::text FROM pg_class "
+    "WHERE relname IN ('orders', 'orders_partitioned') AND relkind IN ('r', 'p')"
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("is_admin", sa.Boolean, nullable=False, server_default=sa.false()),
+    )
+
+    tables = op.get_bind().execute(ORDER_TABLES).all()
+    for table, kind in tables:
+        index = f"ix_{table}_items_gin ON {table} USING gin (items jsonb_path_ops)"
+        if kind == "p":
+            op.execute(f"CREATE INDEX IF NOT EXISTS {index}")
+            continue
+        with op.get_context().autocommit_block():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index}")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_orders_items_gin")
+    op.execute("DROP INDEX IF EXISTS ix_orders_partitioned_items_gin")
+    op.drop_column("users", "is_admin")
@@ -0,0 +1,25 @@
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import ENUM
+
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "archived_orders",
+        sa.Column(
+            "status",
+            ENUM("PENDING", "PAID", "SHIPPED", "CANCELED", name="orderstatus", create_type=False),
+            nullable=True,
+        ),
+    )
+    op.add_column("archived_orders", sa.Column("total_price", sa.Float, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("archived_orders", "total_price")
+    op.drop_column("archived_orders", "status")
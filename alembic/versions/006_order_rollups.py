@@ -0,0 +1,21 @@
+import sqlalchemy as sa
+from alembic import op
+
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_rollups",
+        sa.Column("granularity", sa.String(10), primary_key=True),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("order_count", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("revenue", sa.Float, nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("order_rollups")
@@ -0,0 +1,42 @@
+from alembic import op
+
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+ORDER_TABLES = ("orders", "orders_partitioned", "orders_legacy")
+
+
+def upgrade() -> None:
+    # Orders are sharded by user_id and shards do not hold the users table, so
+    # the foreign key cannot be enforced there.
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            fk record;
+        BEGIN
+            FOR fk IN
+                SELECT conrelid::regclass AS table_name, conname FROM pg_constraint
+                WHERE contype = 'f'
+                  AND confrelid = 'users'::regclass
+                  AND conparentid = 0
+                  AND conrelid::regclass::text IN {ORDER_TABLES}
+            LOOP
+                EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', fk.table_name, fk.conname);
+            END LOOP;
+        END $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "ALTER TABLE orders ADD CONSTRAINT orders_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id)"
+    )
+    op.execute(
+        "ALTER TABLE IF EXISTS orders_partitioned ADD CONSTRAINT orders_partitioned_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id)"
+    )
@@ -0,0 +1,51 @@
+import sqlalchemy as sa
+from alembic import op
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "products",
+        sa.Column("id", sa.String(64), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("price_cents", sa.BigInteger, nullable=False),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True
+        ),
+        sa.CheckConstraint("price_cents > 0", name="ck_products_price_positive"),
+    )
+    # API workers keep an in-memory price index and apply these notifications
+    # instead of reloading the catalog. A null price means the product is gone.
+    op.execute(
+        """
+        CREATE FUNCTION products_notify() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' AND (TG_OP = 'DELETE' OR OLD.id <> NEW.id) THEN
+                PERFORM pg_notify(
+                    'product_changes', json_build_object('id', OLD.id, 'price_cents', NULL)::text
+                );
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM pg_notify(
+                    'product_changes',
+                    json_build_object('id', NEW.id, 'price_cents', NEW.price_cents)::text
+                );
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER products_notify AFTER INSERT OR UPDATE OR DELETE ON products "
+        "FOR EACH ROW EXECUTE FUNCTION products_notify()"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("products")
+    op.execute("DROP FUNCTION IF EXISTS products_notify()")
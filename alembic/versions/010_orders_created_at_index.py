@@ -0,0 +1,25 @@
+import sqlalchemy as sa
+from alembic import op
+
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+PARTITIONED_ORDER_TABLES = sa.text(
+    "SELECT relname FROM pg_class "
+    "WHERE relname IN ('orders', 'orders_partitioned') AND relkind = 'p'"
+)
+
+
+def upgrade() -> None:
+    # The unpartitioned table got ix_orders_created_at_id in 002; shard
+    # rebalances walk the partitioned one in (created_at, id) order too.
+    tables = op.get_bind().execute(PARTITIONED_ORDER_TABLES).scalars().all()
+    for table in tables:
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_created_at ON {table} (created_at, id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_orders_created_at")
+    op.execute("DROP INDEX IF EXISTS ix_orders_partitioned_created_at")
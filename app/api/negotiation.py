@@ -0,0 +1,150 @@
+import gzip
+import json
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+import brotli
+import msgpack
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+
+from app.core.config import get_settings
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+MSGPACK_MEDIA_TYPE = MSGPACK_TYPES[0]
+JSON_MEDIA_TYPE = "application/json"
+
+
+def parse_quality_list(header: str) -> dict[str, float]:
+    values = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        values[token.strip().lower()] = quality
+    return values
+
+
+def accepts_msgpack(accept: str) -> bool:
+    qualities = parse_quality_list(accept)
+    return any(qualities.get(media_type, 0) > 0 for media_type in MSGPACK_TYPES)
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    qualities = parse_quality_list(accept_encoding)
+    for encoding in ("br", "gzip"):
+        if qualities.get(encoding, qualities.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def json_to_msgpack(body: bytes) -> bytes:
+    return msgpack.packb(json.loads(body))
+
+
+def msgpack_to_json(body: bytes) -> bytes:
+    try:
+        return json.dumps(msgpack.unpackb(body)).encode("utf-8")
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid msgpack body") from exc
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    settings = get_settings()
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.response_brotli_quality)
+    return gzip.compress(body, compresslevel=settings.response_gzip_level)
+
+
+class DataResponse(Response):
+    # The body is rendered once the format is negotiated, so msgpack is packed
+    # from the JSON-mode data instead of from a parsed JSON body.
+    media_type = JSON_MEDIA_TYPE
+
+    def __init__(
+        self,
+        to_json: Callable[[], bytes | str],
+        to_python: Callable[[], Any],
+        status_code: int = 200,
+    ) -> None:
+        super().__init__(status_code=status_code)
+        self.to_json = to_json
+        self.to_python = to_python
+
+    def render_as(self, media_type: str) -> bytes:
+        if media_type == MSGPACK_MEDIA_TYPE:
+            return msgpack.packb(self.to_python())
+        body = self.to_json()
+        return body.encode("utf-8") if isinstance(body, str) else body
+
+
+class MsgpackRequest(Request):
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            self._body = msgpack_to_json(await super().body())
+        return self._body
+
+
+def decode_request(request: Request) -> Request:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in MSGPACK_TYPES:
+        return request
+    headers = [(name, value) for name, value in request.scope["headers"] if name != b"content-type"]
+    headers.append((b"content-type", b"application/json"))
+    return MsgpackRequest({**request.scope, "headers": headers}, request.receive)
+
+
+def encode_response(request: Request, response: Response) -> Response:
+    body = getattr(response, "body", None)
+    if body is None or response.media_type != JSON_MEDIA_TYPE:
+        return response
+    response.headers["vary"] = "Accept, Accept-Encoding"
+    media_type = response.media_type
+    if accepts_msgpack(request.headers.get("accept", "")):
+        media_type = MSGPACK_MEDIA_TYPE
+    rendered = isinstance(response, DataResponse)
+    if rendered:
+        body = response.render_as(media_type)
+    elif media_type == MSGPACK_MEDIA_TYPE:
+        # Stored responses, such as idempotent replays, only exist as JSON.
+        body = json_to_msgpack(body)
+    encoding = None
+    if len(body) >= get_settings().response_compression_min_bytes:
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is not None:
+        body = compress(body, encoding)
+    if media_type == response.media_type and encoding is None and not rendered:
+        return response
+
+    encoded = Response(
+        content=body,
+        status_code=response.status_code,
+        media_type=media_type,
+        background=response.background,
+    )
+    if encoding is not None:
+        encoded.headers["content-encoding"] = encoding
+    replaced = {b"content-length", b"content-type"}
+    encoded.raw_headers.extend(
+        (name, value) for name, value in response.raw_headers if name not in replaced
+    )
+    return encoded
+
+
+class NegotiatedRoute(APIRoute):
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            response = await handler(decode_request(request))
+            return encode_response(request, response)
+
+        return negotiated_handler
@@ -0,0 +1,49 @@
+from collections.abc import Iterable
+from datetime import datetime
+from functools import partial
+from typing import Any
+
+from fastapi import status
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+from app.api.negotiation import DataResponse
+from app.models.order import Order, OrderStatus
+from app.schemas.order import OrderRead
+
+
+class OrderRow(TypedDict):
+    id: str
+    user_id: int
+    items: list[dict[str, Any]]
+    total_price: float
+    status: OrderStatus
+    created_at: datetime
+
+
+# Rows come straight from the orders table, which only ever stores items that
+# passed OrderCreate validation, so they are encoded without another round of
+# OrderRead validation. The output matches OrderRead's JSON field for field.
+ORDER_ROWS_ADAPTER = TypeAdapter(list[OrderRow])
+
+
+def order_response(order: OrderRead, status_code: int = status.HTTP_200_OK) -> DataResponse:
+    return DataResponse(order.model_dump_json, partial(order.model_dump, mode="json"), status_code)
+
+
+def order_list_response(orders: Iterable[Order]) -> DataResponse:
+    rows = [
+        {
+            "id": order.id,
+            "user_id": order.user_id,
+            "items": order.items,
+            "total_price": order.total_price,
+            "status": order.status,
+            "created_at": order.created_at,
+        }
+        for order in orders
+    ]
+    return DataResponse(
+        partial(ORDER_ROWS_ADAPTER.dump_json, rows),
+        partial(ORDER_ROWS_ADAPTER.dump_python, rows, mode="json"),
+    )
@@ -1,5 +1,8 @@
 from app.api.routes.auth import router as auth
+from app.api.routes.debug import router as debug
 from app.api.routes.health import router as health
+from app.api.routes.metrics import router as metrics
 from app.api.routes.orders import router as orders
+from app.api.routes.stats import router as stats
 
-__all__ = ["auth", "health", "orders"]
+__all__ = ["auth", "debug", "health", "metrics", "orders", "stats"]
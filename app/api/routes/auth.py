@@ -1,9 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import time
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
+from redis.exceptions import RedisError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.config import get_settings
+from app.core.revocation import TokenRevocations, get_token_revocations
+from app.core.security import (
+    create_access_token,
+    get_current_admin,
+    get_password_hash,
+    get_token_claims,
+    verify_password,
+)
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.token import Token
@@ -52,3 +64,51 @@ async def login(
         raise HTTPException(status_code=401, detail="Incorrect email or password")
     access_token = create_access_token(str(user.id))
     return Token(access_token=access_token, token_type="bearer")
+
+
+@router.post(
+    "/logout/",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Revoke the current access token",
+    responses={
+        204: {"description": "Token revoked"},
+        400: {"description": "Token has no id and cannot be revoked"},
+        401: {"description": "Not authenticated"},
+        503: {"description": "Revocation store unavailable"},
+    },
+)
+async def logout(
+    claims: dict[str, Any] = Depends(get_token_claims),
+    revocations: TokenRevocations = Depends(get_token_revocations),
+) -> Response:
+    if not claims.get("jti"):
+        raise HTTPException(status_code=400, detail="Token cannot be revoked")
+    try:
+        await revocations.revoke_token(claims["jti"], int(claims["exp"]))
+    except RedisError as exc:
+        raise HTTPException(status_code=503, detail="Token revocation is unavailable") from exc
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post(
+    "/users/{user_id}/revoke-tokens/",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Revoke every access token issued to a user so far (admin only)",
+    responses={
+        204: {"description": "Tokens revoked"},
+        403: {"description": "Admin privileges required"},
+        503: {"description": "Revocation store unavailable"},
+    },
+)
+async def revoke_user_tokens(
+    user_id: int,
+    revocations: TokenRevocations = Depends(get_token_revocations),
+    current_admin: User = Depends(get_current_admin),
+) -> Response:
+    now = int(time.time())
+    expires_at = now + get_settings().access_token_expire_minutes * 60
+    try:
+        await revocations.revoke_user(user_id, now, expires_at)
+    except RedisError as exc:
+        raise HTTPException(status_code=503, detail="Token revocation is unavailable") from exc
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,37 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+
+from app.core.profiling import ProfileStore
+from app.core.security import get_current_admin
+from app.models.user import User
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+async def get_profile_store(request: Request) -> ProfileStore:
+    return request.app.state.profile_store
+
+
+@router.get(
+    "/profiles/{profile_id}/",
+    response_class=FileResponse,
+    summary="Get a stored request profile",
+    responses={
+        200: {"description": "Call-stack profile of a sampled request"},
+        401: {"description": "Not authenticated"},
+        403: {"description": "Admin privileges required"},
+        404: {"description": "Profile not found"},
+    },
+)
+async def get_profile(
+    profile_id: str,
+    format: Literal["html", "text"] = Query("html", description="Interactive HTML or plain text"),
+    current_admin: User = Depends(get_current_admin),
+    store: ProfileStore = Depends(get_profile_store),
+) -> FileResponse:
+    path = store.path(profile_id, ".html" if format == "html" else ".txt")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/html" if format == "html" else "text/plain")
@@ -1,43 +1,68 @@
-from fastapi import APIRouter, Depends
-from redis.asyncio import Redis
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, Response, status
 
-from app.db.session import get_db
-from app.schemas.health import HealthResponse
-from app.services.cache import get_redis
+from app.core.resilience import breakers
+from app.schemas.health import HealthResponse, LivenessResponse, ServiceHealth
+from app.services.health import OK, HealthMonitor, ProbeResult, get_health_monitor
 
 router = APIRouter(tags=["health"])
 
 
+def build_health_response(results: dict[str, ProbeResult]) -> HealthResponse:
+    checks = {
+        name: ServiceHealth(
+            status=result.status,
+            latency_ms=result.latency_ms,
+            checked_at=result.checked_at,
+        )
+        for name, result in results.items()
+    }
+    all_ok = all(result.status == OK for result in results.values())
+    return HealthResponse(
+        status="healthy" if all_ok else "degraded",
+        services={
+            name: "ok" if check.status == OK else "unavailable" for name, check in checks.items()
+        },
+        checks=checks,
+        circuit_breakers={name: breaker.state for name, breaker in breakers.items()},
+    )
+
+
 @router.get(
     "/health/",
     response_model=HealthResponse,
     summary="Health check",
     responses={
-        200: {"description": "All services are healthy"},
-        503: {"description": "One or more services are unavailable"},
+        200: {"description": "Latest cached status of every dependency"},
     },
 )
-async def health(
-    db: AsyncSession = Depends(get_db),
-    redis: Redis = Depends(get_redis),
-) -> HealthResponse:
-    checks: dict[str, str] = {}
+async def health(monitor: HealthMonitor = Depends(get_health_monitor)) -> HealthResponse:
+    return build_health_response(monitor.current())
 
-    try:
-        await db.execute(text("SELECT 1"))
-        checks["postgres"] = "ok"
-    except Exception:
-        checks["postgres"] = "unavailable"
 
-    try:
-        await redis.ping()
-        checks["redis"] = "ok"
-    except Exception:
-        checks["redis"] = "unavailable"
+@router.get(
+    "/health/live/",
+    response_model=LivenessResponse,
+    summary="Liveness probe",
+    responses={200: {"description": "The process is running"}},
+)
+async def liveness() -> LivenessResponse:
+    return LivenessResponse(status="alive")
 
-    all_ok = all(v == "ok" for v in checks.values())
-    status_text = "healthy" if all_ok else "degraded"
 
-    return HealthResponse(status=status_text, services=checks)
+@router.get(
+    "/health/ready/",
+    response_model=HealthResponse,
+    summary="Readiness probe",
+    responses={
+        200: {"description": "Postgres and Redis are healthy"},
+        503: {"description": "A dependency required to serve requests is unavailable"},
+    },
+)
+async def readiness(
+    response: Response,
+    monitor: HealthMonitor = Depends(get_health_monitor),
+) -> HealthResponse:
+    results = monitor.current()
+    if not monitor.is_ready(results):
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return build_health_response(results)
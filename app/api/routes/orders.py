@@ -1,20 +1,68 @@
 import json
+import math
+from collections.abc import Awaitable, Callable
+from datetime import datetime
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.negotiation import NegotiatedRoute
+from app.api.responses import order_list_response, order_response
 from app.core.config import get_settings
-from app.core.security import get_current_user
+from app.core.resilience import call_or_skip, redis_breaker
+from app.core.security import get_current_admin, get_current_user
 from app.db.session import get_db
-from app.messaging.producer import get_kafka_producer
+from app.messaging.producer import publish_event
 from app.models.user import User
-from app.schemas.order import OrderCreate, OrderRead, OrderUpdate
+from app.schemas.order import (
+    OrderCreate,
+    OrderRead,
+    OrderSummary,
+    OrderUpdate,
+    StoredOrderRead,
+)
 from app.services.cache import get_cached_order, get_redis, set_cached_order
-from app.services.orders import create_order, get_order, get_user_orders, update_order_status
+from app.services.catalog import (
+    CatalogUnavailable,
+    PriceCatalog,
+    PriceMismatch,
+    UnknownProducts,
+    get_price_catalog,
+)
+from app.services.idempotency import (
+    IdempotencyKeyInProgress,
+    IdempotencyKeyMismatch,
+    IdempotencyUnavailable,
+    StoredResponse,
+    begin_request,
+    complete_request,
+    release_request,
+    request_fingerprint,
+    stored_response_key,
+)
+from app.services.order_events import (
+    OrderEventHub,
+    get_order_event_hub,
+    publish_order_update,
+)
+from app.services.orders import (
+    create_order,
+    get_order,
+    get_orders_by_product,
+    get_user_orders,
+    update_order_status,
+)
+from app.services.summary import (
+    get_order_summary,
+    record_or_invalidate,
+    record_order_created,
+    record_status_change,
+)
 
-router = APIRouter(prefix="/orders", tags=["orders"])
+router = APIRouter(prefix="/orders", tags=["orders"], route_class=NegotiatedRoute)
 
 
 @router.post(
@@ -25,26 +73,164 @@ router = APIRouter(prefix="/orders", tags=["orders"])
     responses={
         201: {"description": "Order successfully created"},
         401: {"description": "Not authenticated"},
+        409: {
+            "description": "total_price does not match the catalog prices, or a request with "
+            "the same Idempotency-Key is still in progress"
+        },
+        422: {
+            "description": "Validation error, unknown product or Idempotency-Key reused with "
+            "another body"
+        },
+        503: {
+            "description": "The price catalog is not loaded, or the Idempotency-Key store "
+            "is unavailable"
+        },
     },
 )
 async def create_order_endpoint(
     order_in: OrderCreate,
+    idempotency_key: str | None = Header(
+        None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Client-generated key that makes retries of this request safe",
+    ),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     redis: Redis = Depends(get_redis),
+    catalog: PriceCatalog = Depends(get_price_catalog),
+) -> Response:
+    settings = get_settings()
+    if idempotency_key is None:
+        order_read = await create_and_publish_order(db, redis, catalog, current_user, order_in)
+        return order_response(order_read, status.HTTP_201_CREATED)
+
+    key = stored_response_key(current_user.id, idempotency_key)
+    fingerprint = request_fingerprint(order_in.model_dump_json())
+    try:
+        stored = await begin_request(
+            redis,
+            key,
+            fingerprint,
+            settings.idempotency_lock_seconds,
+            settings.idempotency_wait_seconds,
+        )
+    except IdempotencyKeyMismatch as exc:
+        raise HTTPException(
+            status_code=422, detail="Idempotency-Key was used with a different request"
+        ) from exc
+    except IdempotencyKeyInProgress as exc:
+        raise HTTPException(
+            status_code=409, detail="A request with this Idempotency-Key is in progress"
+        ) from exc
+    except IdempotencyUnavailable as exc:
+        # Creating the order without the key could duplicate it on retry.
+        raise HTTPException(
+            status_code=503,
+            detail="Idempotency-Key store is unavailable",
+            headers={"Retry-After": str(math.ceil(settings.breaker_reset_seconds))},
+        ) from exc
+    if stored is not None:
+        return Response(
+            content=stored.body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    completed = False
+
+    async def store_response(order_read: OrderRead) -> None:
+        nonlocal completed
+        response = StoredResponse(status.HTTP_201_CREATED, order_read.model_dump_json())
+        await complete_request(redis, key, fingerprint, response, settings.idempotency_ttl_seconds)
+        completed = True
+
+    try:
+        order_read = await create_and_publish_order(
+            db, redis, catalog, current_user, order_in, store_response
+        )
+    except BaseException:
+        if not completed:
+            await release_request(redis, key)
+        raise
+    return order_response(order_read, status.HTTP_201_CREATED)
+
+
+async def create_and_publish_order(
+    db: AsyncSession,
+    redis: Redis,
+    catalog: PriceCatalog,
+    current_user: User,
+    order_in: OrderCreate,
+    on_created: Callable[[OrderRead], Awaitable[None]] | None = None,
 ) -> OrderRead:
-    order = await create_order(db, current_user.id, order_in.items, order_in.total_price)
-    order_read = OrderRead.model_validate(order)
+    try:
+        order = await create_order(
+            db, current_user.id, order_in.items, order_in.total_price, catalog
+        )
+    except UnknownProducts as exc:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown products: {', '.join(exc.product_ids)}"
+        ) from exc
+    except OverflowError as exc:
+        raise HTTPException(status_code=422, detail="Order total is out of range") from exc
+    except PriceMismatch as exc:
+        raise HTTPException(
+            status_code=409,
+            detail=f"total_price does not match catalog prices, expected {exc.expected_total:.2f}",
+        ) from exc
+    except CatalogUnavailable as exc:
+        raise HTTPException(status_code=503, detail="Price catalog is not available") from exc
+    order_read = StoredOrderRead.model_validate(order)
+    if on_created is not None:
+        await on_created(order_read)
     await set_cached_order(redis, order_read)
+    await record_or_invalidate(
+        redis, order_read.user_id, lambda: record_order_created(redis, order_read)
+    )
 
     settings = get_settings()
-    producer = get_kafka_producer()
-    payload = json.dumps({"order_id": order.id}).encode("utf-8")
-    await producer.send_and_wait(settings.kafka_topic_new_order, payload)
+    payload = json.dumps(
+        {
+            "order_id": order_read.id,
+            "user_id": order_read.user_id,
+            "total_price": order_read.total_price,
+            "created_at": order_read.created_at.isoformat(),
+        }
+    ).encode("utf-8")
+    await publish_event(settings.kafka_topic_new_order, payload)
 
     return order_read
 
 
+@router.get(
+    "/events/",
+    response_class=StreamingResponse,
+    summary="Stream status updates of the current user's orders",
+    responses={
+        200: {
+            "description": "Server-Sent Events stream of order updates",
+            "content": {"text/event-stream": {}},
+        },
+        401: {"description": "Not authenticated"},
+    },
+)
+async def order_events_endpoint(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    hub: OrderEventHub = Depends(get_order_event_hub),
+) -> StreamingResponse:
+    # The session is only needed for authentication; release its connection
+    # instead of holding it for the lifetime of the stream.
+    await db.close()
+    return StreamingResponse(
+        hub.stream(current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get(
     "/{order_id}/",
     response_model=OrderRead,
@@ -61,21 +247,21 @@ async def get_order_endpoint(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     redis: Redis = Depends(get_redis),
-) -> OrderRead:
+) -> Response:
     cached = await get_cached_order(redis, str(order_id))
     if cached is not None:
         if cached.user_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not allowed")
-        return cached
+        return order_response(cached)
 
     order = await get_order(db, str(order_id))
     if order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     if order.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not allowed")
-    order_read = OrderRead.model_validate(order)
+    order_read = StoredOrderRead.model_validate(order)
     await set_cached_order(redis, order_read)
-    return order_read
+    return order_response(order_read)
 
 
 @router.patch(
@@ -95,16 +281,21 @@ async def update_order_endpoint(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     redis: Redis = Depends(get_redis),
-) -> OrderRead:
-    order = await get_order(db, str(order_id))
+) -> Response:
+    order = await get_order(db, str(order_id), include_archived=False)
     if order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     if order.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not allowed")
+    previous_status = order.status
     order = await update_order_status(db, order, order_in.status)
-    order_read = OrderRead.model_validate(order)
+    order_read = StoredOrderRead.model_validate(order)
     await set_cached_order(redis, order_read)
-    return order_read
+    await record_or_invalidate(
+        redis, order_read.user_id, lambda: record_status_change(redis, order_read, previous_status)
+    )
+    await call_or_skip(redis_breaker(), lambda: publish_order_update(redis, order_read))
+    return order_response(order_read)
 
 
 @router.get(
@@ -119,10 +310,72 @@ async def update_order_endpoint(
 )
 async def get_user_orders_endpoint(
     user_id: int,
+    created_from: datetime | None = Query(None, description="Only orders created at or after"),
+    created_to: datetime | None = Query(None, description="Only orders created before"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
-) -> list[OrderRead]:
+) -> Response:
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not allowed")
-    orders = await get_user_orders(db, user_id)
-    return [OrderRead.model_validate(order) for order in orders]
+    orders = await get_user_orders(db, user_id, created_from, created_to)
+    return order_list_response(orders)
+
+
+@router.get(
+    "/user/{user_id}/summary/",
+    response_model=OrderSummary,
+    summary="Get order count and spend per status for a user",
+    responses={
+        200: {"description": "Order summary"},
+        401: {"description": "Not authenticated"},
+        403: {"description": "Access to this user's orders is forbidden"},
+    },
+)
+async def get_user_summary_endpoint(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    redis: Redis = Depends(get_redis),
+) -> OrderSummary:
+    if current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Not allowed")
+    return await get_order_summary(db, redis, user_id)
+
+
+@router.get(
+    "/product/{product_id}/",
+    response_model=list[OrderRead],
+    summary="Get current user's orders containing a product",
+    responses={
+        200: {"description": "List of orders containing the product"},
+        401: {"description": "Not authenticated"},
+    },
+)
+async def get_product_orders_endpoint(
+    product_id: str,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of orders"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    orders = await get_orders_by_product(db, product_id, current_user.id, limit)
+    return order_list_response(orders)
+
+
+@router.get(
+    "/admin/product/{product_id}/",
+    response_model=list[OrderRead],
+    summary="Get all orders containing a product",
+    responses={
+        200: {"description": "List of orders containing the product"},
+        401: {"description": "Not authenticated"},
+        403: {"description": "Admin privileges required"},
+    },
+)
+async def get_all_product_orders_endpoint(
+    product_id: str,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of orders"),
+    db: AsyncSession = Depends(get_db),
+    current_admin: User = Depends(get_current_admin),
+) -> Response:
+    orders = await get_orders_by_product(db, product_id, limit=limit)
+    return order_list_response(orders)
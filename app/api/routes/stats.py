@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import get_current_admin
+from app.db.session import get_db
+from app.models.user import User
+from app.schemas.stats import RollupPoint
+from app.services.rollups import Granularity, as_utc, get_rollups
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+MAX_POINTS = 10_000
+BUCKET_SIZES = {
+    Granularity.MINUTE: timedelta(minutes=1),
+    Granularity.HOUR: timedelta(hours=1),
+    Granularity.DAY: timedelta(days=1),
+}
+
+
+@router.get(
+    "/orders/",
+    response_model=list[RollupPoint],
+    summary="Order volume and revenue time series",
+    responses={
+        200: {"description": "Rollup buckets in the requested range"},
+        400: {"description": "Requested range is too large for the granularity"},
+        401: {"description": "Not authenticated"},
+        403: {"description": "Admin privileges required"},
+    },
+)
+async def order_rollups_endpoint(
+    granularity: Granularity = Query(Granularity.HOUR, description="Bucket size"),
+    start: datetime | None = Query(
+        None, description="Range start, defaults to 24 hours ago; UTC if no offset is given"
+    ),
+    end: datetime | None = Query(
+        None, description="Range end, defaults to now; UTC if no offset is given"
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_admin: User = Depends(get_current_admin),
+) -> list[RollupPoint]:
+    end = as_utc(end) if end else datetime.now(timezone.utc)
+    start = as_utc(start) if start else end - timedelta(days=1)
+    if (end - start) / BUCKET_SIZES[granularity] > MAX_POINTS:
+        raise HTTPException(status_code=400, detail="Range too large for granularity")
+    rollups = await get_rollups(db, granularity, start, end)
+    return [RollupPoint.model_validate(rollup) for rollup in rollups]
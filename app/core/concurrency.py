@@ -0,0 +1,190 @@
+import asyncio
+import heapq
+import itertools
+import re
+import time
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.metrics import CONCURRENCY_LIMIT, QUEUE_WAIT, REQUESTS_SHED
+
+CRITICAL = 0
+READ = 1
+DEFAULT = 2
+WRITE = 3
+PRIORITY_NAMES = ("critical", "read", "default", "write")
+# Share of the limit each priority may fill, so writes leave headroom for
+# reads of existing orders when the limit is reached.
+PRIORITY_SHARES = (1.0, 1.0, 0.9, 0.75)
+
+EXEMPT_PREFIXES = ("/health/", "/metrics")
+STREAM_PATHS = ("/orders/events/",)
+ORDER_PATH = re.compile(r"^/orders/[0-9a-fA-F-]{32,36}/$")
+ROUTE_GROUPS = {"orders": "orders", "stats": "stats", "token": "auth", "register": "auth"}
+OTHER_GROUP = "other"
+
+
+def classify(method: str, path: str) -> tuple[str, int]:
+    if path.startswith(EXEMPT_PREFIXES) or path in STREAM_PATHS:
+        return OTHER_GROUP, CRITICAL
+    group = ROUTE_GROUPS.get(path.split("/", 2)[1], OTHER_GROUP)
+    if method not in ("GET", "HEAD", "OPTIONS"):
+        return group, WRITE
+    if ORDER_PATH.match(path):
+        return group, READ
+    return group, DEFAULT
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        group: str,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        target_latency: float,
+        max_wait: float,
+        backoff: float = 0.9,
+    ) -> None:
+        self.group = group
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.max_wait = max_wait
+        self.backoff = backoff
+        self.inflight = 0
+        self.last_decrease = 0.0
+        self.waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self.sequence = itertools.count()
+        CONCURRENCY_LIMIT.labels(group).set(self.limit)
+
+    def has_room(self, priority: int) -> bool:
+        return self.inflight < max(self.limit * PRIORITY_SHARES[priority], 1)
+
+    def try_acquire(self, priority: int) -> bool:
+        self.drop_abandoned()
+        if self.waiters and self.waiters[0][0] <= priority:
+            return False
+        if not self.has_room(priority):
+            return False
+        self.inflight += 1
+        return True
+
+    async def acquire(self, priority: int) -> float | None:
+        if self.try_acquire(priority):
+            return 0.0
+        if self.max_wait <= 0 or len(self.waiters) >= self.limit:
+            return None
+        started = time.monotonic()
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        waiter = (priority, next(self.sequence), future)
+        heapq.heappush(self.waiters, waiter)
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except TimeoutError:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+                heapq.heapify(self.waiters)
+            return None
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation.
+            if future.done() and not future.cancelled():
+                self.inflight -= 1
+                self.wake()
+            raise
+        return time.monotonic() - started
+
+    def drop_abandoned(self) -> None:
+        while self.waiters and self.waiters[0][2].done():
+            heapq.heappop(self.waiters)
+
+    def wake(self) -> None:
+        self.drop_abandoned()
+        while self.waiters and self.has_room(self.waiters[0][0]):
+            _, _, future = heapq.heappop(self.waiters)
+            self.inflight += 1
+            future.set_result(None)
+            self.drop_abandoned()
+
+    def release(self, latency: float) -> None:
+        self.inflight -= 1
+        self.update(latency)
+        self.wake()
+
+    def update(self, latency: float) -> None:
+        # AIMD: back off multiplicatively when requests get slower than the
+        # target, at most once per target interval so one burst of slow
+        # completions counts once; otherwise grow by one per limit's worth of
+        # requests while the limit is actually in use.
+        now = time.monotonic()
+        if latency > self.target_latency:
+            if now - self.last_decrease >= self.target_latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self.last_decrease = now
+                CONCURRENCY_LIMIT.labels(self.group).set(self.limit)
+        elif self.inflight + 1 >= self.limit / 2 and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            CONCURRENCY_LIMIT.labels(self.group).set(self.limit)
+
+
+class ConcurrencyLimitMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        target_latency: float,
+        max_wait: float,
+        retry_after: int,
+    ) -> None:
+        self.app = app
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.limiters: dict[str, AdaptiveLimiter] = {}
+
+    def limiter(self, group: str) -> AdaptiveLimiter:
+        limiter = self.limiters.get(group)
+        if limiter is None:
+            limiter = AdaptiveLimiter(
+                group,
+                self.initial,
+                self.min_limit,
+                self.max_limit,
+                self.target_latency,
+                self.max_wait,
+            )
+            self.limiters[group] = limiter
+        return limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        group, priority = classify(scope["method"], scope["path"])
+        if priority == CRITICAL:
+            await self.app(scope, receive, send)
+            return
+        limiter = self.limiter(group)
+        waited = await limiter.acquire(priority)
+        if waited is None:
+            REQUESTS_SHED.labels(group, PRIORITY_NAMES[priority]).inc()
+            response = JSONResponse(
+                {"detail": "Server is overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        QUEUE_WAIT.labels(group).observe(waited)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - started)
@@ -0,0 +1,228 @@
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from redis.asyncio import Redis
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+UNMATCHED_ROUTE = "unmatched"
+QUERY_STARTED_KEY = "metrics_query_started"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEPENDENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DEPENDENCY_DURATION = Histogram(
+    "dependency_call_duration_seconds",
+    "Duration of calls to Postgres, Redis and Kafka",
+    ["dependency", "operation"],
+    buckets=DEPENDENCY_BUCKETS,
+)
+DEPENDENCY_ERRORS = Counter(
+    "dependency_call_errors_total",
+    "Failed or cancelled calls to Postgres, Redis and Kafka",
+    ["dependency", "operation"],
+)
+CONCURRENCY_LIMIT = Gauge(
+    "concurrency_limit",
+    "Adaptive concurrency limit by route group",
+    ["group"],
+    multiprocess_mode="livesum",
+)
+REQUESTS_SHED = Counter(
+    "http_requests_shed_total", "Requests rejected with 503 under overload", ["group", "priority"]
+)
+QUEUE_WAIT = Histogram(
+    "http_request_queue_wait_seconds",
+    "Time admitted requests waited for a concurrency slot",
+    ["group"],
+    buckets=DEPENDENCY_BUCKETS,
+)
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+    ["breaker"],
+    multiprocess_mode="livemax",
+)
+TOKEN_REVOCATION_CHECKS = Counter(
+    "token_revocation_checks_total",
+    "Access token revocation checks by outcome; only filter hits reach Redis",
+    ["result"],
+)
+TOKEN_REVOCATION_SYNCED = Gauge(
+    "token_revocation_last_sync_timestamp_seconds",
+    "When the local revocation filter was last synced from Redis",
+    multiprocess_mode="livemin",
+)
+TOKEN_REVOCATION_ENTRIES = Gauge(
+    "token_revocation_filter_entries",
+    "Revocations in the local filter",
+    multiprocess_mode="livemax",
+)
+TOKEN_REVOCATION_FALSE_POSITIVE_RATE = Gauge(
+    "token_revocation_filter_false_positive_rate",
+    "Expected false positive rate of the local revocation filter",
+    multiprocess_mode="livemax",
+)
+PRICE_CATALOG_PRODUCTS = Gauge(
+    "price_catalog_products",
+    "Products in the in-process price index",
+    multiprocess_mode="livemax",
+)
+ORDER_PRICING = Counter(
+    "order_pricing_checks_total", "Server-side repricing of new orders by outcome", ["result"]
+)
+CACHE_REQUESTS = Counter("order_cache_requests_total", "Order cache lookups", ["result"])
+CONSUMER_MESSAGES = Counter(
+    "kafka_consumer_messages_total", "Messages handled by the Kafka consumer", ["topic"]
+)
+TASKS = Counter("celery_tasks_total", "Finished Celery tasks", ["task", "state"])
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds", "Celery task run time", ["task"], buckets=LATENCY_BUCKETS
+)
+
+
+@contextmanager
+def observe(dependency: str, operation: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        DEPENDENCY_ERRORS.labels(dependency, operation).inc()
+        raise
+    finally:
+        DEPENDENCY_DURATION.labels(dependency, operation).observe(time.perf_counter() - started)
+
+
+def statement_kind(statement: str) -> str:
+    words = statement.split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        conn.info.setdefault(QUERY_STARTED_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        started = conn.info[QUERY_STARTED_KEY].pop()
+        DEPENDENCY_DURATION.labels("postgres", statement_kind(statement)).observe(
+            time.perf_counter() - started
+        )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def on_error(context: Any) -> None:
+        conn = context.connection
+        if conn is None or not conn.info.get(QUERY_STARTED_KEY):
+            return
+        operation = statement_kind(context.statement or "")
+        started = conn.info[QUERY_STARTED_KEY].pop()
+        DEPENDENCY_DURATION.labels("postgres", operation).observe(time.perf_counter() - started)
+        DEPENDENCY_ERRORS.labels("postgres", operation).inc()
+
+
+def instrument_redis(redis: Redis) -> Redis:
+    execute_command = redis.execute_command
+
+    async def timed_execute_command(*args: Any, **options: Any) -> Any:
+        with observe("redis", str(args[0]).upper()):
+            return await execute_command(*args, **options)
+
+    redis.execute_command = timed_execute_command
+    return redis
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            # Label by route template rather than raw path to keep cardinality bounded.
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            REQUEST_DURATION.labels(method, route, str(status_code)).observe(
+                time.perf_counter() - started
+            )
+
+
+def is_multiprocess() -> bool:
+    return MULTIPROC_ENV in os.environ
+
+
+def prepare_multiprocess_dir() -> None:
+    if not is_multiprocess():
+        return
+    directory = Path(os.environ[MULTIPROC_ENV])
+    directory.mkdir(parents=True, exist_ok=True)
+    for stale in directory.glob("*.db"):
+        stale.unlink()
+
+
+def mark_process_dead(pid: int) -> None:
+    if is_multiprocess():
+        multiprocess.mark_process_dead(pid)
+
+
+def metrics_registry() -> CollectorRegistry:
+    if not is_multiprocess():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics() -> bytes:
+    return generate_latest(metrics_registry())
+
+
+def start_metrics_server(port: int) -> None:
+    if port:
+        start_http_server(port, registry=metrics_registry())
@@ -0,0 +1,103 @@
+import asyncio
+import hmac
+import logging
+import random
+import re
+import uuid
+from pathlib import Path
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ProfileStore:
+    def __init__(self, directory: str, max_profiles: int) -> None:
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+
+    def path(self, profile_id: str, suffix: str) -> Path | None:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}{suffix}"
+        return path if path.exists() else None
+
+    def save(self, profile_id: str, text: str, html: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{profile_id}.txt").write_text(text)
+        (self.directory / f"{profile_id}.html").write_text(html)
+        self.prune()
+
+    def prune(self) -> None:
+        profiles = sorted(self.directory.glob("*.txt"), key=lambda path: path.stat().st_mtime)
+        for stale in profiles[: max(len(profiles) - self.max_profiles, 0)]:
+            stale.unlink(missing_ok=True)
+            stale.with_suffix(".html").unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        sample_rate: float,
+        token: str,
+        interval: float,
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.token = token.encode()
+        self.interval = interval
+
+    def should_profile(self, scope: Scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if not self.token:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", []), (PROFILE_ID_HEADER, profile_id.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        # async_mode keeps samples to this request's task, so concurrent
+        # requests on the same event loop do not leak into the profile.
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            text = profiler.output_text(unicode=True, show_all=False)
+            html = profiler.output_html()
+            try:
+                await asyncio.to_thread(self.store.save, profile_id, text, html)
+            except OSError:
+                logger.warning("Could not store profile %s", profile_id, exc_info=True)
+            else:
+                logger.info(
+                    "Profiled %s %s as %s in %.1f ms",
+                    scope["method"],
+                    scope["path"],
+                    profile_id,
+                    profiler.last_session.duration * 1000,
+                )
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from app.core.config import get_settings
+from app.core.metrics import CIRCUIT_BREAKER_STATE
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_timeout: float,
+        call_timeout: float,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.call_timeout = call_timeout
+        self.reset()
+
+    def set_state(self, state: str) -> None:
+        self.state = state
+        CIRCUIT_BREAKER_STATE.labels(self.name).set(STATE_VALUES[state])
+
+    def reset(self) -> None:
+        self.set_state(CLOSED)
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.set_state(HALF_OPEN)
+        if self.state == HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    # Calls that started before the circuit opened can finish while it is
+    # open or half-open; only the trial call may close or reopen it then.
+    def record_success(self, trial: bool = False) -> None:
+        if self.state == CLOSED:
+            self.failures = 0
+        elif trial:
+            logger.info("Circuit %s closed", self.name)
+            self.reset()
+
+    def record_failure(self, trial: bool = False) -> None:
+        if self.state != CLOSED and not trial:
+            return
+        self.failures += 1
+        if trial or self.failures >= self.failure_threshold:
+            logger.warning("Circuit %s opened after %s failures", self.name, self.failures)
+            self.set_state(OPEN)
+            self.opened_at = time.monotonic()
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        trial = self.state == HALF_OPEN
+        try:
+            result = await asyncio.wait_for(func(), timeout=self.call_timeout)
+        except Exception:
+            self.record_failure(trial)
+            raise
+        finally:
+            if trial:
+                self.trial_in_flight = False
+        self.record_success(trial)
+        return result
+
+
+breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, call_timeout: float) -> CircuitBreaker:
+    breaker = breakers.get(name)
+    if breaker is None:
+        settings = get_settings()
+        breaker = CircuitBreaker(
+            name, settings.breaker_failure_threshold, settings.breaker_reset_seconds, call_timeout
+        )
+        breakers[name] = breaker
+    return breaker
+
+
+def redis_breaker() -> CircuitBreaker:
+    return get_breaker("redis", get_settings().cache_timeout_seconds)
+
+
+def kafka_breaker() -> CircuitBreaker:
+    return get_breaker("kafka", get_settings().kafka_publish_timeout_seconds)
+
+
+async def call_or_skip(
+    breaker: CircuitBreaker, func: Callable[[], Awaitable[T]], default: T | None = None
+) -> T | None:
+    try:
+        return await breaker.call(func)
+    except CircuitOpenError:
+        return default
+    except Exception:
+        logger.warning("Call through circuit %s failed", breaker.name, exc_info=True)
+        return default
@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections.abc import Iterator
+from typing import Any
+
+from fastapi import Request
+from redis.asyncio import Redis
+
+from app.core.metrics import (
+    TOKEN_REVOCATION_CHECKS,
+    TOKEN_REVOCATION_ENTRIES,
+    TOKEN_REVOCATION_FALSE_POSITIVE_RATE,
+    TOKEN_REVOCATION_SYNCED,
+)
+from app.core.resilience import call_or_skip, redis_breaker
+
+logger = logging.getLogger(__name__)
+
+INDEX_KEY = "revoked_tokens"
+VERSION_KEY = "revoked_tokens:version"
+TOKEN_PREFIX = "revoked_token:"
+USER_PREFIX = "revoked_user:"
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & 1 << (position & 7) for position in self.positions(item)
+        )
+
+    @property
+    def false_positive_rate(self) -> float:
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+def token_key(jti: str) -> str:
+    return f"{TOKEN_PREFIX}{jti}"
+
+
+def user_key(user_id: int | str) -> str:
+    return f"{USER_PREFIX}{user_id}"
+
+
+# Revoked tokens and users are kept in Redis until the tokens they cover
+# expire. Each process mirrors the key names into a Bloom filter, so a token
+# that was never revoked is accepted without a Redis call; only filter hits
+# are confirmed against Redis.
+class TokenRevocations:
+    def __init__(self, redis: Redis, capacity: int, error_rate: float) -> None:
+        self.redis = redis
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.filter = BloomFilter(capacity, error_rate)
+        self.version: str | None = None
+        self.synced_at = 0.0
+
+    async def revoke(self, key: str, value: str, expires_at: int) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(key, value, exat=expires_at)
+            pipe.zadd(INDEX_KEY, {key: expires_at})
+            pipe.incr(VERSION_KEY)
+            await pipe.execute()
+        self.filter.add(key)
+
+    async def revoke_token(self, jti: str, expires_at: int) -> None:
+        await self.revoke(token_key(jti), "1", expires_at)
+
+    async def revoke_user(self, user_id: int, issued_before: int, expires_at: int) -> None:
+        await self.revoke(user_key(user_id), str(issued_before), expires_at)
+
+    async def is_revoked(self, claims: dict[str, Any]) -> bool:
+        keys = []
+        if claims.get("jti"):
+            keys.append(token_key(claims["jti"]))
+        if claims.get("sub"):
+            keys.append(user_key(claims["sub"]))
+        hits = [key for key in keys if key in self.filter]
+        if not hits:
+            TOKEN_REVOCATION_CHECKS.labels("clear").inc()
+            return False
+        values = await call_or_skip(redis_breaker(), lambda: self.redis.mget(hits))
+        if values is None:
+            # Fail closed: the filter says the token may be revoked.
+            TOKEN_REVOCATION_CHECKS.labels("unavailable").inc()
+            return True
+        for key, value in zip(hits, values, strict=True):
+            if value is None:
+                continue
+            if key.startswith(TOKEN_PREFIX) or int(claims.get("iat", 0)) <= int(value):
+                TOKEN_REVOCATION_CHECKS.labels("revoked").inc()
+                return True
+        result = "false_positive" if all(value is None for value in values) else "valid"
+        TOKEN_REVOCATION_CHECKS.labels(result).inc()
+        return False
+
+    async def sync(self) -> None:
+        version = await self.redis.get(VERSION_KEY)
+        if not self.synced_at or version != self.version:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zremrangebyscore(INDEX_KEY, "-inf", time.time())
+                pipe.zrange(INDEX_KEY, 0, -1)
+                _, keys = await pipe.execute()
+            # Room for revocations made locally before the next sync.
+            bloom = BloomFilter(max(self.capacity, 2 * len(keys)), self.error_rate)
+            for key in keys:
+                bloom.add(key)
+            self.filter = bloom
+            self.version = version
+        self.synced_at = time.time()
+        TOKEN_REVOCATION_SYNCED.set(self.synced_at)
+        TOKEN_REVOCATION_ENTRIES.set(self.filter.count)
+        TOKEN_REVOCATION_FALSE_POSITIVE_RATE.set(self.filter.false_positive_rate)
+
+    async def run(self, interval: float) -> None:
+        while True:
+            try:
+                await self.sync()
+            except Exception:
+                logger.warning("Token revocation sync failed", exc_info=True)
+            await asyncio.sleep(interval)
+
+
+async def get_token_revocations(request: Request) -> TokenRevocations:
+    return request.app.state.token_revocations
@@ -1,4 +1,6 @@
 from datetime import datetime, timedelta, timezone
+from typing import Any
+from uuid import uuid4
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -8,6 +10,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
+from app.core.revocation import TokenRevocations, get_token_revocations
 from app.db.session import get_db
 from app.models.user import User
 
@@ -25,33 +28,47 @@ def get_password_hash(password: str) -> str:
 
 def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
     settings = get_settings()
-    expire = datetime.now(timezone.utc) + (
-        expires_delta or timedelta(minutes=settings.access_token_expire_minutes)
-    )
-    to_encode = {"exp": expire, "sub": subject}
+    now = datetime.now(timezone.utc)
+    expire = now + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
+    to_encode = {"exp": expire, "iat": now, "jti": uuid4().hex, "sub": subject}
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> User:
-    settings = get_settings()
-    credentials_exception = HTTPException(
+def credentials_error() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid authentication credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def get_token_claims(
+    token: str = Depends(oauth2_scheme),
+    revocations: TokenRevocations = Depends(get_token_revocations),
+) -> dict[str, Any]:
+    settings = get_settings()
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        subject: str | None = payload.get("sub")
-        if subject is None:
-            raise credentials_exception
     except JWTError as exc:
-        raise credentials_exception from exc
+        raise credentials_error() from exc
+    if payload.get("sub") is None or await revocations.is_revoked(payload):
+        raise credentials_error()
+    return payload
 
-    result = await db.execute(select(User).where(User.id == int(subject)))
+
+async def get_current_user(
+    claims: dict[str, Any] = Depends(get_token_claims),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    result = await db.execute(select(User).where(User.id == int(claims["sub"])))
     user = result.scalar_one_or_none()
     if user is None:
-        raise credentials_exception
+        raise credentials_error()
+    db.info["user_id"] = user.id
     return user
+
+
+async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return current_user
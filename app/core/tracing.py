@@ -0,0 +1,376 @@
+import fcntl
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from redis.asyncio import Redis
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = "traceparent"
+SPANS_KEY = "tracing_spans"
+MAX_STATEMENT_LENGTH = 1000
+# Batches waiting for the writer thread; further batches are dropped so a
+# stalled disk never holds spans in memory without bound.
+MAX_QUEUED_BATCHES = 1000
+
+# OTLP span kinds
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+PRODUCER = 4
+CONSUMER = 5
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: str | bytes | None) -> SpanContext | None:
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode("latin-1")
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    version, trace_id, span_id, flags = parts
+    try:
+        int(trace_id, 16), int(span_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if version == "ff" or not int(trace_id, 16) or not int(span_id, 16):
+        return None
+    return SpanContext(trace_id, span_id, sampled)
+
+
+def otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    __slots__ = ("name", "kind", "context", "parent_id", "entry", "attributes", "start", "error")
+
+    def __init__(
+        self,
+        name: str,
+        kind: int,
+        context: SpanContext,
+        parent_id: str | None,
+        entry: bool,
+        attributes: dict[str, Any] | None,
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.context = context
+        self.parent_id = parent_id
+        # Entry spans start local work for a trace (HTTP request, message,
+        # task); the exporter flushes when one of them ends.
+        self.entry = entry
+        self.attributes = dict(attributes or {})
+        self.start = time.time_ns()
+        self.error: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def to_otlp(self, end: int) -> dict[str, Any]:
+        span: dict[str, Any] = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(end),
+            "attributes": [
+                {"key": key, "value": otlp_value(value)} for key, value in self.attributes.items()
+            ],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error is not None:
+            span["status"] = {"code": 2, "message": self.error}
+        return span
+
+
+# Spans are written as OTLP/JSON lines, the format read by the OpenTelemetry
+# Collector's otlpjsonfile receiver. Several processes may append to one file.
+# Files are written by a background thread, so ending a span on the event loop
+# never waits for the disk or for another process's lock on the file.
+class FileSpanExporter:
+    def __init__(self, path: str, service_name: str, batch_size: int) -> None:
+        self.path = Path(path)
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.pending: list[dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self.batches: queue.Queue[list[dict[str, Any]]] = queue.Queue(MAX_QUEUED_BATCHES)
+        self.writer = threading.Thread(target=self.run, name="span-exporter", daemon=True)
+        self.writer.start()
+
+    def export(self, span: dict[str, Any], flush: bool) -> None:
+        with self.lock:
+            self.pending.append(span)
+            if not flush and len(self.pending) < self.batch_size:
+                return
+            spans, self.pending = self.pending, []
+        self.enqueue(spans)
+
+    def enqueue(self, spans: list[dict[str, Any]]) -> None:
+        try:
+            self.batches.put_nowait(spans)
+        except queue.Full:
+            logger.warning("Span export queue is full, dropping %s spans", len(spans))
+
+    def flush(self) -> None:
+        # Blocks until everything exported so far is on disk; used at shutdown.
+        with self.lock:
+            spans, self.pending = self.pending, []
+        if spans:
+            self.enqueue(spans)
+        self.batches.join()
+
+    def run(self) -> None:
+        while True:
+            spans = self.batches.get()
+            try:
+                self.write(spans)
+            except Exception:
+                logger.exception("Could not export %s spans", len(spans))
+            finally:
+                self.batches.task_done()
+
+    def write(self, spans: list[dict[str, Any]]) -> None:
+        line = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                {"key": "service.name", "value": otlp_value(self.service_name)}
+                            ]
+                        },
+                        "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": spans}],
+                    }
+                ]
+            }
+        )
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as file:
+                fcntl.flock(file, fcntl.LOCK_EX)
+                file.write(line + "\n")
+        except OSError:
+            logger.warning("Could not export %s spans", len(spans), exc_info=True)
+
+
+class Tracer:
+    def __init__(self, exporter: FileSpanExporter, sample_rate: float) -> None:
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def start(
+        self,
+        name: str,
+        kind: int,
+        parent: SpanContext | None,
+        attributes: dict[str, Any] | None,
+    ) -> Span:
+        local_parent = current_span.get()
+        if parent is None and local_parent is not None:
+            parent = local_parent.context
+        if parent is None:
+            context = SpanContext(
+                os.urandom(16).hex(), os.urandom(8).hex(), random.random() < self.sample_rate
+            )
+            return Span(name, kind, context, None, True, attributes)
+        context = SpanContext(parent.trace_id, os.urandom(8).hex(), parent.sampled)
+        entry = local_parent is None or local_parent.context is not parent
+        return Span(name, kind, context, parent.span_id, entry, attributes)
+
+    def end(self, span: Span) -> None:
+        if span.context.sampled:
+            self.exporter.export(span.to_otlp(time.time_ns()), flush=span.entry)
+
+
+tracer: Tracer | None = None
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def configure_tracing(service_name: str) -> None:
+    global tracer
+    settings = get_settings()
+    if not settings.trace_export_path:
+        return
+    exporter = FileSpanExporter(
+        settings.trace_export_path, service_name, settings.trace_export_batch_size
+    )
+    tracer = Tracer(exporter, settings.trace_sample_rate)
+
+
+def shutdown_tracing() -> None:
+    global tracer
+    if tracer is not None:
+        tracer.exporter.flush()
+    tracer = None
+
+
+def begin_span(
+    name: str,
+    kind: int = INTERNAL,
+    parent: SpanContext | None = None,
+    attributes: dict[str, Any] | None = None,
+) -> tuple[Span, Token] | None:
+    if tracer is None:
+        return None
+    span = tracer.start(name, kind, parent, attributes)
+    return span, current_span.set(span)
+
+
+def finish_span(started: tuple[Span, Token] | None, exc: BaseException | None = None) -> None:
+    if started is None:
+        return
+    span, token = started
+    if exc is not None:
+        span.record_error(exc)
+    current_span.reset(token)
+    if tracer is not None:
+        tracer.end(span)
+
+
+@contextmanager
+def start_span(
+    name: str,
+    kind: int = INTERNAL,
+    parent: SpanContext | None = None,
+    attributes: dict[str, Any] | None = None,
+) -> Iterator[Span | None]:
+    started = begin_span(name, kind, parent, attributes)
+    try:
+        yield started[0] if started else None
+    except BaseException as exc:
+        finish_span(started, exc)
+        raise
+    finish_span(started)
+
+
+def current_traceparent() -> str | None:
+    span = current_span.get()
+    return span.context.traceparent if span is not None else None
+
+
+def trace_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        if tracer is None:
+            return
+        operation = statement.split(None, 1)[0].upper() if statement.strip() else "EMPTY"
+        span = tracer.start(
+            f"postgres {operation}",
+            CLIENT,
+            None,
+            {
+                "db.system": "postgresql",
+                "db.operation": operation,
+                "db.statement": statement[:MAX_STATEMENT_LENGTH],
+            },
+        )
+        conn.info.setdefault(SPANS_KEY, []).append(span)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_execute(conn: Any, *args: Any) -> None:
+        spans = conn.info.get(SPANS_KEY)
+        if spans and tracer is not None:
+            tracer.end(spans.pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def on_error(context: Any) -> None:
+        conn = context.connection
+        spans = conn.info.get(SPANS_KEY) if conn is not None else None
+        if spans and tracer is not None:
+            span = spans.pop()
+            span.record_error(context.original_exception)
+            tracer.end(span)
+
+
+def trace_redis(redis: Redis) -> Redis:
+    execute_command = redis.execute_command
+
+    async def traced_execute_command(*args: Any, **options: Any) -> Any:
+        if tracer is None:
+            return await execute_command(*args, **options)
+        command = str(args[0]).upper()
+        attributes = {"db.system": "redis", "db.operation": command}
+        with start_span(f"redis {command}", CLIENT, attributes=attributes):
+            return await execute_command(*args, **options)
+
+    redis.execute_command = traced_execute_command
+    return redis
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or tracer is None:
+            await self.app(scope, receive, send)
+            return
+        parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parent = parse_traceparent(value)
+                break
+        method = scope["method"]
+        with start_span(
+            method, SERVER, parent, {"http.request.method": method, "url.path": scope["path"]}
+        ) as span:
+
+            async def send_with_status(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.error = f"HTTP {message['status']}"
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route is not None:
+                    span.name = f"{method} {route}"
+                    span.set_attribute("http.route", route)
@@ -0,0 +1,496 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from collections.abc import Iterator
+from contextlib import AsyncExitStack
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+
+from pydantic import (
+    AwareDatetime,
+    BaseModel,
+    Field,
+    TypeAdapter,
+    ValidationError,
+    field_validator,
+    model_validator,
+)
+from redis.asyncio import Redis, from_url
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import get_settings
+from app.db.partitions import create_partition, find_partitioned_parent, month_start
+from app.db.session import AsyncSessionLocal
+from app.db.sharding import ShardMap, create_shard_engines, get_shard_map
+from app.models.order import (
+    ORDER_ID_CLOCK_SKEW,
+    OrderStatus,
+    new_order_id,
+    order_id_timestamp,
+    user_bucket,
+)
+from app.schemas.order import OrderItem
+from app.services.rollups import RollupAggregator
+from app.services.summary import invalidate_summaries
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("id", "user_id", "items", "total_price", "status", "created_at")
+STAGING_TABLE = "orders_import"
+FORMATS = ("csv", "ndjson")
+
+CREATE_STAGING = text(f"CREATE TEMP TABLE {STAGING_TABLE} (LIKE orders INCLUDING DEFAULTS)")
+CLEAR_STAGING = text(f"TRUNCATE {STAGING_TABLE}")
+# Rows that already exist (a chunk replayed after a crash) are skipped instead
+# of failing the whole chunk. Orders of unknown users are dropped before the
+# COPY, since the users table only lives on the main database.
+INSERT_STAGED = text(
+    f"""
+    INSERT INTO orders ({", ".join(COLUMNS)})
+    SELECT {", ".join(COLUMNS)} FROM {STAGING_TABLE}
+    ON CONFLICT DO NOTHING
+    RETURNING user_id, created_at, total_price
+    """
+)
+KNOWN_USERS = text("SELECT id FROM users WHERE id = ANY(:ids)")
+FIRST_CREATED_AT = text("SELECT min(created_at) FROM orders")
+
+EXPORT_CSV = (
+    "SELECT id, user_id, items, total_price, status, to_jsonb(created_at) #>> '{}' "
+    "FROM orders WHERE created_at >= $1 AND created_at < $2 ORDER BY created_at, id"
+)
+EXPORT_NDJSON = (
+    "SELECT jsonb_build_object('id', id, 'user_id', user_id, 'items', items, "
+    "'total_price', total_price, 'status', status, 'created_at', created_at)::text "
+    "FROM orders WHERE created_at >= $1 AND created_at < $2 ORDER BY created_at, id"
+)
+
+
+class ImportedOrder(BaseModel):
+    id: UUID | None = None
+    user_id: int = Field(gt=0)
+    items: list[OrderItem] = Field(min_length=1)
+    total_price: float = Field(gt=0)
+    status: OrderStatus = OrderStatus.PENDING
+    created_at: AwareDatetime | None = None
+
+    @field_validator("items", mode="before")
+    @classmethod
+    def parse_items(cls, value: Any) -> Any:
+        return json.loads(value) if isinstance(value, str) else value
+
+    @model_validator(mode="after")
+    def check_id_time(self) -> "ImportedOrder":
+        # Lookups by a UUIDv7 id only search near the time it encodes.
+        encoded = order_id_timestamp(str(self.id)) if self.id else None
+        created_at = self.created_at or datetime.now(timezone.utc)
+        if encoded is not None and abs(encoded - created_at) > ORDER_ID_CLOCK_SKEW:
+            raise ValueError("id is a UUIDv7 whose timestamp does not match created_at")
+        return self
+
+
+imported_orders = TypeAdapter(list[ImportedOrder])
+
+
+@dataclass
+class ImportCheckpoint:
+    source: str
+    # Creation time of records without created_at; kept so replays reuse it.
+    started_at: str | None = None
+    records: int = 0
+    imported: int = 0
+    skipped: int = 0
+    rejected: int = 0
+
+
+@dataclass
+class ExportCheckpoint:
+    target: str
+    position: str | None = None
+    offset: int = 0
+    exported: int = 0
+
+
+@dataclass
+class Rejected:
+    record: int
+    error: str
+    data: Any = None
+
+
+def detect_format(path: Path, requested: str | None) -> str:
+    if requested:
+        return requested
+    return "csv" if path.suffix.lower() == ".csv" else "ndjson"
+
+
+def load_checkpoint(path: Path, cls: type, key: str, value: str, restart: bool) -> Any:
+    if not restart and path.exists():
+        data = json.loads(path.read_text())
+        if data.get(key) == value:
+            return cls(**data)
+        logger.warning("Ignoring checkpoint %s written for %s", path, data.get(key))
+    return cls(**{key: value})
+
+
+def save_checkpoint(path: Path, checkpoint: Any) -> None:
+    temporary = path.with_name(path.name + ".tmp")
+    temporary.write_text(json.dumps(asdict(checkpoint)))
+    os.replace(temporary, path)
+
+
+def read_records(path: Path, fmt: str) -> Iterator[Any]:
+    with open(path, newline="") as file:
+        if fmt == "csv":
+            for row in csv.DictReader(file):
+                yield {key: value for key, value in row.items() if value not in ("", None)}
+            return
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield line.rstrip("\n")
+
+
+def validate_chunk(
+    chunk: list[Any], first_record: int
+) -> tuple[list[tuple[int, ImportedOrder]], list[Rejected]]:
+    try:
+        orders = imported_orders.validate_python(chunk)
+        return list(enumerate(orders, start=first_record)), []
+    except ValidationError as exc:
+        errors: dict[int, list[str]] = {}
+        for error in exc.errors(include_url=False, include_input=False):
+            location = error["loc"]
+            field_name = ".".join(str(part) for part in location[1:]) or "record"
+            errors.setdefault(location[0], []).append(f"{field_name}: {error['msg']}")
+    rejected = [
+        Rejected(first_record + index, "; ".join(messages), chunk[index])
+        for index, messages in sorted(errors.items())
+    ]
+    numbers = [first_record + index for index in range(len(chunk)) if index not in errors]
+    orders = imported_orders.validate_python([chunk[number - first_record] for number in numbers])
+    return list(zip(numbers, orders, strict=True)), rejected
+
+
+def to_row(order: ImportedOrder, now: datetime, key: str) -> tuple:
+    # Records without an id get one derived from their place in the source,
+    # so a chunk replayed after a crash hits ON CONFLICT instead of inserting
+    # the same orders again.
+    created_at = order.created_at or now
+    return (
+        str(order.id) if order.id else new_order_id(created_at, user_bucket(order.user_id), key),
+        order.user_id,
+        json.dumps([item.model_dump() for item in order.items]),
+        order.total_price,
+        order.status.value,
+        created_at,
+    )
+
+
+def chunk_rows(
+    chunk: list[Any], checkpoint: ImportCheckpoint
+) -> tuple[list[tuple], list[Rejected]]:
+    orders, rejected = validate_chunk(chunk, checkpoint.records + 1)
+    now = datetime.fromisoformat(checkpoint.started_at)
+    rows = [to_row(order, now, f"{checkpoint.source}#{number}") for number, order in orders]
+    return rows, rejected
+
+
+class OrderImporter:
+    def __init__(self, conn: AsyncConnection) -> None:
+        self.conn = conn
+        self.parent: str | None = None
+        self.months: set[date] = set()
+
+    async def prepare(self) -> None:
+        self.parent = await find_partitioned_parent(self.conn)
+        await self.conn.execute(CREATE_STAGING)
+        await self.conn.commit()
+
+    async def ensure_partitions(self, rows: list[tuple]) -> None:
+        for month in {month_start(row[5].astimezone(timezone.utc).date()) for row in rows}:
+            if month not in self.months:
+                await create_partition(self.conn, self.parent, month)
+                self.months.add(month)
+
+    async def copy(self, rows: list[tuple]) -> list[tuple]:
+        # The TRUNCATE opens the transaction that the COPY on the raw
+        # asyncpg connection then joins.
+        await self.conn.execute(CLEAR_STAGING)
+        await self.ensure_partitions(rows)
+        raw = await self.conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            STAGING_TABLE, records=rows, columns=COLUMNS
+        )
+        inserted = [tuple(row) for row in await self.conn.execute(INSERT_STAGED)]
+        await self.conn.commit()
+        return inserted
+
+    async def known_users(self, user_ids: set[int]) -> set[int]:
+        result = await self.conn.execute(KNOWN_USERS, {"ids": list(user_ids)})
+        await self.conn.commit()
+        return set(result.scalars())
+
+
+def group_by_shard(
+    rows: list[tuple], known_users: set[int], shard_map: ShardMap
+) -> dict[int, list[tuple]]:
+    groups: dict[int, list[tuple]] = {}
+    for row in rows:
+        if row[1] in known_users:
+            groups.setdefault(shard_map.shard_for_user(row[1]), []).append(row)
+    return groups
+
+
+async def import_rows(
+    importers: list[OrderImporter], shard_map: ShardMap, rows: list[tuple]
+) -> list[tuple]:
+    # Each shard commits its part on its own; a chunk replayed after a crash
+    # skips the rows that already made it.
+    known_users = await importers[0].known_users({row[1] for row in rows})
+    inserted = []
+    for shard, group in group_by_shard(rows, known_users, shard_map).items():
+        inserted += await importers[shard].copy(group)
+    return inserted
+
+
+async def apply_imported(redis: Redis, inserted: list[tuple]) -> None:
+    # Imported orders bypass create_order: their rollup counts are added the
+    # way the consumer adds new orders, and the users' cached summaries are
+    # dropped so the next read rebuilds them from the database.
+    rollups = RollupAggregator()
+    for _, created_at, total_price in inserted:
+        rollups.add(created_at, total_price)
+    async with AsyncSessionLocal() as db:
+        await rollups.flush(db)
+    await invalidate_summaries(redis, {user_id for user_id, _, _ in inserted})
+
+
+def write_rejects(path: Path, rejected: list[Rejected]) -> None:
+    with open(path, "a") as file:
+        for reject in rejected:
+            file.write(json.dumps(asdict(reject), default=str) + "\n")
+
+
+async def import_orders(
+    source: Path,
+    fmt: str,
+    chunk_size: int,
+    checkpoint_path: Path,
+    rejects_path: Path,
+    restart: bool = False,
+) -> ImportCheckpoint:
+    checkpoint = load_checkpoint(
+        checkpoint_path, ImportCheckpoint, "source", str(source.resolve()), restart
+    )
+    if checkpoint.records:
+        logger.info("Resuming import of %s after record %s", source, checkpoint.records)
+    if checkpoint.started_at is None:
+        checkpoint.started_at = datetime.now(timezone.utc).isoformat()
+        save_checkpoint(checkpoint_path, checkpoint)
+    shard_map = get_shard_map()
+    engines = create_shard_engines()
+    redis = from_url(get_settings().redis_url, encoding="utf-8", decode_responses=True)
+    started = time.monotonic()
+    done = 0
+    try:
+        async with AsyncExitStack() as stack:
+            importers = []
+            for engine in engines:
+                importer = OrderImporter(await stack.enter_async_context(engine.connect()))
+                await importer.prepare()
+                importers.append(importer)
+            records = read_records(source, fmt)
+            for _ in islice(records, checkpoint.records):
+                pass
+            while chunk := list(islice(records, chunk_size)):
+                rows, rejected = chunk_rows(chunk, checkpoint)
+                inserted = await import_rows(importers, shard_map, rows) if rows else []
+                if inserted:
+                    await apply_imported(redis, inserted)
+                if rejected:
+                    write_rejects(rejects_path, rejected)
+                checkpoint.records += len(chunk)
+                checkpoint.imported += len(inserted)
+                checkpoint.skipped += len(rows) - len(inserted)
+                checkpoint.rejected += len(rejected)
+                save_checkpoint(checkpoint_path, checkpoint)
+                done += len(chunk)
+                elapsed = time.monotonic() - started
+                logger.info(
+                    "Read %s records: %s imported, %s skipped, %s rejected (%.0f records/s)",
+                    checkpoint.records,
+                    checkpoint.imported,
+                    checkpoint.skipped,
+                    checkpoint.rejected,
+                    done / elapsed if elapsed else 0,
+                )
+    finally:
+        await redis.close()
+        for engine in engines:
+            await engine.dispose()
+    return checkpoint
+
+
+def export_windows(since: datetime, until: datetime, window: timedelta) -> Iterator[tuple]:
+    start = since
+    while start < until:
+        end = min(start + window, until)
+        yield start, end
+        start = end
+
+
+async def export_orders(
+    target: Path,
+    fmt: str,
+    since: datetime | None,
+    until: datetime | None,
+    window: timedelta,
+    checkpoint_path: Path,
+    restart: bool = False,
+) -> ExportCheckpoint:
+    checkpoint = load_checkpoint(
+        checkpoint_path, ExportCheckpoint, "target", str(target.resolve()), restart
+    )
+    until = until or datetime.now(timezone.utc)
+    engines = create_shard_engines()
+    started = time.monotonic()
+    done = 0
+    try:
+        async with AsyncExitStack() as stack:
+            conns = [await stack.enter_async_context(engine.connect()) for engine in engines]
+            if checkpoint.position is not None:
+                since = datetime.fromisoformat(checkpoint.position)
+                logger.info("Resuming export to %s from %s", target, since)
+            elif since is None:
+                firsts = [(await conn.execute(FIRST_CREATED_AT)).scalar() for conn in conns]
+                since = min(filter(None, firsts), default=until)
+            drivers = [(await conn.get_raw_connection()).driver_connection for conn in conns]
+            with open(target, "r+b" if checkpoint.offset else "wb") as file:
+                file.truncate(checkpoint.offset)
+                file.seek(checkpoint.offset)
+                if fmt == "csv" and not checkpoint.offset:
+                    file.write((",".join(COLUMNS) + "\n").encode())
+
+                async def write(data: bytes) -> None:
+                    nonlocal done
+                    file.write(data)
+                    done += data.count(b"\n")
+
+                # Within a window the orders come shard after shard; the
+                # checkpoint only moves once every shard has written it.
+                for start, end in export_windows(since, until, window):
+                    before = done
+                    for driver in drivers:
+                        if fmt == "csv":
+                            await driver.copy_from_query(
+                                EXPORT_CSV, start, end, output=write, format="csv"
+                            )
+                        else:
+                            # CSV with control characters as quote and delimiter
+                            # passes the JSON text through without escaping.
+                            await driver.copy_from_query(
+                                EXPORT_NDJSON,
+                                start,
+                                end,
+                                output=write,
+                                format="csv",
+                                quote="\x01",
+                                delimiter="\x02",
+                            )
+                    file.flush()
+                    os.fsync(file.fileno())
+                    checkpoint.position = end.isoformat()
+                    checkpoint.offset = file.tell()
+                    checkpoint.exported += done - before
+                    save_checkpoint(checkpoint_path, checkpoint)
+                    elapsed = time.monotonic() - started
+                    logger.info(
+                        "Exported %s orders up to %s (%.0f orders/s, %.1f MiB)",
+                        checkpoint.exported,
+                        checkpoint.position,
+                        done / elapsed if elapsed else 0,
+                        checkpoint.offset / 2**20,
+                    )
+    finally:
+        for engine in engines:
+            await engine.dispose()
+    return checkpoint
+
+
+def parse_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import and export of orders with COPY")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("import", help="Load orders from a CSV or NDJSON file")
+    load.add_argument("source", type=Path)
+    load.add_argument("--format", choices=FORMATS, default=None, help="default: by file suffix")
+    load.add_argument("--chunk-size", type=int, default=10000)
+    load.add_argument("--checkpoint", type=Path, default=None, help="default: SOURCE.checkpoint")
+    load.add_argument("--rejects", type=Path, default=None, help="default: SOURCE.rejects")
+    load.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+
+    dump = commands.add_parser("export", help="Write orders to a CSV or NDJSON file")
+    dump.add_argument("target", type=Path)
+    dump.add_argument("--format", choices=FORMATS, default=None, help="default: by file suffix")
+    dump.add_argument("--since", type=parse_datetime, default=None)
+    dump.add_argument("--until", type=parse_datetime, default=None)
+    dump.add_argument("--window-days", type=float, default=7.0, help="days per COPY")
+    dump.add_argument("--checkpoint", type=Path, default=None, help="default: TARGET.checkpoint")
+    dump.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "import":
+        source = args.source
+        result = asyncio.run(
+            import_orders(
+                source,
+                detect_format(source, args.format),
+                args.chunk_size,
+                args.checkpoint or source.with_name(source.name + ".checkpoint"),
+                args.rejects or source.with_name(source.name + ".rejects"),
+                args.restart,
+            )
+        )
+        logger.info(
+            "Import finished: %s imported, %s skipped, %s rejected",
+            result.imported,
+            result.skipped,
+            result.rejected,
+        )
+    else:
+        target = args.target
+        result = asyncio.run(
+            export_orders(
+                target,
+                detect_format(target, args.format),
+                args.since,
+                args.until,
+                timedelta(days=args.window_days),
+                args.checkpoint or target.with_name(target.name + ".checkpoint"),
+                args.restart,
+            )
+        )
+        logger.info("Export finished: %s orders", result.exported)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import argparse
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timezone
+
+from sqlalchemy import pool, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TABLE = "orders"
+TARGET_TABLE = "orders_partitioned"
+LEGACY_TABLE = "orders_legacy"
+COLUMNS = "id, user_id, items, total_price, status, created_at"
+
+FIND_PARENT = text(
+    "SELECT c.relname FROM pg_partitioned_table pt "
+    "JOIN pg_class c ON c.oid = pt.partrelid "
+    "WHERE c.relname IN ('orders', 'orders_partitioned') "
+    "ORDER BY c.relname = 'orders' DESC LIMIT 1"
+)
+
+COPY_BATCH = text(
+    f"""
+    WITH batch AS (
+        SELECT {COLUMNS} FROM {SOURCE_TABLE}
+        WHERE (created_at, id) > (:after_created_at, :after_id)
+        ORDER BY created_at, id
+        LIMIT :batch_size
+    ), copied AS (
+        INSERT INTO {TARGET_TABLE} ({COLUMNS})
+        SELECT {COLUMNS} FROM batch
+        ON CONFLICT (id, created_at) DO NOTHING
+    )
+    SELECT count(*), max(created_at), (array_agg(id ORDER BY created_at DESC, id DESC))[1]
+    FROM batch
+    """
+)
+
+FIND_DEFAULT_PARTITION = text(
+    "SELECT c.relname FROM pg_inherits i "
+    "JOIN pg_class c ON c.oid = i.inhrelid "
+    "JOIN pg_class p ON p.oid = i.inhparent "
+    "WHERE p.relname = :parent AND pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT' "
+    "AND to_regclass(:name) IS NULL"
+)
+
+MISSING_ROWS = text(
+    f"""
+    SELECT count(*) FROM {SOURCE_TABLE} o
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {TARGET_TABLE} p WHERE p.id = o.id AND p.created_at = o.created_at
+    )
+    """
+)
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"orders_p{month:%Y%m}"
+
+
+def create_partitions_engine(dsn: str | None = None) -> AsyncEngine:
+    return create_async_engine(dsn or get_settings().postgres_dsn, poolclass=pool.NullPool)
+
+
+async def find_partitioned_parent(conn: AsyncConnection) -> str:
+    parent = (await conn.execute(FIND_PARENT)).scalar_one_or_none()
+    if parent is None:
+        raise RuntimeError("No partitioned orders table found, run migrations first")
+    return parent
+
+
+async def create_partition(conn: AsyncConnection, parent: str, month: date) -> str:
+    name = partition_name(month)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    create = text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} "
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    )
+    in_month = f"created_at >= '{start}' AND created_at < '{end}'"
+    default = (
+        await conn.execute(FIND_DEFAULT_PARTITION, {"parent": parent, "name": name})
+    ).scalar_one_or_none()
+    if (
+        default is None
+        or not (
+            await conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_month})"))
+        ).scalar()
+    ):
+        await conn.execute(create)
+        return name
+    # PostgreSQL refuses a new partition while the default partition holds
+    # rows that belong in it, so they are moved over with the default detached.
+    # Inserts into the parent wait for the transaction.
+    await conn.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {default}"))
+    await conn.execute(create)
+    await conn.execute(
+        text(f"INSERT INTO {name} ({COLUMNS}) SELECT {COLUMNS} FROM {default} WHERE {in_month}")
+    )
+    await conn.execute(text(f"DELETE FROM {default} WHERE {in_month}"))
+    await conn.execute(text(f"ALTER TABLE {parent} ATTACH PARTITION {default} DEFAULT"))
+    logger.info("Moved %s rows from %s into the new partition %s", start[:7], default, name)
+    return name
+
+
+async def create_partitions(
+    conn: AsyncConnection,
+    months_ahead: int,
+    today: date | None = None,
+) -> list[str]:
+    parent = await find_partitioned_parent(conn)
+    first = month_start(today or date.today())
+    return [
+        await create_partition(conn, parent, add_months(first, offset))
+        for offset in range(months_ahead + 1)
+    ]
+
+
+async def ensure_future_partitions(months_ahead: int | None = None) -> list[str]:
+    settings = get_settings()
+    if months_ahead is None:
+        months_ahead = settings.order_partition_months_ahead
+    names: list[str] = []
+    for dsn in settings.order_shard_dsns_list:
+        engine = create_partitions_engine(dsn)
+        try:
+            async with engine.begin() as conn:
+                names += await create_partitions(conn, months_ahead)
+        finally:
+            await engine.dispose()
+    return names
+
+
+async def backfill(
+    batch_size: int,
+    pause: float = 0.0,
+    after: tuple[datetime, str] | None = None,
+) -> int:
+    engine = create_partitions_engine()
+    after_created_at, after_id = after or (
+        datetime.min.replace(tzinfo=timezone.utc),
+        "00000000-0000-0000-0000-000000000000",
+    )
+    total = 0
+    started = time.monotonic()
+    try:
+        while True:
+            async with engine.begin() as conn:
+                result = await conn.execute(
+                    COPY_BATCH,
+                    {
+                        "after_created_at": after_created_at,
+                        "after_id": after_id,
+                        "batch_size": batch_size,
+                    },
+                )
+                count, last_created_at, last_id = result.one()
+            if not count:
+                break
+            total += count
+            after_created_at, after_id = last_created_at, str(last_id)
+            elapsed = time.monotonic() - started
+            logger.info(
+                "Copied %s rows (%.0f rows/s), resume with --after %s,%s",
+                total,
+                total / elapsed if elapsed else 0,
+                after_created_at.isoformat(),
+                after_id,
+            )
+            if pause:
+                await asyncio.sleep(pause)
+    finally:
+        await engine.dispose()
+    return total
+
+
+async def swap(lock_timeout: str = "5s") -> None:
+    engine = create_partitions_engine()
+    try:
+        async with engine.connect() as conn:
+            missing = (await conn.execute(MISSING_ROWS)).scalar_one()
+        if missing:
+            raise RuntimeError(f"{missing} orders are not copied yet, run backfill first")
+        async with engine.begin() as conn:
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+            await conn.execute(text(f"LOCK TABLE {SOURCE_TABLE} IN ACCESS EXCLUSIVE MODE"))
+            await conn.execute(text(f"DROP TRIGGER orders_sync_partitioned ON {SOURCE_TABLE}"))
+            await conn.execute(text("DROP FUNCTION orders_sync_partitioned()"))
+            await conn.execute(text(f"ALTER TABLE {SOURCE_TABLE} RENAME TO {LEGACY_TABLE}"))
+            await conn.execute(text(f"ALTER TABLE {TARGET_TABLE} RENAME TO {SOURCE_TABLE}"))
+        logger.info("Swapped %s into place, old table kept as %s", TARGET_TABLE, LEGACY_TABLE)
+    finally:
+        await engine.dispose()
+
+
+def parse_after(value: str) -> tuple[datetime, str]:
+    created_at, order_id = value.split(",", 1)
+    return datetime.fromisoformat(created_at), order_id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage orders table partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="Create monthly partitions ahead of time")
+    create.add_argument("--months-ahead", type=int, default=None)
+
+    copy = commands.add_parser("backfill", help="Copy existing orders in batches")
+    copy.add_argument("--batch-size", type=int, default=5000)
+    copy.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    copy.add_argument("--after", type=parse_after, default=None, help="created_at,id to resume")
+
+    commands.add_parser("swap", help="Replace orders with the partitioned table")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "create":
+        names = asyncio.run(ensure_future_partitions(args.months_ahead))
+        logger.info("Partitions ready: %s", ", ".join(names))
+    elif args.command == "backfill":
+        total = asyncio.run(backfill(args.batch_size, args.pause, args.after))
+        logger.info("Backfill complete, %s rows copied", total)
+    else:
+        asyncio.run(swap())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+STARTED_KEY = "querylog_started"
+MAX_STATEMENT_LENGTH = 2000
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryLog:
+    def __init__(self, parent: "QueryLog | None" = None) -> None:
+        self.parent = parent
+        self.statements: list[str] = []
+        self.duration = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def record(self, statement: str, duration: float) -> None:
+        log: QueryLog | None = self
+        while log is not None:
+            log.statements.append(statement)
+            log.duration += duration
+            log = log.parent
+
+
+current_queries: ContextVar[QueryLog | None] = ContextVar("current_queries", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryLog]:
+    log = QueryLog(current_queries.get())
+    token = current_queries.set(log)
+    try:
+        yield log
+    finally:
+        current_queries.reset(token)
+
+
+@contextmanager
+def query_budget(limit: int) -> Iterator[QueryLog]:
+    with track_queries() as log:
+        yield log
+    if log.count > limit:
+        statements = "\n".join(f"  {statement}" for statement in log.statements)
+        raise QueryBudgetExceeded(f"{log.count} queries issued, budget is {limit}:\n{statements}")
+
+
+def redact(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, list | tuple):
+        if parameters and isinstance(parameters[0], dict | list | tuple):
+            return f"<{len(parameters)} parameter sets>"
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def log_queries(engine: AsyncEngine, slow_threshold: float) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        conn.info.setdefault(STARTED_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_execute(conn: Any, cursor: Any, statement: str, parameters: Any, *args: Any) -> None:
+        elapsed = time.perf_counter() - conn.info[STARTED_KEY].pop()
+        log = current_queries.get()
+        if log is not None:
+            log.record(statement[:MAX_STATEMENT_LENGTH], elapsed)
+        if elapsed >= slow_threshold:
+            # Only parameter types are logged; values may hold personal data.
+            logger.warning(
+                "Slow query (%.1f ms): %s parameters=%s",
+                elapsed * 1000,
+                statement[:MAX_STATEMENT_LENGTH],
+                redact(parameters),
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def on_error(context: Any) -> None:
+        conn = context.connection
+        if conn is None or not conn.info.get(STARTED_KEY):
+            return
+        elapsed = time.perf_counter() - conn.info[STARTED_KEY].pop()
+        log = current_queries.get()
+        if log is not None:
+            log.record((context.statement or "")[:MAX_STATEMENT_LENGTH], elapsed)
+
+
+class QueryCountMiddleware:
+    def __init__(self, app: ASGIApp, budget: int) -> None:
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with track_queries() as log:
+            await self.app(scope, receive, send)
+        route = getattr(scope.get("route"), "path", scope["path"])
+        if self.budget and log.count > self.budget:
+            logger.warning(
+                "%s %s issued %s queries (budget %s) taking %.1f ms",
+                scope["method"],
+                route,
+                log.count,
+                self.budget,
+                log.duration * 1000,
+            )
+        elif log.count:
+            logger.debug(
+                "%s %s issued %s queries taking %.1f ms",
+                scope["method"],
+                route,
+                log.count,
+                log.duration * 1000,
+            )
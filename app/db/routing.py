@@ -0,0 +1,124 @@
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.resilience import call_or_skip, redis_breaker
+
+logger = logging.getLogger(__name__)
+
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+def recent_write_key(user_id: int) -> str:
+    return f"recent_write:{user_id}"
+
+
+@dataclass
+class Replica:
+    engine: AsyncEngine
+    lag: float | None = None
+    healthy: bool = False
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        max_lag: float,
+        read_your_writes: float,
+        check_timeout: float = 2.0,
+        redis: Redis | None = None,
+    ) -> None:
+        self.replicas = [Replica(engine) for engine in engines]
+        self.max_lag = max_lag
+        self.read_your_writes = read_your_writes
+        self.check_timeout = check_timeout
+        # Writes are also marked in Redis, so the user's next request keeps
+        # reading from the primary whichever process serves it.
+        self.redis = redis
+        self._last_write: dict[int, float] = {}
+        self._counter = itertools.count()
+
+    async def record_write(self, user_id: int | None) -> None:
+        if user_id is None or not self.replicas:
+            return
+        self._last_write[user_id] = time.monotonic()
+        if self.redis is not None:
+            ttl_ms = max(1, int(self.read_your_writes * 1000))
+            await call_or_skip(
+                redis_breaker(), lambda: self.redis.set(recent_write_key(user_id), 1, px=ttl_ms)
+            )
+
+    async def wrote_recently(self, user_id: int | None) -> bool:
+        if user_id is None or not self.replicas:
+            return False
+        last_write = self._last_write.get(user_id)
+        if last_write is not None:
+            if time.monotonic() - last_write < self.read_your_writes:
+                return True
+            self._last_write.pop(user_id, None)
+        if self.redis is None:
+            return False
+        # Without Redis a write through another process cannot be ruled out,
+        # so the reads stay on the primary.
+        found = await call_or_skip(
+            redis_breaker(), lambda: self.redis.exists(recent_write_key(user_id)), default=1
+        )
+        return bool(found)
+
+    def choose(self) -> AsyncEngine | None:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)].engine
+
+    async def check_replica(self, replica: Replica) -> None:
+        try:
+            async with asyncio.timeout(self.check_timeout):
+                async with replica.engine.connect() as conn:
+                    lag = float((await conn.execute(REPLICA_LAG_QUERY)).scalar_one())
+        except Exception:
+            if replica.healthy:
+                logger.warning("Replica %s is unreachable", replica.engine.url.host)
+            replica.lag = None
+            replica.healthy = False
+            return
+        replica.lag = lag
+        healthy = lag <= self.max_lag
+        if replica.healthy and not healthy:
+            logger.warning(
+                "Replica %s lags %.1fs, routing reads to primary", replica.engine.url.host, lag
+            )
+        replica.healthy = healthy
+
+    async def check_lag(self) -> None:
+        await asyncio.gather(*(self.check_replica(replica) for replica in self.replicas))
+        now = time.monotonic()
+        expired = [
+            user_id
+            for user_id, last_write in self._last_write.items()
+            if now - last_write >= self.read_your_writes
+        ]
+        for user_id in expired:
+            self._last_write.pop(user_id, None)
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await self.check_lag()
+            await asyncio.sleep(interval)
+
+    async def dispose(self) -> None:
+        # The Redis client belongs to the application and is closed by it.
+        for replica in self.replicas:
+            await replica.engine.dispose()
@@ -1,13 +1,131 @@
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from typing import Any, Concatenate, ParamSpec, TypeVar
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session
 
 from app.core.config import get_settings
+from app.core.metrics import instrument_engine
+from app.core.tracing import trace_engine
+from app.db.querylog import log_queries
+from app.db.routing import ReplicaRouter
+from app.models.archive import ArchivedOrder
+from app.models.order import Order
 
-settings = get_settings()
+# The archive index lives on the same shard as the orders it was archived
+# from, so moving orders into it is one transaction.
+SHARDED_MODELS = (Order, ArchivedOrder)
 
-engine = create_async_engine(settings.postgres_dsn, pool_pre_ping=True)
-AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+def create_engine(dsn: str) -> AsyncEngine:
+    settings = get_settings()
+    engine = create_async_engine(
+        dsn,
+        pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_recycle=settings.db_pool_recycle,
+        pool_timeout=settings.db_pool_timeout,
+        connect_args={"statement_cache_size": settings.db_statement_cache_size},
+    )
+    instrument_engine(engine)
+    trace_engine(engine)
+    log_queries(engine, settings.slow_query_threshold_ms / 1000)
+    return engine
+
+
+@lru_cache
+def get_engine() -> AsyncEngine:
+    return create_engine(get_settings().postgres_dsn)
+
+
+@lru_cache
+def get_replica_router() -> ReplicaRouter:
+    settings = get_settings()
+    return ReplicaRouter(
+        [create_engine(dsn) for dsn in settings.postgres_replica_dsns_list],
+        max_lag=settings.replica_max_lag_seconds,
+        read_your_writes=settings.read_your_writes_seconds,
+    )
+
+
+@lru_cache
+def get_shard_engines() -> list[AsyncEngine]:
+    dsns = get_settings().order_shard_dsns_list
+    return [get_engine(), *(create_engine(dsn) for dsn in dsns[1:])]
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        # Shard 0 is the main database and keeps replica routing.
+        shard = self.info.get("order_shard")
+        if shard and mapper is not None and mapper.class_ in SHARDED_MODELS:
+            return get_shard_engines()[shard].sync_engine
+        read_only = self.info.get("read_only") and not self.info.get("primary_reads")
+        if read_only and not self._flushing:
+            replica = get_replica_router().choose()
+            if replica is not None:
+                return replica.sync_engine
+        return get_engine().sync_engine
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_write(session: Session, flush_context: Any) -> None:
+    session.info["wrote"] = True
+
+
+class RoutingAsyncSession(AsyncSession):
+    async def commit(self) -> None:
+        await super().commit()
+        if self.info.pop("wrote", False):
+            self.info["primary_reads"] = True
+            await get_replica_router().record_write(self.info.get("user_id"))
+
+
+AsyncSessionLocal = async_sessionmaker(
+    expire_on_commit=False,
+    class_=RoutingAsyncSession,
+    sync_session_class=RoutingSession,
+)
+
+
+def read_only(
+    func: Callable[Concatenate[AsyncSession, P], Awaitable[R]],
+) -> Callable[Concatenate[AsyncSession, P], Awaitable[R]]:
+    @wraps(func)
+    async def wrapper(db: AsyncSession, *args: P.args, **kwargs: P.kwargs) -> R:
+        user_id = db.info.get("user_id")
+        if user_id is not None and "primary_reads" not in db.info:
+            db.info["primary_reads"] = await get_replica_router().wrote_recently(user_id)
+        previous = db.info.get("read_only", False)
+        db.info["read_only"] = True
+        try:
+            return await func(db, *args, **kwargs)
+        finally:
+            db.info["read_only"] = previous
+
+    return wrapper
+
+
+@contextmanager
+def order_shard(db: AsyncSession, shard: int) -> Iterator[None]:
+    previous = db.info.get("order_shard", 0)
+    db.info["order_shard"] = shard
+    try:
+        yield
+    finally:
+        db.info["order_shard"] = previous
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import time
+from datetime import date, datetime, timezone
+from functools import lru_cache
+
+from sqlalchemy import delete, func, pool, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+
+from app.core.config import get_settings
+from app.db.partitions import (
+    create_partition,
+    ensure_future_partitions,
+    find_partitioned_parent,
+    month_start,
+)
+from app.models.order import ORDER_ID_BUCKETS, Order, order_id_bucket, user_bucket
+
+logger = logging.getLogger(__name__)
+
+orders = Order.__table__
+
+
+class ShardMap:
+    def __init__(self, buckets: list[int], shards: int) -> None:
+        self.buckets = buckets
+        self.shards = shards
+        # The map a rebalance in progress moves orders away from.
+        self.previous: ShardMap | None = None
+
+    def shard_for_user(self, user_id: int) -> int:
+        return self.buckets[user_bucket(user_id)]
+
+    def shards_for_user(self, user_id: int) -> list[int]:
+        # Until the rebalance is done a user's orders may sit on the previous
+        # owner too. It is read first: rows are committed on the new owner
+        # before they are deleted from the previous one, so no moving row is
+        # missed by both reads.
+        shard = self.shard_for_user(user_id)
+        previous = self.previous.shard_for_user(user_id) if self.previous else shard
+        return [shard] if previous == shard else [previous, shard]
+
+    def shards_for_order(self, order_id: str) -> list[int]:
+        # The shard encoded in the id is asked first. Ids minted before
+        # sharding, or orders not moved yet by a rebalance, are found on the
+        # remaining shards.
+        bucket = order_id_bucket(order_id)
+        first = self.buckets[bucket] if bucket is not None else 0
+        return [first, *(shard for shard in range(self.shards) if shard != first)]
+
+    def buckets_for(self, shard: int) -> list[int]:
+        return [bucket for bucket, owner in enumerate(self.buckets) if owner == shard]
+
+    def group_users(self, user_ids: list[int]) -> dict[int, list[int]]:
+        groups: dict[int, list[int]] = {}
+        for user_id in user_ids:
+            groups.setdefault(self.shard_for_user(user_id), []).append(user_id)
+        return groups
+
+
+def parse_shard_map(spec: str, shards: int) -> ShardMap:
+    buckets = [0] * ORDER_ID_BUCKETS
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            ranges, shard_text = entry.split(":")
+            first, _, last = ranges.partition("-")
+            start, end, shard = int(first), int(last or first), int(shard_text)
+        except ValueError:
+            raise ValueError(
+                f"Invalid shard map entry {entry!r}, expected FIRST-LAST:SHARD"
+            ) from None
+        if not 0 <= start <= end < ORDER_ID_BUCKETS or not 0 <= shard < shards:
+            raise ValueError(f"Shard map entry {entry!r} is out of range")
+        buckets[start : end + 1] = [shard] * (end - start + 1)
+    return ShardMap(buckets, shards)
+
+
+@lru_cache
+def get_shard_map() -> ShardMap:
+    settings = get_settings()
+    shards = len(settings.order_shard_dsns_list)
+    shard_map = parse_shard_map(settings.order_shard_map, shards)
+    if settings.order_shard_map_previous is not None:
+        shard_map.previous = parse_shard_map(settings.order_shard_map_previous, shards)
+    return shard_map
+
+
+def create_shard_engines() -> list[AsyncEngine]:
+    return [
+        create_async_engine(dsn, poolclass=pool.NullPool)
+        for dsn in get_settings().order_shard_dsns_list
+    ]
+
+
+class ShardMover:
+    def __init__(self, source: AsyncConnection, target: AsyncConnection) -> None:
+        self.source = source
+        self.target = target
+        self.parent: str | None = None
+        self.months: set[date] = set()
+        self.after: tuple[datetime, str] | None = None
+
+    async def ensure_partitions(self, rows: list[dict]) -> None:
+        if self.parent is None:
+            self.parent = await find_partitioned_parent(self.target)
+        months = {month_start(row["created_at"].astimezone(timezone.utc).date()) for row in rows}
+        for month in months - self.months:
+            await create_partition(self.target, self.parent, month)
+            self.months.add(month)
+
+    async def move(self, buckets: list[int], batch_size: int) -> int:
+        # Rows are committed on the target before they are deleted from the
+        # source; a crash in between leaves copies that the next run skips.
+        # Each batch continues the (created_at, id) index scan where the last
+        # one stopped instead of scanning the table from the start; rows
+        # locked by a writer are passed over, `status` counts them and the
+        # next run moves them.
+        query = (
+            select(orders)
+            .where((orders.c.user_id % ORDER_ID_BUCKETS).in_(buckets))
+            .order_by(orders.c.created_at, orders.c.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        if self.after is not None:
+            query = query.where(tuple_(orders.c.created_at, orders.c.id) > self.after)
+        async with self.source.begin():
+            rows = [dict(row) for row in (await self.source.execute(query)).mappings()]
+            if not rows:
+                return 0
+            self.after = rows[-1]["created_at"], rows[-1]["id"]
+            async with self.target.begin():
+                await self.ensure_partitions(rows)
+                await self.target.execute(insert(orders).on_conflict_do_nothing(), rows)
+            await self.source.execute(
+                delete(orders).where(orders.c.id.in_([row["id"] for row in rows]))
+            )
+        return len(rows)
+
+
+async def rebalance(batch_size: int, pause: float = 0.0) -> int:
+    shard_map = get_shard_map()
+    engines = create_shard_engines()
+    total = 0
+    started = time.monotonic()
+    try:
+        for source_shard, source_engine in enumerate(engines):
+            for target_shard, target_engine in enumerate(engines):
+                buckets = shard_map.buckets_for(target_shard)
+                if target_shard == source_shard or not buckets:
+                    continue
+                async with source_engine.connect() as source, target_engine.connect() as target:
+                    mover = ShardMover(source, target)
+                    while moved := await mover.move(buckets, batch_size):
+                        total += moved
+                        elapsed = time.monotonic() - started
+                        logger.info(
+                            "Moved %s orders, shard %s -> %s (%.0f rows/s)",
+                            total,
+                            source_shard,
+                            target_shard,
+                            total / elapsed if elapsed else 0,
+                        )
+                        if pause:
+                            await asyncio.sleep(pause)
+    finally:
+        for engine in engines:
+            await engine.dispose()
+    return total
+
+
+async def shard_status() -> list[tuple[int, int]]:
+    shard_map = get_shard_map()
+    engines = create_shard_engines()
+    status = []
+    try:
+        for shard, engine in enumerate(engines):
+            bucket = orders.c.user_id % ORDER_ID_BUCKETS
+            async with engine.connect() as conn:
+                result = await conn.execute(select(bucket, func.count()).group_by(bucket))
+                counts = result.all()
+            rows = sum(count for _, count in counts)
+            misplaced = sum(count for bucket, count in counts if shard_map.buckets[bucket] != shard)
+            status.append((rows, misplaced))
+    finally:
+        for engine in engines:
+            await engine.dispose()
+    return status
+
+
+def migrate() -> None:
+    for shard, dsn in enumerate(get_settings().order_shard_dsns_list):
+        logger.info("Migrating shard %s", shard)
+        subprocess.run(
+            ["alembic", "upgrade", "head"], check=True, env={**os.environ, "POSTGRES_DSN": dsn}
+        )
+    names = asyncio.run(ensure_future_partitions())
+    logger.info("Partitions ready: %s", ", ".join(sorted(set(names))))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage order shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("status", help="Count orders per shard and rows on the wrong shard")
+    commands.add_parser("migrate", help="Apply migrations and create partitions on every shard")
+
+    move = commands.add_parser("rebalance", help="Move orders to the shard the map assigns")
+    move.add_argument("--batch-size", type=int, default=1000)
+    move.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "status":
+        for shard, (rows, misplaced) in enumerate(asyncio.run(shard_status())):
+            logger.info("Shard %s: %s orders, %s on the wrong shard", shard, rows, misplaced)
+    elif args.command == "migrate":
+        migrate()
+    else:
+        total = asyncio.run(rebalance(args.batch_size, args.pause))
+        logger.info("Rebalance complete, %s orders moved", total)
+
+
+if __name__ == "__main__":
+    main()
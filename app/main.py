@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
@@ -8,10 +9,24 @@ from redis.asyncio import from_url
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
-from app.api.routes import auth, health, orders
+from app.api.routes import auth, debug, health, metrics, orders, stats
+from app.core.concurrency import ConcurrencyLimitMiddleware
 from app.core.config import get_settings
+from app.core.metrics import MetricsMiddleware, instrument_redis
+from app.core.profiling import ProfileStore, ProfilingMiddleware
 from app.core.ratelimit import limiter
-from app.messaging.producer import close_kafka_producer, init_kafka_producer
+from app.core.revocation import TokenRevocations
+from app.core.tracing import TracingMiddleware, configure_tracing, shutdown_tracing, trace_redis
+from app.db.querylog import QueryCountMiddleware
+from app.db.session import get_engine, get_replica_router, get_shard_engines
+from app.messaging.producer import (
+    close_kafka_producer,
+    connect_kafka_producer,
+    run_event_spool_drainer,
+)
+from app.services.catalog import PriceCatalog
+from app.services.health import HealthMonitor, kafka_probe, postgres_probe, redis_probe
+from app.services.order_events import OrderEventHub
 
 logger = logging.getLogger(__name__)
 
@@ -19,13 +34,70 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(application: FastAPI) -> AsyncGenerator[None, None]:
     settings = get_settings()
-    redis = from_url(settings.redis_url, encoding="utf-8", decode_responses=True)
+    configure_tracing("order-service-api")
+    redis = trace_redis(
+        instrument_redis(from_url(settings.redis_url, encoding="utf-8", decode_responses=True))
+    )
     application.state.redis = redis
-    await init_kafka_producer(settings.kafka_bootstrap_servers)
+    order_events = OrderEventHub(
+        redis, settings.order_events_buffer_size, settings.order_events_heartbeat_seconds
+    )
+    application.state.order_events = order_events
+    order_events_listener = asyncio.create_task(order_events.run())
+    token_revocations = TokenRevocations(
+        redis, settings.token_revocation_capacity, settings.token_revocation_error_rate
+    )
+    application.state.token_revocations = token_revocations
+    revocation_sync = asyncio.create_task(
+        token_revocations.run(settings.token_revocation_sync_seconds)
+    )
+    price_catalog = PriceCatalog(settings.price_catalog_initial_capacity)
+    application.state.price_catalog = price_catalog
+    price_catalog_listener = asyncio.create_task(price_catalog.run(settings.postgres_dsn))
+    replica_router = get_replica_router()
+    replica_router.redis = redis
+    replica_monitor = None
+    if replica_router.replicas:
+        replica_monitor = asyncio.create_task(
+            replica_router.run(settings.replica_check_interval_seconds)
+        )
+    kafka_connector = asyncio.create_task(
+        connect_kafka_producer(
+            settings.kafka_bootstrap_servers,
+            settings.kafka_connect_initial_backoff_seconds,
+            settings.kafka_connect_max_backoff_seconds,
+        )
+    )
+    probe_timeout = settings.health_probe_timeout_seconds
+    health_monitor = HealthMonitor(
+        [
+            postgres_probe(get_engine(), probe_timeout),
+            redis_probe(redis, probe_timeout),
+            kafka_probe(probe_timeout),
+        ],
+        settings.health_check_interval_seconds,
+    )
+    application.state.health_monitor = health_monitor
+    health_checks = asyncio.create_task(health_monitor.run())
+    spool_drainer = asyncio.create_task(
+        run_event_spool_drainer(settings.event_spool_drain_interval_seconds)
+    )
     logger.info("Application startup complete")
     yield
-    await close_kafka_producer()
+    kafka_connector.cancel()
+    spool_drainer.cancel()
+    health_checks.cancel()
+    order_events_listener.cancel()
+    revocation_sync.cancel()
+    price_catalog_listener.cancel()
+    if replica_monitor is not None:
+        replica_monitor.cancel()
+    await close_kafka_producer(settings.kafka_publish_timeout_seconds)
     await redis.close()
+    await replica_router.dispose()
+    for engine in get_shard_engines():
+        await engine.dispose()
+    shutdown_tracing()
     logger.info("Application shutdown complete")
 
 
@@ -36,6 +108,29 @@ def create_app() -> FastAPI:
     application.state.limiter = limiter
     application.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+    application.state.profile_store = ProfileStore(settings.profile_dir, settings.profile_max_files)
+    application.add_middleware(
+        ProfilingMiddleware,
+        store=application.state.profile_store,
+        sample_rate=settings.profile_sample_rate,
+        token=settings.profile_token,
+        interval=settings.profile_interval_seconds,
+    )
+    application.add_middleware(QueryCountMiddleware, budget=settings.request_query_budget)
+    if settings.concurrency_limit_enabled:
+        application.add_middleware(
+            ConcurrencyLimitMiddleware,
+            initial=settings.concurrency_limit_initial,
+            min_limit=settings.concurrency_limit_min,
+            max_limit=settings.concurrency_limit_max,
+            target_latency=settings.concurrency_target_latency_ms / 1000,
+            max_wait=settings.concurrency_max_wait_ms / 1000,
+            retry_after=settings.load_shed_retry_after_seconds,
+        )
+    application.add_middleware(MetricsMiddleware)
+    application.add_middleware(TracingMiddleware)
+    # Added last so it wraps everything else: responses produced by other
+    # middleware, such as a shed 503, still carry CORS headers for browsers.
     application.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_origins_list,
@@ -45,8 +140,11 @@ def create_app() -> FastAPI:
     )
 
     application.include_router(health)
+    application.include_router(metrics)
     application.include_router(auth)
     application.include_router(orders)
+    application.include_router(stats)
+    application.include_router(debug)
 
     return application
 
@@ -1,32 +1,115 @@
 import asyncio
 import json
+import logging
+import time
+from datetime import datetime, timezone
 
-from aiokafka import AIOKafkaConsumer
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener, ConsumerRecord
 
 from app.core.config import get_settings
+from app.core.metrics import CONSUMER_MESSAGES, start_metrics_server
+from app.core.tracing import (
+    CONSUMER,
+    TRACEPARENT,
+    configure_tracing,
+    parse_traceparent,
+    shutdown_tracing,
+    start_span,
+)
+from app.db.session import AsyncSessionLocal
+from app.services.rollups import RollupAggregator
 from app.tasks.worker import process_order
 
+logger = logging.getLogger(__name__)
+
+
+def handle_message(message: ConsumerRecord, rollups: RollupAggregator) -> None:
+    CONSUMER_MESSAGES.labels(message.topic).inc()
+    parent = parse_traceparent(dict(message.headers or ()).get(TRACEPARENT))
+    attributes = {"messaging.system": "kafka", "messaging.destination.name": message.topic}
+    with start_span(f"process {message.topic}", CONSUMER, parent, attributes):
+        process_message(message, rollups)
+
+
+def process_message(message: ConsumerRecord, rollups: RollupAggregator) -> None:
+    order_id = message.value.get("order_id")
+    if order_id:
+        process_order.delay(order_id, message.value.get("user_id"))
+    total_price = message.value.get("total_price")
+    if total_price is None or rollups.is_applied(message.topic, message.partition, message.offset):
+        return
+    created_at = message.value.get("created_at")
+    if created_at:
+        created = datetime.fromisoformat(created_at)
+    else:
+        created = datetime.fromtimestamp(message.timestamp / 1000, tz=timezone.utc)
+    rollups.add(created, float(total_price), (message.topic, message.partition, message.offset))
+
+
+async def flush_rollups(rollups: RollupAggregator) -> None:
+    async with AsyncSessionLocal() as db:
+        events = await rollups.flush(db)
+    logger.info("Flushed rollups for %s orders", events)
+
+
+class RollupRebalanceListener(ConsumerRebalanceListener):
+    def __init__(self, rollups: RollupAggregator) -> None:
+        self.rollups = rollups
+
+    async def on_partitions_revoked(self, revoked: set) -> None:
+        # Counters are flushed together with their offsets, so whichever
+        # consumer gets the partitions next skips what was already counted.
+        if self.rollups.pending_events:
+            await flush_rollups(self.rollups)
+
+    async def on_partitions_assigned(self, assigned: set) -> None:
+        async with AsyncSessionLocal() as db:
+            await self.rollups.load_offsets(db)
+
 
 async def consume() -> None:
     settings = get_settings()
+    start_metrics_server(settings.metrics_port)
+    configure_tracing("order-service-consumer")
     consumer = AIOKafkaConsumer(
-        settings.kafka_topic_new_order,
         bootstrap_servers=settings.kafka_bootstrap_servers,
         value_deserializer=lambda v: json.loads(v.decode("utf-8")),
-        enable_auto_commit=True,
+        enable_auto_commit=False,
         group_id="order-service-consumer",
     )
+    rollups = RollupAggregator()
+    consumer.subscribe([settings.kafka_topic_new_order], listener=RollupRebalanceListener(rollups))
     await consumer.start()
+    last_flush = time.monotonic()
+    uncommitted = False
     try:
-        async for message in consumer:
-            order_id = message.value.get("order_id")
-            if order_id:
-                process_order.delay(order_id)
+        while True:
+            batches = await consumer.getmany(timeout_ms=1000, max_records=500)
+            for messages in batches.values():
+                for message in messages:
+                    handle_message(message, rollups)
+                    uncommitted = True
+            flush_due = time.monotonic() - last_flush >= settings.rollup_flush_interval_seconds
+            if rollups.pending_events and (
+                flush_due or rollups.pending_events >= settings.rollup_flush_max_events
+            ):
+                await flush_rollups(rollups)
+                last_flush = time.monotonic()
+            if uncommitted and not rollups.pending_events:
+                await consumer.commit()
+                uncommitted = False
     finally:
-        await consumer.stop()
+        try:
+            if rollups.pending_events:
+                await flush_rollups(rollups)
+            await consumer.commit()
+        finally:
+            await consumer.stop()
+            shutdown_tracing()
 
 
 def main() -> None:
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(consume())
 
 
@@ -1,38 +1,61 @@
 import asyncio
 import logging
+import random
+from contextlib import suppress
 
 from aiokafka import AIOKafkaProducer
 
+from app.core.config import get_settings
+from app.core.metrics import observe
+from app.core.resilience import kafka_breaker
+from app.core.tracing import (
+    PRODUCER,
+    TRACEPARENT,
+    current_span,
+    current_traceparent,
+    parse_traceparent,
+    start_span,
+)
+from app.messaging.spool import EventSpool, Headers
+
 logger = logging.getLogger(__name__)
 
 kafka_producer: AIOKafkaProducer | None = None
 
-MAX_RETRIES = 5
-RETRY_INTERVAL = 3
-
 
-async def init_kafka_producer(bootstrap_servers: str) -> None:
+async def connect_kafka_producer(
+    bootstrap_servers: str, initial_backoff: float, max_backoff: float
+) -> None:
     global kafka_producer
-    if kafka_producer is not None:
-        return
-    for attempt in range(1, MAX_RETRIES + 1):
+    backoff = initial_backoff
+    attempt = 0
+    while kafka_producer is None:
+        attempt += 1
+        producer = AIOKafkaProducer(bootstrap_servers=bootstrap_servers)
         try:
-            producer = AIOKafkaProducer(bootstrap_servers=bootstrap_servers)
             await producer.start()
-            kafka_producer = producer
-            logger.info("Kafka producer connected (attempt %s)", attempt)
-            return
         except Exception:
-            logger.warning("Kafka producer connect attempt %s/%s failed", attempt, MAX_RETRIES)
-            if attempt < MAX_RETRIES:
-                await asyncio.sleep(RETRY_INTERVAL)
-    logger.error("Could not connect Kafka producer after %s attempts", MAX_RETRIES)
+            with suppress(Exception):
+                await producer.stop()
+            delay = random.uniform(backoff / 2, backoff)
+            logger.warning(
+                "Kafka producer connect attempt %s failed, retrying in %.1fs", attempt, delay
+            )
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, max_backoff)
+            continue
+        kafka_producer = producer
+        logger.info("Kafka producer connected (attempt %s)", attempt)
 
 
-async def close_kafka_producer() -> None:
+async def close_kafka_producer(flush_timeout: float) -> None:
     global kafka_producer
     if kafka_producer is None:
         return
+    try:
+        await asyncio.wait_for(kafka_producer.flush(), timeout=flush_timeout)
+    except Exception:
+        logger.warning("Kafka producer flush did not complete", exc_info=True)
     await kafka_producer.stop()
     kafka_producer = None
 
@@ -41,3 +64,53 @@ def get_kafka_producer() -> AIOKafkaProducer:
     if kafka_producer is None:
         raise RuntimeError("Kafka producer is not initialized")
     return kafka_producer
+
+
+def get_event_spool() -> EventSpool:
+    return EventSpool(get_settings().event_spool_dir)
+
+
+async def send_event(topic: str, payload: bytes, headers: Headers | None = None) -> None:
+    headers = list(headers or [])
+    # Replayed events carry the context of the request that produced them.
+    parent = None if current_span.get() else parse_traceparent(dict(headers).get(TRACEPARENT))
+    attributes = {"messaging.system": "kafka", "messaging.destination.name": topic}
+    with start_span(f"send {topic}", PRODUCER, parent, attributes) as span:
+        if span is not None:
+            headers = [(key, value) for key, value in headers if key != TRACEPARENT]
+            headers.append((TRACEPARENT, span.context.traceparent.encode()))
+
+        async def send() -> None:
+            with observe("kafka", "send"):
+                if headers:
+                    await get_kafka_producer().send_and_wait(topic, payload, headers=headers)
+                else:
+                    await get_kafka_producer().send_and_wait(topic, payload)
+
+        await kafka_breaker().call(send)
+
+
+async def publish_event(topic: str, payload: bytes) -> None:
+    traceparent = current_traceparent()
+    headers = [(TRACEPARENT, traceparent.encode())] if traceparent else []
+    try:
+        await send_event(topic, payload, headers)
+    except Exception:
+        logger.warning("Publishing to %s failed, spooling the event", topic, exc_info=True)
+        await get_event_spool().append(topic, payload, headers)
+
+
+async def drain_event_spool() -> int:
+    sent = await get_event_spool().drain(send_event)
+    if sent:
+        logger.info("Replayed %s spooled events", sent)
+    return sent
+
+
+async def run_event_spool_drainer(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await drain_event_spool()
+        except Exception:
+            logger.exception("Draining the event spool failed")
@@ -0,0 +1,105 @@
+import asyncio
+import base64
+import fcntl
+import json
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_FILE = "events.jsonl"
+LOCK_FILE = ".drain.lock"
+
+Headers = list[tuple[str, bytes]]
+Send = Callable[[str, bytes, Headers], Awaitable[object]]
+
+
+def encode_record(topic: str, payload: bytes, headers: Headers) -> bytes:
+    record = {"topic": topic, "payload": base64.b64encode(payload).decode("ascii")}
+    if headers:
+        record["headers"] = [
+            [key, base64.b64encode(value).decode("ascii")] for key, value in headers
+        ]
+    return json.dumps(record).encode("utf-8") + b"\n"
+
+
+def decode_record(line: bytes) -> tuple[str, bytes, Headers]:
+    record = json.loads(line)
+    headers = [(key, base64.b64decode(value)) for key, value in record.get("headers", [])]
+    return record["topic"], base64.b64decode(record["payload"]), headers
+
+
+# Several processes may share the directory: appends are serialized with
+# flock, and only the process holding the drain lock replays events.
+class EventSpool:
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+        self.active = self.directory / ACTIVE_FILE
+
+    def append_sync(self, topic: str, payload: bytes, headers: Headers | None = None) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        line = encode_record(topic, payload, headers or [])
+        while True:
+            with open(self.active, "ab") as file:
+                fcntl.flock(file, fcntl.LOCK_EX)
+                try:
+                    # The drainer may have claimed the file between open and
+                    # flock; appending then would write into a file already read.
+                    if os.fstat(file.fileno()).st_ino != os.stat(self.active).st_ino:
+                        continue
+                except FileNotFoundError:
+                    continue
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+                return
+
+    async def append(self, topic: str, payload: bytes, headers: Headers | None = None) -> None:
+        await asyncio.to_thread(self.append_sync, topic, payload, headers)
+
+    def claim_active(self) -> None:
+        try:
+            file = open(self.active, "rb")
+        except FileNotFoundError:
+            return
+        with file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            claimed = f"{time.time_ns()}-{os.urandom(4).hex()}.draining"
+            os.rename(self.active, self.directory / claimed)
+
+    def pending_files(self) -> list[Path]:
+        return sorted(self.directory.glob("*.draining"))
+
+    async def drain(self, send: Send) -> int:
+        if not self.directory.exists():
+            return 0
+        lock = open(self.directory / LOCK_FILE, "ab")
+        try:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            await asyncio.to_thread(self.claim_active)
+            sent = 0
+            for path in self.pending_files():
+                lines = path.read_bytes().splitlines()
+                for index, line in enumerate(lines):
+                    try:
+                        await send(*decode_record(line))
+                    except Exception:
+                        self.rewrite(path, lines[index:])
+                        logger.warning("Spool drain stopped, %s events left", len(lines) - index)
+                        return sent
+                    sent += 1
+                path.unlink()
+            return sent
+        finally:
+            lock.close()
+
+    def rewrite(self, path: Path, lines: list[bytes]) -> None:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(b"".join(line + b"\n" for line in lines))
+        os.replace(tmp, path)
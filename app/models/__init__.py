@@ -1,4 +1,15 @@
+from app.models.archive import ArchivedOrder
 from app.models.order import Order, OrderStatus
+from app.models.product import Product
+from app.models.rollup import OrderRollup, RollupOffset
 from app.models.user import User
 
-__all__ = ["User", "Order", "OrderStatus"]
+__all__ = [
+    "User",
+    "Order",
+    "OrderStatus",
+    "ArchivedOrder",
+    "OrderRollup",
+    "RollupOffset",
+    "Product",
+]
@@ -1,8 +1,11 @@
-from datetime import datetime
+import os
+import time
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from uuid import uuid4
+from uuid import NAMESPACE_URL, uuid5
+from uuid import UUID as PyUUID
 
-from sqlalchemy import DateTime, Float, ForeignKey, func
+from sqlalchemy import DateTime, Float, Index, func
 from sqlalchemy import Enum as SqlEnum
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -17,15 +20,66 @@ class OrderStatus(str, Enum):
     CANCELED = "CANCELED"
 
 
+# Order ids carry the user's shard bucket in the low bits of the UUIDv7
+# rand_a field, so a lookup by id knows which shard to ask.
+ORDER_ID_BUCKETS = 1024
+# Lookups by id only search this far around the time encoded in a UUIDv7.
+ORDER_ID_CLOCK_SKEW = timedelta(days=1)
+
+
+def new_order_id(
+    created_at: datetime | None = None, bucket: int | None = None, key: str | None = None
+) -> str:
+    # With a key the random bits are derived from it, so the same key and time
+    # always give the same id.
+    timestamp_ms = int((created_at.timestamp() if created_at else time.time()) * 1000)
+    random_bits = uuid5(NAMESPACE_URL, key).bytes[:10] if key is not None else os.urandom(10)
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80 | int.from_bytes(random_bits, "big")
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    if bucket is not None:
+        value = value & ~((ORDER_ID_BUCKETS - 1) << 64) | bucket << 64
+    return str(PyUUID(int=value))
+
+
+def user_bucket(user_id: int) -> int:
+    return user_id % ORDER_ID_BUCKETS
+
+
+def order_id_timestamp(order_id: str) -> datetime | None:
+    value = PyUUID(order_id)
+    if value.version != 7:
+        return None
+    return datetime.fromtimestamp((value.int >> 80) / 1000, tz=timezone.utc)
+
+
+def order_id_bucket(order_id: str) -> int | None:
+    value = PyUUID(order_id)
+    if value.version != 7:
+        return None
+    return value.int >> 64 & ORDER_ID_BUCKETS - 1
+
+
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_partitioned_user_id_created_at", "user_id", "created_at"),
+        Index(
+            "ix_orders_partitioned_items_gin",
+            "items",
+            postgresql_using="gin",
+            postgresql_ops={"items": "jsonb_path_ops"},
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[str] = mapped_column(
         UUID(as_uuid=False),
         primary_key=True,
-        default=lambda: str(uuid4()),
+        default=lambda: new_order_id(),
     )
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True, nullable=False)
+    # No foreign key: orders may live on a shard that has no users table rows.
+    user_id: Mapped[int] = mapped_column(nullable=False)
     items: Mapped[list[dict]] = mapped_column(JSONB, nullable=False)
     total_price: Mapped[float] = mapped_column(Float, nullable=False)
     status: Mapped[OrderStatus] = mapped_column(
@@ -33,6 +87,12 @@ class Order(Base):
         default=OrderStatus.PENDING,
         nullable=False,
     )
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
 
-    user = relationship("User", back_populates="orders")
+    user = relationship(
+        "User", back_populates="orders", primaryjoin="User.id == foreign(Order.user_id)"
+    )
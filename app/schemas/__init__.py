@@ -1,5 +1,14 @@
-from app.schemas.health import HealthResponse
-from app.schemas.order import OrderCreate, OrderItem, OrderRead, OrderUpdate
+from app.schemas.health import HealthResponse, LivenessResponse, ServiceHealth
+from app.schemas.order import (
+    OrderCreate,
+    OrderItem,
+    OrderRead,
+    OrderStatusSummary,
+    OrderSummary,
+    OrderUpdate,
+    StoredOrderRead,
+)
+from app.schemas.stats import RollupPoint
 from app.schemas.token import Token
 from app.schemas.user import UserCreate, UserRead
 
@@ -11,5 +20,11 @@ __all__ = [
     "OrderCreate",
     "OrderRead",
     "OrderUpdate",
+    "StoredOrderRead",
+    "OrderStatusSummary",
+    "OrderSummary",
     "HealthResponse",
+    "ServiceHealth",
+    "LivenessResponse",
+    "RollupPoint",
 ]
@@ -1,6 +1,22 @@
+from datetime import datetime
+
 from pydantic import BaseModel, Field
 
 
+class ServiceHealth(BaseModel):
+    status: str = Field(description="Result of the last probe (ok/unavailable/timeout/unknown)")
+    latency_ms: float | None = Field(description="Duration of the last probe in milliseconds")
+    checked_at: datetime | None = Field(description="When the last probe finished")
+
+
 class HealthResponse(BaseModel):
     status: str = Field(description="Overall health status (healthy/degraded)")
     services: dict[str, str] = Field(description="Status of individual services")
+    checks: dict[str, ServiceHealth] = Field(description="Latest probe result per service")
+    circuit_breakers: dict[str, str] = Field(
+        default_factory=dict, description="State of each circuit breaker (closed/open/half_open)"
+    )
+
+
+class LivenessResponse(BaseModel):
+    status: str = Field(description="Always 'alive' while the process serves requests")
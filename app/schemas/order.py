@@ -39,3 +39,23 @@ class OrderRead(BaseModel):
     created_at: datetime = Field(description="Order creation timestamp")
 
     model_config = {"from_attributes": True}
+
+
+class StoredOrderRead(OrderRead):
+    # Orders read back from the database or the cache hold items that already
+    # passed OrderItem validation, so they are taken as plain dicts instead of
+    # going through the OrderItem | dict union again. Any dict is accepted,
+    # like OrderRow does, so a row stored under older rules still renders.
+    items: list[dict[str, Any]] = Field(description="List of order items")
+
+
+class OrderStatusSummary(BaseModel):
+    count: int = Field(description="Number of orders in this status")
+    total_price: float = Field(description="Sum of total_price of orders in this status")
+
+
+class OrderSummary(BaseModel):
+    user_id: int = Field(description="User ID the summary belongs to")
+    statuses: dict[OrderStatus, OrderStatusSummary] = Field(
+        description="Order count and spend per status"
+    )
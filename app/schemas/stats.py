@@ -0,0 +1,11 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class RollupPoint(BaseModel):
+    bucket_start: datetime = Field(description="Start of the time bucket (UTC)")
+    order_count: int = Field(description="Number of orders created in the bucket")
+    revenue: float = Field(description="Sum of total_price of orders created in the bucket")
+
+    model_config = {"from_attributes": True}
@@ -0,0 +1,170 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from multiprocessing.process import BaseProcess
+from types import FrameType
+
+import uvicorn
+
+from app.core.config import get_settings
+from app.core.metrics import MULTIPROC_ENV, mark_process_dead, prepare_multiprocess_dir
+
+logger = logging.getLogger(__name__)
+
+BACKLOG = 2048
+SUPERVISE_INTERVAL_SECONDS = 0.5
+KILL_GRACE_SECONDS = 5.0
+
+
+@dataclass(frozen=True)
+class ServerOptions:
+    host: str
+    port: int
+    workers: int
+    reuse_port: bool
+    graceful_timeout: float
+    log_level: str = "info"
+
+
+def bind_socket(host: str, port: int, reuse_port: bool) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+class GracefulServer(uvicorn.Server):
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        # Event streams never finish on their own and would hold the drain
+        # until the graceful timeout, so they are ended first.
+        hub = getattr(self.config.app.state, "order_events", None)
+        if hub is not None:
+            hub.close()
+        await super().shutdown(sockets)
+
+
+def serve(options: ServerOptions, sock: socket.socket | None) -> None:
+    from app.main import app
+
+    if sock is None:
+        sock = bind_socket(options.host, options.port, reuse_port=True)
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        log_level=options.log_level,
+        timeout_graceful_shutdown=int(options.graceful_timeout),
+    )
+    GracefulServer(config).run(sockets=[sock])
+
+
+class Supervisor:
+    def __init__(self, start_worker: Callable[[], BaseProcess], workers: int) -> None:
+        self.start_worker = start_worker
+        self.workers = workers
+        self.processes: list[BaseProcess] = []
+        self.should_exit = False
+
+    def handle_exit(self, sig: int, frame: FrameType | None) -> None:
+        self.should_exit = True
+
+    def restart_dead(self) -> None:
+        for index, process in enumerate(self.processes):
+            if not process.is_alive():
+                mark_process_dead(process.pid)
+                logger.warning(
+                    "Worker %s exited with %s, restarting", process.pid, process.exitcode
+                )
+                self.processes[index] = self.start_worker()
+
+    def stop(self, timeout: float) -> None:
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning("Worker %s did not drain in time, killing it", process.pid)
+                process.kill()
+                process.join()
+            mark_process_dead(process.pid)
+
+    def run(self, graceful_timeout: float) -> None:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self.handle_exit)
+        self.processes = [self.start_worker() for _ in range(self.workers)]
+        logger.info("Started %s workers", self.workers)
+        while not self.should_exit:
+            time.sleep(SUPERVISE_INTERVAL_SECONDS)
+            if not self.should_exit:
+                self.restart_dead()
+        logger.info("Stopping workers")
+        self.stop(graceful_timeout + KILL_GRACE_SECONDS)
+
+
+def run(options: ServerOptions) -> None:
+    reuse_port = options.reuse_port and hasattr(socket, "SO_REUSEPORT")
+    # Without SO_REUSEPORT the socket is bound once here and inherited by
+    # every worker (pre-fork); with it each worker binds its own listener and
+    # the kernel balances connections between them.
+    shared = None if reuse_port else bind_socket(options.host, options.port, reuse_port=False)
+    # Workers write metrics to files in this directory so that /metrics on any
+    # of them reports totals for the whole server.
+    os.environ.setdefault(MULTIPROC_ENV, tempfile.mkdtemp(prefix="order-service-metrics-"))
+    prepare_multiprocess_dir()
+    context = multiprocessing.get_context("spawn")
+
+    def start_worker() -> BaseProcess:
+        process = context.Process(target=serve, args=(options, shared), daemon=False)
+        process.start()
+        return process
+
+    try:
+        Supervisor(start_worker, options.workers).run(options.graceful_timeout)
+    finally:
+        if shared is not None:
+            shared.close()
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--host", default=settings.web_host)
+    parser.add_argument("--port", type=int, default=settings.web_port)
+    parser.add_argument("--workers", type=int, default=settings.web_workers)
+    parser.add_argument(
+        "--no-reuse-port", dest="reuse_port", action="store_false", default=settings.web_reuse_port
+    )
+    parser.add_argument(
+        "--graceful-timeout", type=float, default=settings.web_graceful_timeout_seconds
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper())
+    run(
+        ServerOptions(
+            host=args.host,
+            port=args.port,
+            workers=args.workers or os.cpu_count() or 1,
+            reuse_port=args.reuse_port,
+            graceful_timeout=args.graceful_timeout,
+            log_level=args.log_level,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal, order_shard
+from app.db.sharding import get_shard_map
+from app.models.archive import ArchivedOrder
+from app.models.order import Order, OrderStatus
+
+logger = logging.getLogger(__name__)
+
+ARCHIVABLE_STATUSES = (OrderStatus.SHIPPED, OrderStatus.CANCELED)
+SEGMENT_COLUMNS = ("id", "user_id", "items", "total_price", "status", "created_at")
+
+
+@dataclass
+class ArchiveStats:
+    orders: int = 0
+    segments: int = 0
+    bytes_written: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def orders_per_second(self) -> float:
+        return self.orders / self.elapsed if self.elapsed else 0.0
+
+
+def encode_segment(orders: list[Order]) -> bytes:
+    columns: dict[str, list[Any]] = {
+        "id": [order.id for order in orders],
+        "user_id": [order.user_id for order in orders],
+        "items": [order.items for order in orders],
+        "total_price": [order.total_price for order in orders],
+        "status": [OrderStatus(order.status).value for order in orders],
+        "created_at": [order.created_at.isoformat() for order in orders],
+    }
+    payload = json.dumps(columns, separators=(",", ":")).encode("utf-8")
+    return gzip.compress(payload, compresslevel=9, mtime=0)
+
+
+def decode_segment_row(data: bytes, position: int) -> dict[str, Any]:
+    columns = json.loads(gzip.decompress(data))
+    row = {name: columns[name][position] for name in SEGMENT_COLUMNS}
+    row["status"] = OrderStatus(row["status"])
+    row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return row
+
+
+def write_segment(archive_dir: Path, month: str, orders: list[Order]) -> tuple[str, int]:
+    segment = f"{month}/{orders[0].id}.json.gz"
+    path = archive_dir / segment
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = encode_segment(orders)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return segment, len(data)
+
+
+def read_segment_row(archive_dir: Path, segment: str, position: int) -> dict[str, Any]:
+    return decode_segment_row((archive_dir / segment).read_bytes(), position)
+
+
+async def get_archived_order(db: AsyncSession, order_id: str) -> Order | None:
+    query = select(ArchivedOrder).where(ArchivedOrder.order_id == order_id)
+    for shard in get_shard_map().shards_for_order(order_id):
+        with order_shard(db, shard):
+            result = await db.execute(query)
+        entry = result.scalar_one_or_none()
+        if entry is not None:
+            break
+    else:
+        return None
+    archive_dir = Path(get_settings().archive_dir)
+    row = await asyncio.to_thread(read_segment_row, archive_dir, entry.segment, entry.position)
+    return Order(**row)
+
+
+async def archive_batch(
+    db: AsyncSession,
+    archive_dir: Path,
+    cutoff: datetime,
+    batch_size: int,
+) -> tuple[int, int, int]:
+    result = await db.execute(
+        select(Order)
+        .where(Order.status.in_(ARCHIVABLE_STATUSES), Order.created_at < cutoff)
+        .order_by(Order.created_at, Order.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    orders = list(result.scalars().all())
+    if not orders:
+        return 0, 0, 0
+
+    segments = 0
+    bytes_written = 0
+    for month, group in groupby(orders, key=lambda order: f"{order.created_at:%Y-%m}"):
+        month_orders = list(group)
+        segment, size = await asyncio.to_thread(write_segment, archive_dir, month, month_orders)
+        db.add_all(
+            ArchivedOrder(
+                order_id=order.id,
+                user_id=order.user_id,
+                segment=segment,
+                position=position,
+                status=order.status,
+                total_price=order.total_price,
+            )
+            for position, order in enumerate(month_orders)
+        )
+        segments += 1
+        bytes_written += size
+
+    await db.execute(
+        delete(Order)
+        .where(Order.id.in_([order.id for order in orders]))
+        .where(Order.created_at < cutoff)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return len(orders), segments, bytes_written
+
+
+async def run_archive(
+    older_than_days: int,
+    batch_size: int,
+    max_batches: int | None = None,
+) -> ArchiveStats:
+    archive_dir = Path(get_settings().archive_dir)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    stats = ArchiveStats()
+    started = time.monotonic()
+    batches = 0
+    for shard in range(get_shard_map().shards):
+        while max_batches is None or batches < max_batches:
+            async with AsyncSessionLocal() as db:
+                with order_shard(db, shard):
+                    archived, segments, size = await archive_batch(
+                        db, archive_dir, cutoff, batch_size
+                    )
+            if not archived:
+                break
+            batches += 1
+            stats.orders += archived
+            stats.segments += segments
+            stats.bytes_written += size
+            stats.elapsed = time.monotonic() - started
+            logger.info(
+                "Archived %s orders in %s segments (%.0f orders/s, %.1f MiB written)",
+                stats.orders,
+                stats.segments,
+                stats.orders_per_second,
+                stats.bytes_written / 2**20,
+            )
+    stats.elapsed = time.monotonic() - started
+    return stats
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Move old SHIPPED/CANCELED orders to the archive")
+    parser.add_argument("--older-than-days", type=int, default=settings.archive_after_days)
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    stats = asyncio.run(run_archive(args.older_than_days, args.batch_size, args.max_batches))
+    logger.info(
+        "Archive run finished: %s orders, %s segments, %.0f orders/s",
+        stats.orders,
+        stats.segments,
+        stats.orders_per_second,
+    )
+
+
+if __name__ == "__main__":
+    main()
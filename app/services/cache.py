@@ -1,9 +1,11 @@
-import json
-
 from fastapi import Request
 from redis.asyncio import Redis
 
-from app.schemas.order import OrderRead
+from app.core.metrics import CACHE_REQUESTS
+from app.core.resilience import call_or_skip, redis_breaker
+from app.schemas.order import OrderRead, StoredOrderRead
+
+SKIPPED = object()
 
 
 async def get_redis(request: Request) -> Redis:
@@ -11,12 +13,20 @@ async def get_redis(request: Request) -> Redis:
 
 
 async def get_cached_order(redis: Redis, order_id: str) -> OrderRead | None:
-    cached = await redis.get(f"order:{order_id}")
+    cached = await call_or_skip(
+        redis_breaker(), lambda: redis.get(f"order:{order_id}"), default=SKIPPED
+    )
+    if cached is SKIPPED:
+        CACHE_REQUESTS.labels("skipped").inc()
+        return None
     if not cached:
+        CACHE_REQUESTS.labels("miss").inc()
         return None
-    data = json.loads(cached)
-    return OrderRead.model_validate(data)
+    CACHE_REQUESTS.labels("hit").inc()
+    return StoredOrderRead.model_validate_json(cached)
 
 
 async def set_cached_order(redis: Redis, order: OrderRead) -> None:
-    await redis.setex(f"order:{order.id}", 300, order.model_dump_json())
+    await call_or_skip(
+        redis_breaker(), lambda: redis.setex(f"order:{order.id}", 300, order.model_dump_json())
+    )
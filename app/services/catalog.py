@@ -0,0 +1,171 @@
+import asyncio
+import json
+import logging
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import numpy as np
+from fastapi import Request
+from sqlalchemy import pool, select
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.metrics import ORDER_PRICING, PRICE_CATALOG_PRODUCTS
+from app.models.product import Product
+from app.schemas.order import OrderItem
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "product_changes"
+KEEPALIVE_SECONDS = 30.0
+RECONNECT_DELAY_SECONDS = 1.0
+MAX_RECONNECT_DELAY_SECONDS = 30.0
+# Slot 0 always holds the "unknown" marker, so an id missing from the slot
+# map resolves to it without a separate mask.
+MISSING = 0
+ABSENT = -1
+
+
+class CatalogUnavailable(Exception):
+    pass
+
+
+class UnknownProducts(Exception):
+    def __init__(self, product_ids: list[str]) -> None:
+        super().__init__(", ".join(product_ids))
+        self.product_ids = product_ids
+
+
+class PriceMismatch(Exception):
+    def __init__(self, expected_total: float) -> None:
+        super().__init__(f"expected total {expected_total:.2f}")
+        self.expected_total = expected_total
+
+
+# Prices live in one int64 array of cents indexed by a per-process slot number,
+# so repricing an order is one gather and one dot product however many items
+# it has. The array is loaded once and then kept current by NOTIFYs from the
+# trigger on the products table.
+class PriceCatalog:
+    def __init__(self, capacity: int = 1024) -> None:
+        self.slots: dict[str, int] = {}
+        self.cents = np.full(max(capacity, 2), ABSENT, dtype=np.int64)
+        self.products = 0
+        self.loaded = False
+
+    def load(self, rows: Iterable[tuple[str, int]]) -> None:
+        ids, cents = [], []
+        for product_id, price_cents in rows:
+            ids.append(product_id)
+            cents.append(price_cents)
+        table = np.full(max(len(self.cents), 2 * (len(ids) + 1)), ABSENT, dtype=np.int64)
+        table[1 : len(ids) + 1] = cents
+        self.slots = {product_id: slot for slot, product_id in enumerate(ids, start=1)}
+        self.cents = table
+        self.products = len(ids)
+        self.loaded = True
+        PRICE_CATALOG_PRODUCTS.set(self.products)
+
+    def set_price(self, product_id: str, price_cents: int | None) -> None:
+        slot = self.slots.get(product_id)
+        if slot is None:
+            if price_cents is None:
+                return
+            slot = len(self.slots) + 1
+            if slot == len(self.cents):
+                grown = np.full(2 * len(self.cents), ABSENT, dtype=np.int64)
+                grown[: len(self.cents)] = self.cents
+                self.cents = grown
+            self.slots[product_id] = slot
+        was_present = bool(self.cents[slot] != ABSENT)
+        self.cents[slot] = ABSENT if price_cents is None else price_cents
+        self.products += (price_cents is not None) - was_present
+        PRICE_CATALOG_PRODUCTS.set(self.products)
+
+    def price_cents(self, product_id: str) -> int | None:
+        price = int(self.cents[self.slots.get(product_id, MISSING)])
+        return None if price == ABSENT else price
+
+    def reprice(self, items: Sequence[OrderItem]) -> tuple[np.ndarray, int]:
+        if not self.loaded:
+            raise CatalogUnavailable
+        count = len(items)
+        slots = np.fromiter(
+            (self.slots.get(item.product_id, MISSING) for item in items), np.intp, count
+        )
+        quantities = np.fromiter((item.quantity for item in items), np.int64, count)
+        unit = self.cents[slots]
+        missing = unit == ABSENT
+        if missing.any():
+            raise UnknownProducts(
+                sorted({items[index].product_id for index in np.flatnonzero(missing)})
+            )
+        if count * int(quantities.max()) * int(unit.max()) > np.iinfo(np.int64).max:
+            raise OverflowError("Order total is out of range")
+        return unit, int(quantities @ unit)
+
+    def price_order(
+        self, items: Sequence[OrderItem], total_price: float
+    ) -> tuple[list[dict[str, Any]], float]:
+        try:
+            unit, total = self.reprice(items)
+        except CatalogUnavailable:
+            ORDER_PRICING.labels("unavailable").inc()
+            raise
+        except UnknownProducts:
+            ORDER_PRICING.labels("unknown_product").inc()
+            raise
+        if total != round(total_price * 100):
+            ORDER_PRICING.labels("mismatch").inc()
+            raise PriceMismatch(total / 100)
+        ORDER_PRICING.labels("ok").inc()
+        priced = [
+            {"product_id": item.product_id, "quantity": item.quantity, "price": price}
+            for item, price in zip(items, (unit / 100).tolist(), strict=True)
+        ]
+        return priced, total / 100
+
+    def on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            change = json.loads(payload)
+            self.set_price(change["id"], change["price_cents"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed product change %r", payload)
+
+    async def listen(self, engine: AsyncEngine) -> None:
+        async with engine.connect() as conn:
+            driver = (await conn.get_raw_connection()).driver_connection
+            # Subscribe before taking the snapshot so no change falls in between;
+            # notifications that arrive during the load are applied after it.
+            await driver.add_listener(CHANNEL, self.on_notification)
+            result = await conn.execute(select(Product.id, Product.price_cents))
+            self.load(result.all())
+            await conn.rollback()
+            logger.info("Price catalog loaded, %s products", self.products)
+            while True:
+                await asyncio.sleep(KEEPALIVE_SECONDS)
+                await driver.execute("SELECT 1")
+
+    async def run(self, dsn: str) -> None:
+        engine = create_async_engine(dsn, poolclass=pool.NullPool)
+        delay = RECONNECT_DELAY_SECONDS
+        try:
+            while True:
+                try:
+                    await self.listen(engine)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    if self.loaded:
+                        delay = RECONNECT_DELAY_SECONDS
+                    # Changes made while disconnected are missed, so orders are
+                    # refused until the catalog is reloaded.
+                    self.loaded = False
+                    logger.exception("Price catalog listener failed, reconnecting in %ss", delay)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+        finally:
+            await engine.dispose()
+
+
+async def get_price_catalog(request: Request) -> PriceCatalog:
+    return request.app.state.price_catalog
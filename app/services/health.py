@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from fastapi import Request
+from redis.asyncio import Redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.messaging.producer import get_kafka_producer
+
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+UNAVAILABLE = "unavailable"
+TIMEOUT = "timeout"
+UNKNOWN = "unknown"
+
+
+@dataclass
+class Probe:
+    name: str
+    check: Callable[[], Awaitable[object]]
+    timeout: float
+    critical: bool = True
+
+
+@dataclass
+class ProbeResult:
+    status: str
+    latency_ms: float | None
+    checked_at: datetime | None
+
+
+def postgres_probe(engine: AsyncEngine, timeout: float) -> Probe:
+    async def check() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    return Probe("postgres", check, timeout)
+
+
+def redis_probe(redis: Redis, timeout: float) -> Probe:
+    return Probe("redis", redis.ping, timeout)
+
+
+def kafka_probe(timeout: float) -> Probe:
+    async def check() -> None:
+        await get_kafka_producer().client.fetch_all_metadata()
+
+    # Events are spooled while Kafka is unreachable, so it does not gate readiness.
+    return Probe("kafka", check, timeout, critical=False)
+
+
+class HealthMonitor:
+    def __init__(self, probes: list[Probe], interval: float) -> None:
+        self.probes = probes
+        self.interval = interval
+        self.results = {probe.name: ProbeResult(UNKNOWN, None, None) for probe in probes}
+
+    async def run_probe(self, probe: Probe) -> ProbeResult:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe.check(), timeout=probe.timeout)
+            status = OK
+        except TimeoutError:
+            status = TIMEOUT
+        except Exception:
+            logger.debug("Health probe %s failed", probe.name, exc_info=True)
+            status = UNAVAILABLE
+        latency_ms = (time.perf_counter() - started) * 1000
+        return ProbeResult(status, round(latency_ms, 2), datetime.now(timezone.utc))
+
+    async def refresh(self) -> None:
+        results = await asyncio.gather(*(self.run_probe(probe) for probe in self.probes))
+        for probe, result in zip(self.probes, results, strict=True):
+            if result.status != OK and self.results[probe.name].status == OK:
+                logger.warning("%s became %s", probe.name, result.status)
+            self.results[probe.name] = result
+
+    async def run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def current(self) -> dict[str, ProbeResult]:
+        # Results older than a few intervals mean the monitor itself stopped,
+        # so they must not keep reporting a dependency as healthy.
+        stale_before = (
+            time.time() - self.interval * 3 - max((p.timeout for p in self.probes), default=0)
+        )
+        results = {}
+        for name, result in self.results.items():
+            if result.checked_at is not None and result.checked_at.timestamp() < stale_before:
+                result = ProbeResult(UNKNOWN, result.latency_ms, result.checked_at)
+            results[name] = result
+        return results
+
+    def is_ready(self, results: dict[str, ProbeResult]) -> bool:
+        return all(results[probe.name].status == OK for probe in self.probes if probe.critical)
+
+
+async def get_health_monitor(request: Request) -> HealthMonitor:
+    return request.app.state.health_monitor
@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.resilience import CircuitOpenError, call_or_skip, redis_breaker
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+IN_PROGRESS = "in_progress"
+DONE = "done"
+
+
+class IdempotencyKeyMismatch(Exception):
+    pass
+
+
+class IdempotencyKeyInProgress(Exception):
+    pass
+
+
+class IdempotencyUnavailable(Exception):
+    pass
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    body: str
+
+
+def stored_response_key(user_id: int, key: str) -> str:
+    return f"idempotency:{user_id}:{key}"
+
+
+def request_fingerprint(body: str) -> str:
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+async def checked_call(func: Callable[[], Awaitable[T]]) -> T:
+    try:
+        return await redis_breaker().call(func)
+    except (CircuitOpenError, RedisError, TimeoutError) as exc:
+        raise IdempotencyUnavailable from exc
+
+
+async def begin_request(
+    redis: Redis,
+    key: str,
+    fingerprint: str,
+    lock_ttl: int,
+    wait_timeout: float,
+    poll_interval: float = 0.05,
+) -> StoredResponse | None:
+    marker = json.dumps({"state": IN_PROGRESS, "fingerprint": fingerprint})
+    deadline = time.monotonic() + wait_timeout
+    while True:
+        if await checked_call(lambda: redis.set(key, marker, nx=True, ex=lock_ttl)):
+            return None
+        raw = await checked_call(lambda: redis.get(key))
+        if raw is not None:
+            data = json.loads(raw)
+            if data["fingerprint"] != fingerprint:
+                raise IdempotencyKeyMismatch
+            if data["state"] == DONE:
+                return StoredResponse(status_code=data["status_code"], body=data["body"])
+        if time.monotonic() >= deadline:
+            raise IdempotencyKeyInProgress
+        await asyncio.sleep(poll_interval)
+
+
+async def complete_request(
+    redis: Redis,
+    key: str,
+    fingerprint: str,
+    response: StoredResponse,
+    ttl: int,
+) -> None:
+    data = {
+        "state": DONE,
+        "fingerprint": fingerprint,
+        "status_code": response.status_code,
+        "body": response.body,
+    }
+    # The order exists at this point, so a failure here must not fail the
+    # request. Retries get 409 until the in-progress marker expires.
+    stored = await call_or_skip(
+        redis_breaker(), lambda: redis.set(key, json.dumps(data), ex=ttl), default=False
+    )
+    if not stored:
+        logger.warning("Could not store the response for %s, replays are not possible", key)
+
+
+async def release_request(redis: Redis, key: str) -> None:
+    # If this fails the marker expires after the lock TTL.
+    await call_or_skip(redis_breaker(), lambda: redis.delete(key))
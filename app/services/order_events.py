@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from typing import Any
+
+from fastapi import Request
+from redis.asyncio import Redis
+
+from app.schemas.order import OrderRead
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "order_events:"
+RECONNECT_DELAY_SECONDS = 1.0
+MAX_RECONNECT_DELAY_SECONDS = 30.0
+CLOSE = ""
+
+
+def order_channel(user_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{user_id}"
+
+
+def encode_event(event: str, data: dict[str, Any]) -> str:
+    return json.dumps({"event": event, "data": data})
+
+
+async def publish_order_update(redis: Redis, order: OrderRead) -> None:
+    await redis.publish(
+        order_channel(order.user_id), encode_event("status", order.model_dump(mode="json"))
+    )
+
+
+def format_sse(message: str) -> str:
+    payload = json.loads(message)
+    return f"event: {payload['event']}\ndata: {json.dumps(payload['data'])}\n\n"
+
+
+class Subscription:
+    def __init__(self, user_id: int, buffer_size: int) -> None:
+        self.user_id = user_id
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=buffer_size)
+        self.overflowed = False
+
+    def push(self, frame: str) -> None:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def close(self) -> None:
+        # The close marker must get through even when the buffer is full.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(CLOSE)
+
+
+class OrderEventHub:
+    def __init__(self, redis: Redis, buffer_size: int, heartbeat_seconds: float) -> None:
+        self.redis = redis
+        self.buffer_size = buffer_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.subscriptions: dict[int, set[Subscription]] = defaultdict(set)
+        self.closed = False
+
+    @property
+    def client_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self.subscriptions.values())
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.buffer_size)
+        self.subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self.subscriptions.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self.subscriptions[subscription.user_id]
+
+    def close(self) -> None:
+        self.closed = True
+        for subscriptions in self.subscriptions.values():
+            for subscription in subscriptions:
+                subscription.close()
+
+    def dispatch(self, channel: str, message: str) -> None:
+        try:
+            user_id = int(channel.removeprefix(CHANNEL_PREFIX))
+        except ValueError:
+            return
+        subscriptions = self.subscriptions.get(user_id)
+        if not subscriptions:
+            return
+        try:
+            frame = format_sse(message)
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed order event %r on %s", message, channel)
+            return
+        for subscription in list(subscriptions):
+            subscription.push(frame)
+
+    async def listen(self) -> None:
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+            async for message in pubsub.listen():
+                if message["type"] == "pmessage":
+                    self.dispatch(message["channel"], message["data"])
+        finally:
+            await pubsub.aclose()
+
+    async def run(self) -> None:
+        delay = RECONNECT_DELAY_SECONDS
+        while True:
+            try:
+                await self.listen()
+                delay = RECONNECT_DELAY_SECONDS
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Order event subscription failed, reconnecting in %ss", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+
+    async def stream(self, user_id: int) -> AsyncIterator[str]:
+        subscription = self.subscribe(user_id)
+        if self.closed:
+            subscription.close()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=self.heartbeat_seconds
+                    )
+                except TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if frame == CLOSE:
+                    return
+                yield frame
+                if subscription.overflowed and subscription.queue.empty():
+                    yield "event: overflow\ndata: {}\n\n"
+                    return
+        finally:
+            self.unsubscribe(subscription)
+
+
+async def get_order_event_hub(request: Request) -> OrderEventHub:
+    return request.app.state.order_events
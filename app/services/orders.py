@@ -1,8 +1,21 @@
+from datetime import datetime, timezone
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.order import Order, OrderStatus
+from app.db.session import order_shard, read_only
+from app.db.sharding import get_shard_map
+from app.models.order import (
+    ORDER_ID_CLOCK_SKEW,
+    Order,
+    OrderStatus,
+    new_order_id,
+    order_id_timestamp,
+    user_bucket,
+)
 from app.schemas.order import OrderItem
+from app.services.archive import get_archived_order
+from app.services.catalog import PriceCatalog
 
 
 async def create_order(
@@ -10,23 +23,51 @@ async def create_order(
     user_id: int,
     items: list[OrderItem],
     total_price: float,
+    catalog: PriceCatalog,
 ) -> Order:
-    items_dict = [item.model_dump() for item in items]
+    items_dict, total_price = catalog.price_order(items, total_price)
+    created_at = datetime.now(timezone.utc)
     order = Order(
+        id=new_order_id(created_at, user_bucket(user_id)),
         user_id=user_id,
         items=items_dict,
         total_price=total_price,
         status=OrderStatus.PENDING,
+        created_at=created_at,
     )
-    db.add(order)
-    await db.commit()
-    await db.refresh(order)
+    with order_shard(db, get_shard_map().shard_for_user(user_id)):
+        db.add(order)
+        await db.commit()
+        await db.refresh(order)
     return order
 
 
-async def get_order(db: AsyncSession, order_id: str) -> Order | None:
-    result = await db.execute(select(Order).where(Order.id == order_id))
-    return result.scalar_one_or_none()
+@read_only
+async def get_order(
+    db: AsyncSession,
+    order_id: str,
+    include_archived: bool = True,
+) -> Order | None:
+    query = select(Order).where(Order.id == order_id)
+    created_at = order_id_timestamp(order_id)
+    if created_at is not None:
+        query = query.where(
+            Order.created_at >= created_at - ORDER_ID_CLOCK_SKEW,
+            Order.created_at < created_at + ORDER_ID_CLOCK_SKEW,
+        )
+    order = None
+    for shard in get_shard_map().shards_for_order(order_id):
+        with order_shard(db, shard):
+            result = await db.execute(query)
+        order = result.scalar_one_or_none()
+        if order is not None:
+            # During a rebalance the row may still sit on another shard than
+            # the user's; writes must go where it was read from.
+            db.info.setdefault("order_shards", {})[order.id] = shard
+            break
+    if order is None and include_archived:
+        order = await get_archived_order(db, order_id)
+    return order
 
 
 async def update_order_status(
@@ -34,12 +75,58 @@ async def update_order_status(
     order: Order,
     status: OrderStatus,
 ) -> Order:
-    order.status = status
-    await db.commit()
-    await db.refresh(order)
+    shard = db.info.get("order_shards", {}).get(order.id)
+    if shard is None:
+        shard = get_shard_map().shard_for_user(order.user_id)
+    with order_shard(db, shard):
+        order.status = status
+        await db.commit()
+        await db.refresh(order)
     return order
 
 
-async def get_user_orders(db: AsyncSession, user_id: int) -> list[Order]:
-    result = await db.execute(select(Order).where(Order.user_id == user_id))
-    return list(result.scalars().all())
+@read_only
+async def get_user_orders(
+    db: AsyncSession,
+    user_id: int,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> list[Order]:
+    query = select(Order).where(Order.user_id == user_id)
+    if created_from is not None:
+        query = query.where(Order.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(Order.created_at < created_to)
+    results = []
+    for shard in get_shard_map().shards_for_user(user_id):
+        with order_shard(db, shard):
+            results.append((await db.execute(query.order_by(Order.created_at))).scalars().all())
+    if len(results) == 1:
+        return list(results[0])
+    # An order being moved by a rebalance can be seen on both shards.
+    orders = {order.id: order for result in results for order in result}
+    return sorted(orders.values(), key=lambda order: order.created_at)
+
+
+@read_only
+async def get_orders_by_product(
+    db: AsyncSession,
+    product_id: str,
+    user_id: int | None = None,
+    limit: int = 100,
+) -> list[Order]:
+    query = select(Order).where(Order.items.contains([{"product_id": product_id}]))
+    shard_map = get_shard_map()
+    shards = range(shard_map.shards)
+    if user_id is not None:
+        query = query.where(Order.user_id == user_id)
+        shards = shard_map.shards_for_user(user_id)
+    query = query.order_by(Order.created_at.desc()).limit(limit)
+    results = []
+    for shard in shards:
+        with order_shard(db, shard):
+            results.append((await db.execute(query)).scalars().all())
+    if len(results) == 1:
+        return list(results[0])
+    orders = {order.id: order for result in results for order in result}
+    return sorted(orders.values(), key=lambda order: order.created_at, reverse=True)[:limit]
@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal, order_shard, read_only
+from app.db.sharding import get_shard_map
+from app.models.order import Order
+from app.models.rollup import OrderRollup, RollupOffset
+
+logger = logging.getLogger(__name__)
+
+
+class Granularity(str, Enum):
+    MINUTE = "minute"
+    HOUR = "hour"
+    DAY = "day"
+
+
+def bucket_start(value: datetime, granularity: Granularity) -> datetime:
+    value = value.astimezone(timezone.utc)
+    if granularity is Granularity.MINUTE:
+        return value.replace(second=0, microsecond=0)
+    if granularity is Granularity.HOUR:
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+Partition = tuple[str, int]
+
+
+class RollupRangeArchived(ValueError):
+    pass
+
+
+class RollupRangeTooRecent(ValueError):
+    pass
+
+
+# Every flush stores the last Kafka offset it covers per partition in the same
+# transaction as the counters. Messages redelivered because the consumer died
+# between the flush and the offset commit are recognised and skipped.
+class RollupAggregator:
+    def __init__(self) -> None:
+        self.buckets: dict[tuple[Granularity, datetime], list[float]] = {}
+        self.pending_events = 0
+        self.offsets: dict[Partition, int] = {}
+        self.applied: dict[Partition, int] = {}
+
+    def is_applied(self, topic: str, partition: int, offset: int) -> bool:
+        return offset <= self.applied.get((topic, partition), -1)
+
+    def add(
+        self,
+        created_at: datetime,
+        total_price: float,
+        position: tuple[str, int, int] | None = None,
+    ) -> None:
+        for granularity in Granularity:
+            key = (granularity, bucket_start(created_at, granularity))
+            bucket = self.buckets.setdefault(key, [0, 0.0])
+            bucket[0] += 1
+            bucket[1] += total_price
+        self.pending_events += 1
+        if position is not None:
+            topic, partition, offset = position
+            self.offsets[(topic, partition)] = max(offset, self.offsets.get((topic, partition), -1))
+
+    def merge(
+        self,
+        buckets: dict[tuple[Granularity, datetime], list[float]],
+        events: int,
+        offsets: dict[Partition, int],
+    ) -> None:
+        for key, (count, revenue) in buckets.items():
+            bucket = self.buckets.setdefault(key, [0, 0.0])
+            bucket[0] += count
+            bucket[1] += revenue
+        self.pending_events += events
+        for key, offset in offsets.items():
+            self.offsets[key] = max(offset, self.offsets.get(key, -1))
+
+    async def load_offsets(self, db: AsyncSession) -> None:
+        result = await db.execute(select(RollupOffset))
+        self.applied = {(row.topic, row.partition): row.offset for row in result.scalars()}
+
+    async def flush(self, db: AsyncSession) -> int:
+        if not self.buckets:
+            return 0
+        buckets, events, offsets = self.buckets, self.pending_events, self.offsets
+        self.buckets, self.pending_events, self.offsets = {}, 0, {}
+        rows = [
+            {
+                "granularity": granularity.value,
+                "bucket_start": start,
+                "order_count": int(count),
+                "revenue": revenue,
+            }
+            for (granularity, start), (count, revenue) in sorted(buckets.items())
+        ]
+        statement = pg_insert(OrderRollup).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[OrderRollup.granularity, OrderRollup.bucket_start],
+            set_={
+                "order_count": OrderRollup.order_count + statement.excluded.order_count,
+                "revenue": OrderRollup.revenue + statement.excluded.revenue,
+            },
+        )
+        try:
+            await db.execute(statement)
+            if offsets:
+                positions = pg_insert(RollupOffset).values(
+                    [
+                        {"topic": topic, "partition": partition, "offset": offset}
+                        for (topic, partition), offset in sorted(offsets.items())
+                    ]
+                )
+                await db.execute(
+                    positions.on_conflict_do_update(
+                        index_elements=[RollupOffset.topic, RollupOffset.partition],
+                        set_={
+                            "offset": func.greatest(RollupOffset.offset, positions.excluded.offset)
+                        },
+                    )
+                )
+            await db.commit()
+        except Exception:
+            self.merge(buckets, events, offsets)
+            raise
+        self.applied.update(
+            {key: max(offset, self.applied.get(key, -1)) for key, offset in offsets.items()}
+        )
+        return events
+
+
+@read_only
+async def get_rollups(
+    db: AsyncSession,
+    granularity: Granularity,
+    start: datetime,
+    end: datetime,
+) -> list[OrderRollup]:
+    result = await db.execute(
+        select(OrderRollup)
+        .where(
+            OrderRollup.granularity == granularity.value,
+            OrderRollup.bucket_start >= start,
+            OrderRollup.bucket_start < end,
+        )
+        .order_by(OrderRollup.bucket_start)
+    )
+    return list(result.scalars().all())
+
+
+def archive_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=get_settings().archive_after_days)
+
+
+def rebuild_horizon() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(minutes=get_settings().rollup_rebuild_lag_minutes)
+
+
+def check_rebuild_range(start: datetime, end: datetime) -> None:
+    # Orders older than the cutoff may already be archived and are no longer
+    # in the orders table; their buckets are kept as the consumer built them.
+    cutoff = archive_cutoff()
+    if start < cutoff:
+        raise RollupRangeArchived(
+            f"Rollups before {cutoff:%Y-%m-%d %H:%M} cover archived orders and "
+            "cannot be rebuilt from the orders table"
+        )
+    # The consumer keeps adding events it has aggregated but not flushed yet;
+    # replacing buckets that still receive them would count those orders twice.
+    horizon = rebuild_horizon()
+    if end > horizon:
+        raise RollupRangeTooRecent(
+            f"Rollups after {horizon:%Y-%m-%d %H:%M} may still receive events from the "
+            "consumer and cannot be rebuilt"
+        )
+
+
+async def rebuild_range(db: AsyncSession, start: datetime, end: datetime) -> None:
+    check_rebuild_range(start, end)
+    # Orders are spread over the shards while rollups live on the main
+    # database, so buckets are summed across shards before they are replaced.
+    shards = range(get_shard_map().shards)
+    for granularity in Granularity:
+        bucket = func.timezone(
+            "UTC", func.date_trunc(granularity.value, func.timezone("UTC", Order.created_at))
+        )
+        query = (
+            select(bucket, func.count(), func.coalesce(func.sum(Order.total_price), 0))
+            .where(Order.created_at >= start, Order.created_at < end)
+            .group_by(bucket)
+        )
+        totals: dict[datetime, list[float]] = {}
+        for shard in shards:
+            with order_shard(db, shard):
+                result = await db.execute(query)
+            for bucket_start_, count, revenue in result.all():
+                total = totals.setdefault(bucket_start_, [0, 0.0])
+                total[0] += count
+                total[1] += revenue
+        await db.execute(
+            delete(OrderRollup).where(
+                OrderRollup.granularity == granularity.value,
+                OrderRollup.bucket_start >= start,
+                OrderRollup.bucket_start < end,
+            )
+        )
+        if totals:
+            await db.execute(
+                insert(OrderRollup),
+                [
+                    {
+                        "granularity": granularity.value,
+                        "bucket_start": bucket_start_,
+                        "order_count": int(count),
+                        "revenue": revenue,
+                    }
+                    for bucket_start_, (count, revenue) in sorted(totals.items())
+                ],
+            )
+
+
+async def backfill_rollups(start: datetime, end: datetime) -> int:
+    day = bucket_start(start, Granularity.DAY)
+    end = bucket_start(end, Granularity.DAY) + timedelta(days=1)
+    check_rebuild_range(day, end)
+    days = 0
+    while day < end:
+        async with AsyncSessionLocal() as db:
+            await rebuild_range(db, day, day + timedelta(days=1))
+            await db.commit()
+        days += 1
+        logger.info("Rebuilt rollups for %s", day.date().isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def parse_date(value: str) -> datetime:
+    return as_utc(datetime.fromisoformat(value))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild order rollups from order history",
+        epilog="Days ending less than ROLLUP_REBUILD_LAG_MINUTES ago are refused, since the "
+        "consumer may still add their events. If the consumer lags further behind, stop it "
+        "or wait until it catches up.",
+    )
+    parser.add_argument("--start", type=parse_date, required=True)
+    parser.add_argument(
+        "--end", type=parse_date, help="Last day to rebuild, defaults to the last finished day"
+    )
+    args = parser.parse_args()
+    end = args.end or rebuild_horizon() - timedelta(days=1)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        days = asyncio.run(backfill_rollups(args.start, end))
+    except (RollupRangeArchived, RollupRangeTooRecent) as exc:
+        parser.error(str(exc))
+    logger.info("Backfill complete, %s days rebuilt", days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+
+from redis.asyncio import Redis, from_url
+from sqlalchemy import Select, func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.resilience import call_or_skip, redis_breaker
+from app.db.session import AsyncSessionLocal, order_shard, read_only
+from app.db.sharding import get_shard_map
+from app.models.archive import ArchivedOrder
+from app.models.order import Order, OrderStatus
+from app.models.user import User
+from app.schemas.order import OrderRead, OrderStatusSummary, OrderSummary
+
+logger = logging.getLogger(__name__)
+
+SKIPPED = object()
+
+# Counters are only adjusted once the hash exists, so a user whose summary
+# was never built is not left with partial totals; the first read builds it.
+# Every delta bumps the user's generation, even without a hash, so a build
+# that read the database before the delta's order was committed is dropped.
+# Both keys expire (ARGV[1] seconds) so a hash that missed a delta while Redis
+# was unreachable is rebuilt from the database eventually.
+APPLY_DELTAS = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 2, #ARGV, 3 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i] .. ':count', ARGV[i + 1])
+    redis.call('HINCRBYFLOAT', KEYS[1], ARGV[i] .. ':total', ARGV[i + 2])
+end
+return 1
+"""
+STORE_TOTALS = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+Totals = dict[OrderStatus, tuple[int, float]]
+
+
+def summary_key(user_id: int) -> str:
+    return f"order_summary:{user_id}"
+
+
+def generation_key(user_id: int) -> str:
+    return f"order_summary_generation:{user_id}"
+
+
+async def record_order_created(redis: Redis, order: OrderRead) -> None:
+    await redis.eval(
+        APPLY_DELTAS,
+        2,
+        summary_key(order.user_id),
+        generation_key(order.user_id),
+        get_settings().summary_ttl_seconds,
+        order.status.value,
+        1,
+        order.total_price,
+    )
+
+
+async def record_status_change(redis: Redis, order: OrderRead, previous: OrderStatus) -> None:
+    if previous == order.status:
+        return
+    await redis.eval(
+        APPLY_DELTAS,
+        2,
+        summary_key(order.user_id),
+        generation_key(order.user_id),
+        get_settings().summary_ttl_seconds,
+        previous.value,
+        -1,
+        -order.total_price,
+        order.status.value,
+        1,
+        order.total_price,
+    )
+
+
+def build_summary(user_id: int, totals: Totals) -> OrderSummary:
+    statuses = {}
+    for status in OrderStatus:
+        count, total = totals.get(status, (0, 0.0))
+        statuses[status] = OrderStatusSummary(count=count, total_price=round(total, 2))
+    return OrderSummary(user_id=user_id, statuses=statuses)
+
+
+def parse_summary(user_id: int, data: dict[str, str]) -> OrderSummary:
+    totals = {
+        status: (
+            int(data.get(f"{status.value}:count", 0)),
+            float(data.get(f"{status.value}:total", 0)),
+        )
+        for status in OrderStatus
+    }
+    return build_summary(user_id, totals)
+
+
+def live_totals(user_ids: list[int]) -> Select:
+    return (
+        select(Order.user_id, Order.status, func.count(), func.sum(Order.total_price))
+        .where(Order.user_id.in_(user_ids))
+        .group_by(Order.user_id, Order.status)
+    )
+
+
+def live_rows(user_ids: list[int]) -> Select:
+    return select(Order.id, Order.user_id, Order.status, Order.total_price).where(
+        Order.user_id.in_(user_ids)
+    )
+
+
+@read_only
+async def load_totals(db: AsyncSession, user_ids: list[int]) -> dict[int, Totals]:
+    shard_map = get_shard_map()
+    settled: list[int] = []
+    moving: dict[tuple[int, ...], list[int]] = {}
+    for user_id in user_ids:
+        shards = tuple(shard_map.shards_for_user(user_id))
+        if len(shards) == 1:
+            settled.append(user_id)
+        else:
+            moving.setdefault(shards, []).append(user_id)
+    users_by_shard = shard_map.group_users(settled)
+    archived = (
+        select(
+            ArchivedOrder.user_id,
+            ArchivedOrder.status,
+            func.count(),
+            func.sum(ArchivedOrder.total_price),
+        )
+        .where(ArchivedOrder.user_id.in_(user_ids), ArchivedOrder.status.is_not(None))
+        .group_by(ArchivedOrder.user_id, ArchivedOrder.status)
+    )
+    totals: dict[int, Totals] = {user_id: {} for user_id in user_ids}
+    sums: dict[tuple[int, OrderStatus], list[float]] = defaultdict(lambda: [0, 0.0])
+    # Archive index rows stay on the shard the orders were archived from, which
+    # is not the user's home shard for orders archived before a rebalance.
+    rows = []
+    for shard in range(shard_map.shards):
+        shard_user_ids = users_by_shard.get(shard)
+        query = union_all(live_totals(shard_user_ids), archived) if shard_user_ids else archived
+        with order_shard(db, shard):
+            rows += (await db.execute(query)).all()
+    # Orders of users a rebalance in progress is moving may be on both owners
+    # for a moment; they are fetched row by row and counted once.
+    for shards, moving_user_ids in moving.items():
+        moved: dict[str, list] = {}
+        for shard in shards:
+            with order_shard(db, shard):
+                result = await db.execute(live_rows(moving_user_ids))
+            moved |= {order_id: row for order_id, *row in result.all()}
+        rows += [(user_id, status, 1, total) for user_id, status, total in moved.values()]
+    for user_id, status, count, total in rows:
+        entry = sums[(user_id, OrderStatus(status))]
+        entry[0] += count
+        entry[1] += total or 0.0
+    for (user_id, status), (count, total) in sums.items():
+        totals[user_id][status] = (int(count), total)
+    return totals
+
+
+async def get_generations(redis: Redis, user_ids: list[int]) -> dict[int, str]:
+    generations = await redis.mget([generation_key(user_id) for user_id in user_ids])
+    return {
+        user_id: generation or "0"
+        for user_id, generation in zip(user_ids, generations, strict=True)
+    }
+
+
+async def store_totals(redis: Redis, totals: dict[int, Totals], generations: dict[int, str]) -> int:
+    # Totals are only stored if no delta arrived since the generations were
+    # read before loading them; a dropped user is built again on the next read.
+    ttl = get_settings().summary_ttl_seconds
+    async with redis.pipeline(transaction=True) as pipe:
+        for user_id, user_totals in totals.items():
+            fields: list[str | int | float] = []
+            for status in OrderStatus:
+                count, total = user_totals.get(status, (0, 0.0))
+                fields += [f"{status.value}:count", count, f"{status.value}:total", total]
+            pipe.eval(
+                STORE_TOTALS,
+                2,
+                summary_key(user_id),
+                generation_key(user_id),
+                generations[user_id],
+                ttl,
+                *fields,
+            )
+        return sum(await pipe.execute())
+
+
+async def invalidate_summaries(redis: Redis, user_ids: set[int]) -> None:
+    ttl = get_settings().summary_ttl_seconds
+    async with redis.pipeline(transaction=True) as pipe:
+        for user_id in user_ids:
+            pipe.delete(summary_key(user_id))
+            pipe.incr(generation_key(user_id))
+            pipe.expire(generation_key(user_id), ttl)
+        await pipe.execute()
+
+
+async def record_or_invalidate(
+    redis: Redis, user_id: int, record: Callable[[], Awaitable[None]]
+) -> None:
+    # A delta that failed, timed out or was skipped by an open circuit may or
+    # may not have been applied, so the hash is dropped for the next read to
+    # rebuild. If Redis is unreachable for that too, the hash TTL applies.
+    if await call_or_skip(redis_breaker(), record, default=SKIPPED) is SKIPPED:
+        await call_or_skip(redis_breaker(), lambda: invalidate_summaries(redis, {user_id}))
+
+
+async def get_order_summary(db: AsyncSession, redis: Redis, user_id: int) -> OrderSummary:
+    data = await redis.hgetall(summary_key(user_id))
+    if data:
+        return parse_summary(user_id, data)
+    generations = await get_generations(redis, [user_id])
+    totals = await load_totals(db, [user_id])
+    await store_totals(redis, totals, generations)
+    return build_summary(user_id, totals[user_id])
+
+
+async def rebuild_summaries(redis: Redis, batch_size: int) -> int:
+    after = 0
+    rebuilt = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(User.id).where(User.id > after).order_by(User.id).limit(batch_size)
+            )
+            user_ids = list(result.scalars().all())
+            if not user_ids:
+                break
+            generations = await get_generations(redis, user_ids)
+            totals = await load_totals(db, user_ids)
+        stored = await store_totals(redis, totals, generations)
+        rebuilt += stored
+        after = user_ids[-1]
+        logger.info(
+            "Rebuilt order summaries for %s users, %s changed during the rebuild",
+            rebuilt,
+            len(user_ids) - stored,
+        )
+    return rebuilt
+
+
+async def run_rebuild(batch_size: int) -> int:
+    redis = from_url(get_settings().redis_url, encoding="utf-8", decode_responses=True)
+    try:
+        return await rebuild_summaries(redis, batch_size)
+    finally:
+        await redis.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild per-user order summary counters")
+    parser.add_argument("--batch-size", type=int, default=get_settings().summary_rebuild_batch_size)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    rebuilt = asyncio.run(run_rebuild(args.batch_size))
+    logger.info("Summary rebuild finished for %s users", rebuilt)
+
+
+if __name__ == "__main__":
+    main()
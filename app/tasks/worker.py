@@ -1,19 +1,179 @@
+import asyncio
 import time
+from collections.abc import Coroutine
+from functools import lru_cache
+from typing import Any, TypeVar
 
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_shutdown,
+    worker_ready,
+    worker_shutdown,
+)
+from redis import Redis
 
 from app.core.config import get_settings
 
-settings = get_settings()
+T = TypeVar("T")
 
-celery_app = Celery(
-    "order_service",
-    broker=settings.celery_broker_url,
-    backend=settings.celery_result_backend,
-)
+
+# Service modules, engines and settings are loaded on first use so that
+# importing the app (as the Kafka consumer does to enqueue tasks) stays cheap.
+def celery_config() -> dict[str, Any]:
+    settings = get_settings()
+    return {
+        "broker_url": settings.celery_broker_url,
+        "result_backend": settings.celery_result_backend,
+        "beat_schedule": {
+            "create-order-partitions": {
+                "task": "create_order_partitions",
+                "schedule": crontab(minute=0, hour=3),
+            },
+            "archive-orders": {
+                "task": "archive_orders",
+                "schedule": crontab(minute=30, hour=3),
+            },
+            "rebuild-order-summaries": {
+                "task": "rebuild_order_summaries",
+                "schedule": crontab(minute=0, hour=4),
+            },
+        },
+    }
+
+
+celery_app = Celery("order_service")
+celery_app.add_defaults(celery_config)
+
+
+task_started: dict[str, float] = {}
+task_spans: dict[str, Any] = {}
+
+
+@worker_init.connect
+def prepare_metrics(**kwargs: Any) -> None:
+    from app.core.metrics import prepare_multiprocess_dir
+    from app.core.tracing import configure_tracing
+
+    prepare_multiprocess_dir()
+    configure_tracing("order-service-worker")
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_spans(**kwargs: Any) -> None:
+    from app.core.tracing import shutdown_tracing
+
+    shutdown_tracing()
+
+
+@before_task_publish.connect
+def inject_trace_context(headers: dict[str, Any], **kwargs: Any) -> None:
+    from app.core.tracing import TRACEPARENT, current_traceparent
+
+    traceparent = current_traceparent()
+    if traceparent is not None:
+        headers[TRACEPARENT] = traceparent
+
+
+def request_traceparent(request: Any) -> str | None:
+    from app.core.tracing import TRACEPARENT
+
+    # Custom message headers show up as request attributes or under .headers,
+    # depending on the Celery version and task protocol.
+    return getattr(request, TRACEPARENT, None) or (getattr(request, "headers", None) or {}).get(
+        TRACEPARENT
+    )
+
+
+@worker_ready.connect
+def serve_metrics(**kwargs: Any) -> None:
+    from app.core.metrics import start_metrics_server
+
+    start_metrics_server(get_settings().metrics_port)
+
+
+@task_prerun.connect
+def record_task_start(task_id: str, task: Any, **kwargs: Any) -> None:
+    from app.core.tracing import CONSUMER, begin_span, parse_traceparent
+
+    task_started[task_id] = time.perf_counter()
+    parent = parse_traceparent(request_traceparent(task.request))
+    started = begin_span(f"run {task.name}", CONSUMER, parent, {"celery.task_id": task_id})
+    if started is not None:
+        task_spans[task_id] = started
+
+
+@task_postrun.connect
+def record_task_end(
+    task_id: str, task: Any, retval: Any = None, state: str | None = None, **kwargs: Any
+) -> None:
+    from app.core.metrics import TASK_DURATION, TASKS
+    from app.core.tracing import finish_span
+
+    error = retval if state == "FAILURE" and isinstance(retval, BaseException) else None
+    finish_span(task_spans.pop(task_id, None), error)
+    TASKS.labels(task.name, state or "UNKNOWN").inc()
+    started = task_started.pop(task_id, None)
+    if started is not None:
+        TASK_DURATION.labels(task.name).observe(time.perf_counter() - started)
+
+
+@lru_cache
+def get_redis_client() -> Redis:
+    return Redis.from_url(get_settings().redis_url, decode_responses=True)
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    from app.db.session import get_shard_engines
+
+    async def runner() -> T:
+        try:
+            return await coro
+        finally:
+            for engine in get_shard_engines():
+                await engine.dispose()
+
+    return asyncio.run(runner())
 
 
 @celery_app.task(name="process_order")
-def process_order(order_id: str) -> None:
+def process_order(order_id: str, user_id: int | None = None) -> None:
+    from app.core.tracing import CLIENT, start_span
+    from app.services.order_events import encode_event, order_channel
+
     time.sleep(2)
     print(f"Order {order_id} processed")
+    if user_id is not None:
+        attributes = {"db.system": "redis", "db.operation": "PUBLISH"}
+        with start_span("redis PUBLISH", CLIENT, attributes=attributes):
+            get_redis_client().publish(
+                order_channel(user_id), encode_event("processed", {"order_id": order_id})
+            )
+
+
+@celery_app.task(name="create_order_partitions")
+def create_order_partitions() -> list[str]:
+    from app.db.partitions import ensure_future_partitions
+
+    return run_async(ensure_future_partitions())
+
+
+@celery_app.task(name="archive_orders")
+def archive_orders() -> int:
+    from app.services.archive import run_archive
+
+    settings = get_settings()
+    stats = run_async(run_archive(settings.archive_after_days, settings.archive_batch_size))
+    return stats.orders
+
+
+@celery_app.task(name="rebuild_order_summaries")
+def rebuild_order_summaries() -> int:
+    from app.services.summary import run_rebuild
+
+    return run_async(run_rebuild(get_settings().summary_rebuild_batch_size))
@@ -0,0 +1,53 @@
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+
+from app.api.negotiation import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, DataResponse, compress
+from app.api.responses import order_list_response
+
+from benchmarks.serialization import make_orders
+
+ENCODINGS: dict[str, Callable[[DataResponse], bytes]] = {
+    "json": lambda response: response.render_as(JSON_MEDIA_TYPE),
+    "json+gzip": lambda response: compress(response.render_as(JSON_MEDIA_TYPE), "gzip"),
+    "json+br": lambda response: compress(response.render_as(JSON_MEDIA_TYPE), "br"),
+    "msgpack": lambda response: response.render_as(MSGPACK_MEDIA_TYPE),
+    "msgpack+gzip": lambda response: compress(response.render_as(MSGPACK_MEDIA_TYPE), "gzip"),
+    "msgpack+br": lambda response: compress(response.render_as(MSGPACK_MEDIA_TYPE), "br"),
+}
+
+
+def time_encoding(
+    encode: Callable[[DataResponse], bytes], response: DataResponse, repeat: int
+) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode(response)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def run(sizes: list[int], repeat: int) -> None:
+    print(f"{'orders':>8} {'encoding':>13} {'cpu ms':>13} {'bytes':>12} {'ratio':>6}")
+    for size in sizes:
+        response = order_list_response(make_orders(size))
+        json_bytes = len(response.render_as(JSON_MEDIA_TYPE))
+        for name, encode in ENCODINGS.items():
+            encoded = encode(response)
+            cpu_ms = time_encoding(encode, response, repeat)
+            ratio = len(encoded) / json_bytes
+            print(f"{size:>8} {name:>13} {cpu_ms:>13.3f} {len(encoded):>12} {ratio:>6.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Order response encoding cost and size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from app.core.config import get_settings
+from app.core.revocation import TokenRevocations
+from app.db.session import get_engine
+from app.main import create_app
+from app.messaging import producer as producer_module
+from app.services.catalog import PriceCatalog
+from httpx import ASGITransport, AsyncClient, Response
+
+from benchmarks.fakes import FakeRedis, InMemoryKafkaProducer
+
+DEFAULT_MIX = "create=20,get_hit=30,get_miss=10,patch=10,list=25,login=5"
+STATUSES = ("PAID", "SHIPPED", "CANCELED")
+PASSWORD = "load-test-password"
+PRODUCTS = 1000
+
+
+def product_price_cents(product: int) -> int:
+    return 100 + product * 37 % 50000
+
+
+@dataclass
+class LoadUser:
+    email: str
+    user_id: int = 0
+    headers: dict[str, str] = field(default_factory=dict)
+    orders: list[str] = field(default_factory=list)
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.shed: dict[str, int] = defaultdict(int)
+
+    async def call(self, name: str, request: Awaitable[Response]) -> Response:
+        started = time.perf_counter()
+        response = await request
+        self.latencies[name].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        if response.status_code == 503 and "retry-after" in response.headers:
+            # Behave like a well-mannered client instead of retrying at once.
+            self.shed[name] += 1
+            await asyncio.sleep(float(response.headers["retry-after"]))
+        return response
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}, expected one of {sorted(OPERATIONS)}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def order_payload() -> dict[str, Any]:
+    products = [random.randrange(PRODUCTS) for _ in range(random.randint(1, 5))]
+    items = [
+        {
+            "product_id": f"PROD-{product}",
+            "quantity": random.randint(1, 5),
+            "price": product_price_cents(product) / 100,
+        }
+        for product in products
+    ]
+    total_cents = sum(round(item["price"] * 100) * item["quantity"] for item in items)
+    return {"items": items, "total_price": total_cents / 100}
+
+
+async def login(client: AsyncClient, recorder: Recorder, user: LoadUser) -> Response:
+    response = await recorder.call(
+        "login", client.post("/token/", data={"username": user.email, "password": PASSWORD})
+    )
+    if response.status_code == 200:
+        user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return response
+
+
+async def create(client: AsyncClient, recorder: Recorder, user: LoadUser, redis: FakeRedis) -> None:
+    response = await recorder.call(
+        "create", client.post("/orders/", json=order_payload(), headers=user.headers)
+    )
+    if response.status_code == 201:
+        user.orders.append(response.json()["id"])
+
+
+async def get_hit(
+    client: AsyncClient, recorder: Recorder, user: LoadUser, redis: FakeRedis
+) -> None:
+    order_id = random.choice(user.orders)
+    await recorder.call("get_hit", client.get(f"/orders/{order_id}/", headers=user.headers))
+
+
+async def get_miss(
+    client: AsyncClient, recorder: Recorder, user: LoadUser, redis: FakeRedis
+) -> None:
+    order_id = random.choice(user.orders)
+    await redis.delete(f"order:{order_id}")
+    await recorder.call("get_miss", client.get(f"/orders/{order_id}/", headers=user.headers))
+
+
+async def patch(client: AsyncClient, recorder: Recorder, user: LoadUser, redis: FakeRedis) -> None:
+    order_id = random.choice(user.orders)
+    body = {"status": random.choice(STATUSES)}
+    await recorder.call(
+        "patch", client.patch(f"/orders/{order_id}/", json=body, headers=user.headers)
+    )
+
+
+async def list_orders(
+    client: AsyncClient, recorder: Recorder, user: LoadUser, redis: FakeRedis
+) -> None:
+    await recorder.call("list", client.get(f"/orders/user/{user.user_id}/", headers=user.headers))
+
+
+async def relogin(
+    client: AsyncClient, recorder: Recorder, user: LoadUser, redis: FakeRedis
+) -> None:
+    await login(client, recorder, user)
+
+
+Operation = Callable[[AsyncClient, Recorder, LoadUser, FakeRedis], Awaitable[None]]
+OPERATIONS: dict[str, Operation] = {
+    "create": create,
+    "get_hit": get_hit,
+    "get_miss": get_miss,
+    "patch": patch,
+    "list": list_orders,
+    "login": relogin,
+}
+
+
+async def prepare_user(
+    client: AsyncClient, recorder: Recorder, redis: FakeRedis, email: str, orders: int
+) -> LoadUser:
+    user = LoadUser(email)
+    response = await recorder.call(
+        "register", client.post("/register/", json={"email": email, "password": PASSWORD})
+    )
+    response.raise_for_status()
+    user.user_id = response.json()["id"]
+    (await login(client, recorder, user)).raise_for_status()
+    for _ in range(orders):
+        await create(client, recorder, user, redis)
+    return user
+
+
+async def run_mix(
+    client: AsyncClient,
+    redis: FakeRedis,
+    users: list[LoadUser],
+    weights: dict[str, float],
+    concurrency: int,
+    duration: float,
+) -> tuple[Recorder, float]:
+    recorder = Recorder()
+    names = list(weights)
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights=[weights[n] for n in names])[0]
+            await OPERATIONS[name](client, recorder, random.choice(users), redis)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return recorder, time.perf_counter() - started
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(recorder: Recorder, elapsed: float | None) -> dict[str, dict[str, float]]:
+    summary = {}
+    for name, latencies in sorted(recorder.latencies.items()):
+        ordered = sorted(latencies)
+        summary[name] = {
+            "requests": len(ordered),
+            "errors": recorder.errors[name],
+            "shed": recorder.shed[name],
+            "rps": round(len(ordered) / elapsed, 1) if elapsed else None,
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+        }
+    return summary
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(title: str, summary: dict[str, dict[str, float]]) -> None:
+    print(title)
+    print(f"{'endpoint':>10} {'requests':>9} {'errors':>7} {'shed':>6} {'rps':>8}", end=" ")
+    print(f"{'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, row in summary.items():
+        rps = f"{row['rps']:.0f}" if row["rps"] is not None else "-"
+        print(
+            f"{name:>10} {row['requests']:>9} {row['errors']:>7} {row['shed']:>6} {rps:>8} "
+            f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}"
+        )
+
+
+def print_comparison(previous: dict[str, Any], current: dict[str, Any]) -> None:
+    print(f"Compared with {previous.get('commit') or 'previous run'} (% change)")
+    print(f"{'endpoint':>10} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, row in current["mix"].items():
+        before = previous["mix"].get(name)
+        if before is None:
+            continue
+        changes = [
+            (row[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms")
+        ]
+        print(f"{name:>10} " + " ".join(f"{change:>+8.1f}" for change in changes))
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    weights = parse_mix(args.mix)
+    redis = FakeRedis()
+    kafka = InMemoryKafkaProducer()
+    producer_module.kafka_producer = kafka
+    app = create_app()
+    app.state.redis = redis
+    settings = get_settings()
+    app.state.token_revocations = TokenRevocations(
+        redis, settings.token_revocation_capacity, settings.token_revocation_error_rate
+    )
+    # The catalog listener is not started without the lifespan, so the index
+    # is filled with the same prices order_payload() sends.
+    app.state.price_catalog = PriceCatalog()
+    app.state.price_catalog.load((f"PROD-{p}", product_price_cents(p)) for p in range(PRODUCTS))
+    run_id = uuid.uuid4().hex[:8]
+    setup = Recorder()
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://load") as client:
+            users = await asyncio.gather(
+                *(
+                    prepare_user(
+                        client, setup, redis, f"load-{run_id}-{i}@example.com", args.seed_orders
+                    )
+                    for i in range(args.users)
+                )
+            )
+            mix, elapsed = await run_mix(
+                client, redis, users, weights, args.concurrency, args.duration
+            )
+    finally:
+        producer_module.kafka_producer = None
+        await get_engine().dispose()
+
+    total = sum(len(latencies) for latencies in mix.latencies.values())
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "mix": weights,
+            "users": args.users,
+            "seed_orders": args.seed_orders,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+        },
+        "total_rps": round(total / elapsed, 1),
+        "kafka_messages": len(kafka.messages),
+        "setup": summarize(setup, None),
+        "mix": summarize(mix, elapsed),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Load test of the order API with in-process Redis and Kafka stand-ins "
+        "(needs PostgreSQL at POSTGRES_DSN)"
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight pairs")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--seed-orders", type=int, default=5, help="orders created per user")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--migrate", action="store_true", help="run alembic upgrade head first")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="JSON results of a previous run")
+    args = parser.parse_args()
+
+    if args.migrate:
+        subprocess.run(["alembic", "upgrade", "head"], check=True)
+    results = asyncio.run(run(args))
+
+    print_table("Setup", results["setup"])
+    print()
+    print_table(f"Mix: {results['total_rps']:.0f} req/s", results["mix"])
+    if args.compare:
+        print()
+        print_comparison(json.loads(args.compare.read_text()), results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
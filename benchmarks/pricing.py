@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+
+from app.core.config import get_settings
+from app.schemas.order import OrderItem
+from app.services.catalog import PriceCatalog
+from sqlalchemy import bindparam, pool, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.types import String
+
+TABLE = "bench_products"
+
+CREATE_TABLE = text(
+    f"CREATE UNLOGGED TABLE {TABLE} (id varchar(64) PRIMARY KEY, price_cents bigint NOT NULL)"
+)
+FILL_TABLE = text(
+    f"INSERT INTO {TABLE} SELECT 'PROD-' || g, 100 + (random() * 50000)::int "
+    "FROM generate_series(0, :products - 1) AS g"
+)
+PRICE_ONE = text(f"SELECT price_cents FROM {TABLE} WHERE id = :id")
+PRICE_MANY = text(f"SELECT id, price_cents FROM {TABLE} WHERE id = ANY(:ids)").bindparams(
+    bindparam("ids", type_=ARRAY(String))
+)
+
+
+def random_order(size: int, products: int) -> list[OrderItem]:
+    return [
+        OrderItem(
+            product_id=f"PROD-{random.randrange(products)}",
+            quantity=random.randint(1, 5),
+            price=1.0,
+        )
+        for _ in range(size)
+    ]
+
+
+async def per_item(conn: AsyncConnection, items: list[OrderItem]) -> int:
+    total = 0
+    for item in items:
+        total += item.quantity * (await conn.execute(PRICE_ONE, {"id": item.product_id})).scalar()
+    return total
+
+
+async def one_query(conn: AsyncConnection, items: list[OrderItem]) -> int:
+    ids = list({item.product_id for item in items})
+    prices = dict((await conn.execute(PRICE_MANY, {"ids": ids})).all())
+    return sum(item.quantity * prices[item.product_id] for item in items)
+
+
+async def median_ms(
+    price: Callable[[list[OrderItem]], Awaitable[int]], orders: list[list[OrderItem]]
+) -> float:
+    timings = []
+    for items in orders:
+        started = time.perf_counter()
+        await price(items)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def run(dsn: str, sizes: list[int], products: int, repeat: int) -> None:
+    engine = create_async_engine(dsn, poolclass=pool.NullPool)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+            await conn.execute(CREATE_TABLE)
+            await conn.execute(FILL_TABLE, {"products": products})
+            await conn.execute(text(f"ANALYZE {TABLE}"))
+            rows = (await conn.execute(text(f"SELECT id, price_cents FROM {TABLE}"))).all()
+        prices = dict(rows)
+        catalog = PriceCatalog()
+        catalog.load(rows)
+
+        async def dict_loop(items: list[OrderItem]) -> int:
+            return sum(item.quantity * prices[item.product_id] for item in items)
+
+        async def price_index(items: list[OrderItem]) -> int:
+            return catalog.reprice(items)[1]
+
+        print(
+            f"{'items':>6} {'per-item query ms':>18} {'ANY() query ms':>15} "
+            f"{'dict loop ms':>13} {'price index ms':>15}"
+        )
+        async with engine.connect() as conn:
+            for size in sizes:
+                orders = [random_order(size, products) for _ in range(repeat)]
+                per_item_ms = await median_ms(lambda items: per_item(conn, items), orders)
+                one_query_ms = await median_ms(lambda items: one_query(conn, items), orders)
+                dict_ms = await median_ms(dict_loop, orders)
+                index_ms = await median_ms(price_index, orders)
+                print(
+                    f"{size:>6} {per_item_ms:>18.3f} {one_query_ms:>15.3f} "
+                    f"{dict_ms:>13.3f} {index_ms:>15.3f}"
+                )
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Server-side repricing of large orders")
+    parser.add_argument("--dsn", default=get_settings().postgres_dsn)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.dsn, args.sizes, args.products, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.core.config import get_settings
+from sqlalchemy import bindparam, pool, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+TABLE = "bench_product_lookup"
+PRODUCTS = 100_000
+
+CREATE_TABLE = text(
+    f"CREATE UNLOGGED TABLE {TABLE} (id bigserial PRIMARY KEY, items jsonb NOT NULL)"
+)
+FILL_TABLE = text(
+    f"""
+    INSERT INTO {TABLE} (items)
+    SELECT (
+        SELECT jsonb_agg(jsonb_build_object(
+            'product_id', 'PROD-' || (random() * :products)::int,
+            'quantity', 1 + (random() * 4)::int,
+            'price', round((random() * 500)::numeric, 2)
+        ))
+        FROM generate_series(1, 1 + (random() * 4)::int + g * 0)
+    )
+    FROM generate_series(1, :rows) AS g
+    """
+)
+CREATE_INDEX = text(f"CREATE INDEX ON {TABLE} USING gin (items jsonb_path_ops)")
+LOOKUP = text(f"SELECT id FROM {TABLE} WHERE items @> :filter").bindparams(
+    bindparam("filter", type_=JSONB)
+)
+
+
+async def time_lookups(conn: AsyncConnection, lookups: int) -> float:
+    timings = []
+    for _ in range(lookups):
+        product = [{"product_id": f"PROD-{random.randrange(PRODUCTS)}"}]
+        started = time.perf_counter()
+        await conn.execute(LOOKUP, {"filter": product})
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def run(dsn: str, sizes: list[int], lookups: int) -> None:
+    engine = create_async_engine(dsn, poolclass=pool.NullPool)
+    print(f"{'rows':>10} {'seq scan ms':>12} {'gin ms':>10} {'speedup':>8}")
+    try:
+        for rows in sizes:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+                await conn.execute(CREATE_TABLE)
+                await conn.execute(FILL_TABLE, {"rows": rows, "products": PRODUCTS})
+                await conn.execute(text(f"ANALYZE {TABLE}"))
+                seq_ms = await time_lookups(conn, lookups)
+                await conn.execute(CREATE_INDEX)
+                await conn.execute(text(f"ANALYZE {TABLE}"))
+                gin_ms = await time_lookups(conn, lookups)
+            print(f"{rows:>10} {seq_ms:>12.2f} {gin_ms:>10.2f} {seq_ms / gin_ms:>7.1f}x")
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Product lookup over items JSONB")
+    parser.add_argument("--dsn", default=get_settings().postgres_dsn)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.dsn, args.sizes, args.lookups))
+
+
+if __name__ == "__main__":
+    main()
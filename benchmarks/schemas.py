@@ -0,0 +1,90 @@
+import argparse
+import json
+import random
+import statistics
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any
+
+from app.models.order import Order, OrderStatus, new_order_id
+from app.schemas.order import OrderCreate, OrderRead, StoredOrderRead
+
+
+def make_items(count: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "product_id": f"PROD-{random.randrange(100_000)}",
+            "quantity": random.randint(1, 5),
+            "price": round(random.uniform(1, 500), 2),
+        }
+        for _ in range(count)
+    ]
+
+
+def make_order(items: list[dict[str, Any]]) -> Order:
+    return Order(
+        id=new_order_id(),
+        user_id=1,
+        items=items,
+        total_price=round(sum(i["price"] * i["quantity"] for i in items), 2),
+        status=OrderStatus.PENDING,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+def time_call(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1_000_000
+
+
+def cases(count: int) -> dict[str, tuple[Callable[[], object], Callable[[], object] | None]]:
+    items = make_items(count)
+    order = make_order(items)
+    body = json.dumps({"items": items, "total_price": order.total_price})
+    cached = OrderRead.model_validate(order).model_dump_json()
+    current = OrderRead.model_validate(order)
+    stored = StoredOrderRead.model_validate(order)
+    # Each case pairs the OrderRead path with the StoredOrderRead one where
+    # the tighter model applies.
+    return {
+        "request body -> OrderCreate": (lambda: OrderCreate.model_validate_json(body), None),
+        "ORM -> read model": (
+            lambda: OrderRead.model_validate(order),
+            lambda: StoredOrderRead.model_validate(order),
+        ),
+        "cache JSON -> read model": (
+            lambda: OrderRead.model_validate(json.loads(cached)),
+            lambda: StoredOrderRead.model_validate_json(cached),
+        ),
+        "read model -> response JSON": (current.model_dump_json, stored.model_dump_json),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validation and serialization of order schemas")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 5000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'case':>28} {'items':>6} {'OrderRead us':>13} {'Stored us':>10} {'speedup':>8}")
+    for count in args.sizes:
+        repeat = max(args.repeat * 100 // max(count, 100), 5)
+        for name, (current, tight) in cases(count).items():
+            current_us = time_call(current, repeat)
+            if tight is None:
+                print(f"{name:>28} {count:>6} {current_us:>13.1f} {'-':>10} {'-':>8}")
+                continue
+            tight_us = time_call(tight, repeat)
+            print(
+                f"{name:>28} {count:>6} {current_us:>13.1f} {tight_us:>10.1f} "
+                f"{current_us / tight_us:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
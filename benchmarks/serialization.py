@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+
+from app.api.responses import order_list_response
+from app.models.order import Order, OrderStatus, new_order_id
+from app.schemas.order import OrderRead
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+RESPONSE_FIELD = create_model_field(name="Response", type_=list[OrderRead], mode="serialization")
+
+
+def make_orders(count: int) -> list[Order]:
+    orders = []
+    for _ in range(count):
+        items = [
+            {
+                "product_id": f"PROD-{random.randrange(100_000)}",
+                "quantity": random.randint(1, 5),
+                "price": round(random.uniform(1, 500), 2),
+            }
+            for _ in range(random.randint(1, 5))
+        ]
+        orders.append(
+            Order(
+                id=new_order_id(),
+                user_id=1,
+                items=items,
+                total_price=round(sum(i["price"] * i["quantity"] for i in items), 2),
+                status=OrderStatus.PENDING,
+                created_at=datetime.now(timezone.utc),
+            )
+        )
+    return orders
+
+
+async def fastapi_default(orders: list[Order]) -> bytes:
+    content = [OrderRead.model_validate(order) for order in orders]
+    serialized = await serialize_response(field=RESPONSE_FIELD, response_content=content)
+    return JSONResponse(serialized).body
+
+
+async def fast_path(orders: list[Order]) -> bytes:
+    return order_list_response(orders).body
+
+
+async def time_encoder(
+    encode: Callable[[list[Order]], Awaitable[bytes]], orders: list[Order], repeat: int
+) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await encode(orders)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def run(sizes: list[int], repeat: int) -> None:
+    print(f"{'orders':>8} {'fastapi ms':>11} {'fast path ms':>13} {'speedup':>8}")
+    for size in sizes:
+        orders = make_orders(size)
+        assert json.loads(await fastapi_default(orders)) == json.loads(await fast_path(orders))
+        default_ms = await time_encoder(fastapi_default, orders, repeat)
+        fast_ms = await time_encoder(fast_path, orders, repeat)
+        print(f"{size:>8} {default_ms:>11.3f} {fast_ms:>13.3f} {default_ms / fast_ms:>7.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Order list response serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
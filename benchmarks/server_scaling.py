@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import multiprocessing
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.startup import free_port
+
+
+def wait_ready(port: int, path: str, timeout: float) -> None:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1):
+                return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.05)
+    raise TimeoutError("Server did not answer in time")
+
+
+async def keep_alive_client(port: int, path: str, deadline: float) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+    done = 0
+    try:
+        while time.perf_counter() < deadline:
+            writer.write(request)
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            done += 1
+    finally:
+        writer.close()
+    return done
+
+
+def load_process(port: int, path: str, connections: int, duration: float) -> int:
+    async def run() -> int:
+        deadline = time.perf_counter() + duration
+        counts = await asyncio.gather(
+            *(keep_alive_client(port, path, deadline) for _ in range(connections))
+        )
+        return sum(counts)
+
+    return asyncio.run(run())
+
+
+def measure(workers: int, args: argparse.Namespace) -> float:
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "app.server",
+            "--workers",
+            str(workers),
+            "--port",
+            str(port),
+            "--host",
+            "127.0.0.1",
+            "--log-level",
+            "error",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port, args.path, args.timeout)
+        # Let every worker finish its startup before load begins.
+        time.sleep(args.warmup)
+        with multiprocessing.Pool(args.clients) as pool:
+            counts = pool.starmap(
+                load_process,
+                [(port, args.path, args.connections, args.duration)] * args.clients,
+            )
+        return sum(counts) / args.duration
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API throughput by number of server workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/health/live/")
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--connections", type=int, default=32, help="per client process")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        rps = measure(workers, args)
+        baseline = baseline or rps
+        print(f"{workers:>8} {rps:>10.0f} {rps / baseline:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ENTRY_POINTS = {
+    "api": "import app.main",
+    "consumer": "import app.messaging.consumer",
+    "worker": (
+        "from app.tasks.worker import celery_app; "
+        "celery_app.finalize(); celery_app.tasks['process_order']"
+    ),
+}
+TIMED = "import time; started = time.perf_counter(); {code}; print(time.perf_counter() - started)"
+# The consumer and the worker run for real up to their first message or task;
+# Kafka is replaced by a single-message consumer and the Celery broker by the
+# in-memory transport. The consumer still loads its offsets from PostgreSQL.
+STAND_INS = {
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "METRICS_PORT": "0",
+}
+
+
+def time_import(code: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", TIMED.format(code=code)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1]) * 1000
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_first_request(timeout: float) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/live/", timeout=1):
+                    return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError("API did not answer in time")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report_handled() -> None:
+    print(f"handled at {time.time()}", flush=True)
+    os._exit(0)
+
+
+def run_consumer() -> None:
+    import asyncio
+    from unittest.mock import patch
+
+    from aiokafka import ConsumerRecord
+    from app.messaging import consumer
+
+    class SingleMessageConsumer:
+        def __init__(self, *args: object, **kwargs: object) -> None:
+            self.listener = None
+
+        def subscribe(self, topics: list[str], listener: object) -> None:
+            self.topics, self.listener = topics, listener
+
+        async def start(self) -> None:
+            await self.listener.on_partitions_assigned(set())
+
+        async def getmany(self, **kwargs: object) -> dict:
+            value = {"order_id": "startup", "user_id": 1, "total_price": 1.0}
+            record = ConsumerRecord(
+                self.topics[0], 0, 0, int(time.time() * 1000), 0, None, value, None, 0, 0, []
+            )
+            return {None: [record]}
+
+    handle_message = consumer.handle_message
+
+    def handle_first(*args: object) -> None:
+        handle_message(*args)
+        report_handled()
+
+    with (
+        patch.object(consumer, "AIOKafkaConsumer", SingleMessageConsumer),
+        patch.object(consumer, "handle_message", handle_first),
+    ):
+        asyncio.run(consumer.consume())
+
+
+def run_worker() -> None:
+    from app.tasks.worker import celery_app, process_order
+    from celery.signals import task_prerun
+
+    task_prerun.connect(lambda **kwargs: report_handled(), weak=False)
+    process_order.delay("startup")
+    celery_app.Worker(
+        pool="solo",
+        quiet=True,
+        redirect_stdouts=False,
+        without_mingle=True,
+        without_gossip=True,
+        loglevel="WARNING",
+    ).start()
+
+
+def time_first_handled(target: str, timeout: float) -> float:
+    started = time.time()
+    output = subprocess.run(
+        [sys.executable, "-c", f"from benchmarks.startup import {target}; {target}()"],
+        check=True,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+        env={**os.environ, **STAND_INS},
+    ).stdout
+    (handled,) = [line for line in output.splitlines() if line.startswith("handled at ")]
+    return (float(handled.removeprefix("handled at ")) - started) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Startup time of the service entry points")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    print(f"{'entry point':>12} {'import ms':>10}")
+    for name, code in ENTRY_POINTS.items():
+        timings = [time_import(code) for _ in range(args.repeat)]
+        print(f"{name:>12} {statistics.median(timings):>10.1f}")
+
+    timings = [time_first_request(args.timeout) for _ in range(args.repeat)]
+    print(f"API time to first request: {statistics.median(timings):.1f} ms")
+    timings = [time_first_handled("run_consumer", args.timeout) for _ in range(args.repeat)]
+    print(f"Consumer time to first message: {statistics.median(timings):.1f} ms")
+    timings = [time_first_handled("run_worker", args.timeout) for _ in range(args.repeat)]
+    print(f"Worker time to first task: {statistics.median(timings):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,61 @@
+from collections.abc import Callable
+from contextlib import AbstractContextManager
 from datetime import datetime, timezone
+from typing import Any
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
-from app.api.routes import auth, health, orders
+from app.api.routes import auth, debug, health, metrics, orders, stats
+from app.core.config import get_settings
+from app.core.resilience import breakers
+from app.core.revocation import TokenRevocations, get_token_revocations
 from app.core.security import get_current_user, get_password_hash
+from app.db.querylog import QueryCountMiddleware, QueryLog, current_queries, query_budget
 from app.db.session import get_db
+from app.messaging.spool import EventSpool
 from app.models.order import Order, OrderStatus
 from app.models.user import User
 from app.services.cache import get_redis
+from app.services.catalog import PriceCatalog, get_price_catalog
 from fastapi import FastAPI
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import ClauseElement
 
 
 def create_test_app() -> FastAPI:
     application = FastAPI()
     application.include_router(health)
+    application.include_router(metrics)
     application.include_router(auth)
     application.include_router(orders)
+    application.include_router(stats)
+    application.include_router(debug)
+    application.add_middleware(QueryCountMiddleware, budget=get_settings().request_query_budget)
     return application
 
 
+@pytest.fixture(autouse=True)
+def reset_breakers():
+    yield
+    for breaker in breakers.values():
+        breaker.reset()
+
+
+@pytest.fixture(autouse=True)
+def event_spool(tmp_path, monkeypatch) -> EventSpool:
+    spool = EventSpool(str(tmp_path / "spool"))
+    monkeypatch.setattr("app.messaging.producer.get_event_spool", lambda: spool)
+    return spool
+
+
 @pytest.fixture
 def test_user() -> User:
     user = MagicMock(spec=User)
     user.id = 1
     user.email = "test@example.com"
     user.hashed_password = get_password_hash("testpassword")
+    user.is_admin = False
     user.created_at = datetime.now(timezone.utc)
     return user
 
@@ -42,13 +72,40 @@ def test_order() -> Order:
     return order
 
 
+# Session calls that cost a database round trip. Each call is recorded in the
+# current QueryLog, as the engine hooks in app.db.querylog do for real
+# connections, so query_budget and QueryCountMiddleware see the statements
+# the code under test would send.
+ROUND_TRIPS = ("execute", "scalar", "scalars", "get", "commit", "refresh", "flush")
+
+
+class RoundTrip(AsyncMock):
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        log = current_queries.get()
+        if log is not None:
+            statement = args[0] if args else None
+            if isinstance(statement, ClauseElement):
+                log.record(str(statement.compile(dialect=postgresql.dialect())), 0.0)
+            else:
+                log.record(f"session.{self._mock_name}()", 0.0)
+        return super().__call__(*args, **kwargs)
+
+
 @pytest.fixture
 def mock_db():
     session = AsyncMock()
     session.add = MagicMock()
+    session.info = {}
+    for name in ROUND_TRIPS:
+        setattr(session, name, RoundTrip(name=name))
     return session
 
 
+@pytest.fixture
+def session_budget(mock_db) -> Callable[[int], AbstractContextManager[QueryLog]]:
+    return query_budget
+
+
 @pytest.fixture
 def mock_redis():
     redis = AsyncMock()
@@ -59,7 +116,14 @@ def mock_redis():
 
 
 @pytest.fixture
-async def client(mock_db, mock_redis, test_user):
+def price_catalog() -> PriceCatalog:
+    catalog = PriceCatalog(capacity=4)
+    catalog.load([("PROD-001", 5000), ("P1", 1000), ("P2", 3000)])
+    return catalog
+
+
+@pytest.fixture
+async def client(mock_db, mock_redis, test_user, token_revocations, price_catalog):
     app = create_test_app()
 
     async def override_get_db():
@@ -67,6 +131,8 @@ async def client(mock_db, mock_redis, test_user):
 
     app.dependency_overrides[get_db] = override_get_db
     app.dependency_overrides[get_redis] = lambda: mock_redis
+    app.dependency_overrides[get_token_revocations] = lambda: token_revocations
+    app.dependency_overrides[get_price_catalog] = lambda: price_catalog
     app.dependency_overrides[get_current_user] = lambda: test_user
 
     async with AsyncClient(
@@ -77,7 +143,12 @@ async def client(mock_db, mock_redis, test_user):
 
 
 @pytest.fixture
-async def unauth_client(mock_db, mock_redis):
+def token_revocations(mock_redis) -> TokenRevocations:
+    return TokenRevocations(mock_redis, capacity=1000, error_rate=0.01)
+
+
+@pytest.fixture
+async def unauth_client(mock_db, mock_redis, token_revocations, price_catalog):
     app = create_test_app()
 
     async def override_get_db():
@@ -85,6 +156,8 @@ async def unauth_client(mock_db, mock_redis):
 
     app.dependency_overrides[get_db] = override_get_db
     app.dependency_overrides[get_redis] = lambda: mock_redis
+    app.dependency_overrides[get_token_revocations] = lambda: token_revocations
+    app.dependency_overrides[get_price_catalog] = lambda: price_catalog
 
     async with AsyncClient(
         transport=ASGITransport(app=app),
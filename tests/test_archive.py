@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.models.archive import ArchivedOrder
+from app.models.order import Order, OrderStatus
+from app.services.archive import archive_batch, read_segment_row, write_segment
+from app.services.orders import get_order
+
+
+def make_order(order_id: str, status: OrderStatus = OrderStatus.SHIPPED) -> Order:
+    return Order(
+        id=order_id,
+        user_id=1,
+        items=[{"product_id": "PROD-001", "quantity": 2, "price": 50.0}],
+        total_price=100.0,
+        status=status,
+        created_at=datetime(2026, 1, 15, 10, 0, tzinfo=timezone.utc),
+    )
+
+
+def scalars_result(values: list) -> MagicMock:
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = values
+    return result
+
+
+class TestSegments:
+    def test_round_trip(self, tmp_path):
+        orders = [
+            make_order("a1b2c3d4-e5f6-7890-abcd-ef1234567890"),
+            make_order("b1b2c3d4-e5f6-7890-abcd-ef1234567890", OrderStatus.CANCELED),
+        ]
+        segment, size = write_segment(tmp_path, "2026-01", orders)
+        assert segment == "2026-01/a1b2c3d4-e5f6-7890-abcd-ef1234567890.json.gz"
+        assert size == (tmp_path / segment).stat().st_size
+
+        row = read_segment_row(tmp_path, segment, 1)
+        assert row["id"] == orders[1].id
+        assert row["status"] == OrderStatus.CANCELED
+        assert row["created_at"] == orders[1].created_at
+        assert row["items"] == orders[1].items
+
+    def test_no_temporary_files_left(self, tmp_path):
+        write_segment(tmp_path, "2026-01", [make_order("a1b2c3d4-e5f6-7890-abcd-ef1234567890")])
+        assert [path.suffix for path in (tmp_path / "2026-01").iterdir()] == [".gz"]
+
+
+class TestArchiveBatch:
+    @pytest.mark.asyncio
+    async def test_moves_orders_to_archive(self, tmp_path):
+        orders = [make_order("a1b2c3d4-e5f6-7890-abcd-ef1234567890")]
+        db = AsyncMock()
+        db.add_all = MagicMock()
+        db.execute.return_value = scalars_result(orders)
+
+        cutoff = datetime.now(timezone.utc) - timedelta(days=90)
+        archived, segments, size = await archive_batch(db, tmp_path, cutoff, 100)
+        assert (archived, segments) == (1, 1)
+        assert size > 0
+        entries = list(db.add_all.call_args.args[0])
+        assert isinstance(entries[0], ArchivedOrder)
+        assert entries[0].position == 0
+        assert db.execute.await_count == 2
+        db.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_archive(self, tmp_path):
+        db = AsyncMock()
+        db.execute.return_value = scalars_result([])
+
+        assert await archive_batch(db, tmp_path, datetime.now(timezone.utc), 100) == (0, 0, 0)
+        db.commit.assert_not_awaited()
+
+
+class TestArchiveFallback:
+    @pytest.mark.asyncio
+    async def test_get_order_reads_archive_on_miss(self, tmp_path):
+        order = make_order("a1b2c3d4-e5f6-7890-abcd-ef1234567890")
+        segment, _ = write_segment(tmp_path, "2026-01", [order])
+        entry = ArchivedOrder(order_id=order.id, user_id=1, segment=segment, position=0)
+
+        miss = MagicMock()
+        miss.scalar_one_or_none.return_value = None
+        hit = MagicMock()
+        hit.scalar_one_or_none.return_value = entry
+        db = AsyncMock()
+        db.info = {}
+        db.execute.side_effect = [miss, hit]
+
+        with patch("app.services.archive.get_settings") as get_settings:
+            get_settings.return_value.archive_dir = str(tmp_path)
+            archived = await get_order(db, order.id)
+        assert archived.id == order.id
+        assert archived.status == OrderStatus.SHIPPED
+
+    @pytest.mark.asyncio
+    async def test_get_order_without_archive(self):
+        miss = MagicMock()
+        miss.scalar_one_or_none.return_value = None
+        db = AsyncMock()
+        db.info = {}
+        db.execute.return_value = miss
+
+        assert await get_order(db, "a1b2c3d4-e5f6-7890-abcd-ef1234567890", False) is None
+        assert db.execute.await_count == 1
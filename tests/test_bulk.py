@@ -0,0 +1,248 @@
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+from uuid import UUID
+
+import pytest
+from app.db.bulk import (
+    ImportCheckpoint,
+    OrderImporter,
+    apply_imported,
+    chunk_rows,
+    detect_format,
+    export_windows,
+    import_rows,
+    load_checkpoint,
+    read_records,
+    save_checkpoint,
+    to_row,
+    validate_chunk,
+)
+from app.db.partitions import FIND_DEFAULT_PARTITION
+from app.db.sharding import parse_shard_map
+from app.models.order import new_order_id, order_id_timestamp
+from app.services.rollups import Granularity
+
+ITEMS = [{"product_id": "PROD-001", "quantity": 2, "price": 50.0}]
+CREATED_AT = datetime(2024, 3, 14, 12, 0, tzinfo=timezone.utc)
+
+
+class TestReadRecords:
+    def test_csv_items_and_empty_fields(self, tmp_path):
+        path = tmp_path / "orders.csv"
+        path.write_text(
+            "id,user_id,items,total_price,status,created_at\n"
+            f',1,"{json.dumps(ITEMS).replace(chr(34), chr(34) * 2)}",100.0,,2024-03-14T12:00:00Z\n'
+        )
+
+        (record,) = read_records(path, "csv")
+        ((number, order),), rejected = validate_chunk([record], 1)
+
+        assert rejected == []
+        assert number == 1
+        assert order.id is None
+        assert order.items[0].product_id == "PROD-001"
+        assert order.status == "PENDING"
+        assert order.created_at == CREATED_AT
+
+    def test_ndjson_keeps_bad_lines_for_rejection(self, tmp_path):
+        path = tmp_path / "orders.ndjson"
+        path.write_text(json.dumps({"user_id": 1}) + "\n\nnot json\n")
+        assert list(read_records(path, "ndjson")) == [{"user_id": 1}, "not json"]
+
+    def test_detect_format(self, tmp_path):
+        assert detect_format(tmp_path / "orders.CSV", None) == "csv"
+        assert detect_format(tmp_path / "orders.jsonl", None) == "ndjson"
+        assert detect_format(tmp_path / "orders.csv", "ndjson") == "ndjson"
+
+
+class TestValidateChunk:
+    def test_rejects_only_invalid_records(self):
+        chunk = [
+            {"user_id": 1, "items": ITEMS, "total_price": 100.0},
+            {"user_id": 1, "items": [], "total_price": -1},
+            "not json",
+            {"user_id": 2, "items": ITEMS, "total_price": 100.0, "created_at": "2024-03-14"},
+        ]
+
+        orders, rejected = validate_chunk(chunk, first_record=11)
+
+        assert [(number, order.user_id) for number, order in orders] == [(11, 1)]
+        assert [reject.record for reject in rejected] == [12, 13, 14]
+        assert "items" in rejected[0].error and "total_price" in rejected[0].error
+        assert "created_at" in rejected[2].error
+
+    def test_to_row_generates_time_ordered_id(self):
+        ((_, order),), _ = validate_chunk(
+            [{"user_id": 1, "items": ITEMS, "total_price": 100.0, "created_at": CREATED_AT}], 1
+        )
+        order_id, user_id, items, total_price, status, created_at = to_row(
+            order, datetime.now(timezone.utc), "orders.csv#1"
+        )
+        assert order_id_timestamp(order_id) == CREATED_AT
+        assert json.loads(items) == ITEMS
+        assert (user_id, total_price, status, created_at) == (1, 100.0, "PENDING", CREATED_AT)
+
+    def test_to_row_keeps_given_id(self):
+        order_id = "a1b2c3d4-e5f6-4890-abcd-ef1234567890"
+        ((_, order),), _ = validate_chunk(
+            [{"id": order_id, "user_id": 1, "items": ITEMS, "total_price": 100.0}], 1
+        )
+        assert UUID(to_row(order, CREATED_AT, "orders.csv#1")[0]) == UUID(order_id)
+        assert to_row(order, CREATED_AT, "orders.csv#1")[5] == CREATED_AT
+
+    def test_rejects_time_ordered_id_far_from_created_at(self):
+        order_id = new_order_id(CREATED_AT)
+        record = {"id": order_id, "user_id": 1, "items": ITEMS, "total_price": 100.0}
+        chunk = [
+            {**record, "created_at": CREATED_AT + timedelta(hours=1)},
+            {**record, "created_at": CREATED_AT + timedelta(days=30)},
+            record,
+        ]
+
+        orders, rejected = validate_chunk(chunk, 1)
+
+        assert [str(order.id) for _, order in orders] == [order_id]
+        assert [reject.record for reject in rejected] == [2, 3]
+        assert "created_at" in rejected[0].error
+
+
+class TestCheckpoints:
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "orders.checkpoint"
+        save_checkpoint(path, ImportCheckpoint("/data/orders.csv", records=500, imported=490))
+
+        checkpoint = load_checkpoint(path, ImportCheckpoint, "source", "/data/orders.csv", False)
+        assert checkpoint.records == 500
+        assert checkpoint.imported == 490
+
+    def test_other_source_or_restart_starts_over(self, tmp_path):
+        path = tmp_path / "orders.checkpoint"
+        save_checkpoint(path, ImportCheckpoint("/data/orders.csv", records=500))
+
+        other = load_checkpoint(path, ImportCheckpoint, "source", "/data/other.csv", False)
+        restarted = load_checkpoint(path, ImportCheckpoint, "source", "/data/orders.csv", True)
+        assert other == ImportCheckpoint("/data/other.csv")
+        assert restarted.records == 0
+
+    def test_export_windows(self):
+        until = CREATED_AT + timedelta(days=10)
+        windows = list(export_windows(CREATED_AT, until, timedelta(days=4)))
+        assert [end - start for start, end in windows] == [
+            timedelta(days=4),
+            timedelta(days=4),
+            timedelta(days=2),
+        ]
+        assert windows[-1][1] == until
+
+
+class TestOrderImporter:
+    @pytest.mark.asyncio
+    async def test_copy_stages_rows_and_creates_partitions(self):
+        conn = AsyncMock()
+
+        async def execute(statement, *args):
+            if statement is FIND_DEFAULT_PARTITION:
+                return MagicMock(**{"scalar_one_or_none.return_value": None})
+            return [(1, CREATED_AT, 1.0)]
+
+        conn.execute.side_effect = execute
+        driver = AsyncMock()
+        conn.get_raw_connection.return_value = MagicMock(driver_connection=driver)
+        importer = OrderImporter(conn)
+        importer.parent = "orders"
+        rows = [
+            ("id-1", 1, "[]", 1.0, "PAID", CREATED_AT),
+            ("id-2", 9, "[]", 1.0, "PAID", CREATED_AT + timedelta(days=1)),
+        ]
+
+        assert await importer.copy(rows) == [(1, CREATED_AT, 1.0)]
+        await importer.copy(rows)
+
+        statements = [str(call.args[0]) for call in conn.execute.await_args_list]
+        assert statements[0] == "TRUNCATE orders_import"
+        partitions = [statement for statement in statements if "PARTITION OF" in statement]
+        assert len(partitions) == 1 and "orders_p202403" in partitions[0]
+        assert "ON CONFLICT DO NOTHING" in statements[3]
+        driver.copy_records_to_table.assert_awaited_with(
+            "orders_import",
+            records=rows,
+            columns=("id", "user_id", "items", "total_price", "status", "created_at"),
+        )
+        assert conn.commit.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_replayed_chunk_is_not_inserted_twice(self, tmp_path):
+        stored: dict[str, tuple] = {}
+
+        async def copy(rows):
+            # ON CONFLICT DO NOTHING on the primary key.
+            fresh = [row for row in rows if row[0] not in stored]
+            stored.update((row[0], row) for row in fresh)
+            return [(row[1], row[5], row[3]) for row in fresh]
+
+        importer = AsyncMock()
+        importer.known_users.return_value = {1, 2}
+        importer.copy.side_effect = copy
+        chunk = [
+            {"user_id": 1, "items": ITEMS, "total_price": 100.0},
+            {"user_id": 2, "items": ITEMS, "total_price": 50.0, "created_at": CREATED_AT},
+        ]
+        path = tmp_path / "orders.checkpoint"
+        save_checkpoint(
+            path, ImportCheckpoint("/data/orders.ndjson", started_at="2026-10-19T10:00:00+00:00")
+        )
+
+        first, _ = chunk_rows(
+            chunk, load_checkpoint(path, ImportCheckpoint, "source", "/data/orders.ndjson", False)
+        )
+        # The process dies after the rows are committed but before the
+        # checkpoint moves past the chunk, so the next run reads it again.
+        replayed, _ = chunk_rows(
+            chunk, load_checkpoint(path, ImportCheckpoint, "source", "/data/orders.ndjson", False)
+        )
+
+        shard_map = parse_shard_map("", 1)
+        assert len(await import_rows([importer], shard_map, first)) == 2
+        assert await import_rows([importer], shard_map, replayed) == []
+        assert len(stored) == 2
+        assert replayed == first
+
+    @pytest.mark.asyncio
+    async def test_rows_go_to_the_home_shard_of_known_users(self):
+        importers = [AsyncMock(), AsyncMock()]
+        importers[0].known_users.return_value = {1, 1024 + 600}
+        importers[0].copy.return_value = [(1, CREATED_AT, 1.0)]
+        importers[1].copy.return_value = [(1024 + 600, CREATED_AT, 1.0)]
+        rows = [
+            ("id-1", 1, "[]", 1.0, "PAID", CREATED_AT),
+            ("id-2", 1024 + 600, "[]", 1.0, "PAID", CREATED_AT),
+            ("id-3", 7, "[]", 1.0, "PAID", CREATED_AT),
+        ]
+
+        inserted = await import_rows(importers, parse_shard_map("512-1023:1", 2), rows)
+        assert inserted == [(1, CREATED_AT, 1.0), (1024 + 600, CREATED_AT, 1.0)]
+        importers[0].known_users.assert_awaited_once_with({1, 1024 + 600, 7})
+        importers[0].copy.assert_awaited_once_with([rows[0]])
+        importers[1].copy.assert_awaited_once_with([rows[1]])
+
+    @pytest.mark.asyncio
+    async def test_imported_orders_update_rollups_and_drop_summaries(self, monkeypatch):
+        flushed = []
+
+        async def flush(rollups, db):
+            flushed.append(rollups)
+
+        monkeypatch.setattr("app.db.bulk.RollupAggregator.flush", flush)
+        monkeypatch.setattr("app.db.bulk.AsyncSessionLocal", MagicMock())
+        invalidate = AsyncMock()
+        monkeypatch.setattr("app.db.bulk.invalidate_summaries", invalidate)
+        redis = AsyncMock()
+        inserted = [(1, CREATED_AT, 10.0), (1, CREATED_AT, 5.0), (2, CREATED_AT, 1.0)]
+
+        await apply_imported(redis, inserted)
+
+        (rollups,) = flushed
+        day = CREATED_AT.replace(hour=0)
+        assert rollups.buckets[(Granularity.DAY, day)] == [3, 16.0]
+        invalidate.assert_awaited_once_with(redis, {1, 2})
@@ -0,0 +1,124 @@
+import json
+
+import pytest
+from app.schemas.order import OrderItem
+from app.services.catalog import (
+    CatalogUnavailable,
+    PriceCatalog,
+    PriceMismatch,
+    UnknownProducts,
+)
+
+
+def items(*lines: tuple[str, int]) -> list[OrderItem]:
+    return [
+        OrderItem(product_id=product_id, quantity=quantity, price=1.0)
+        for product_id, quantity in lines
+    ]
+
+
+class TestPriceCatalog:
+    def test_reprice(self, price_catalog):
+        unit, total = price_catalog.reprice(items(("P1", 3), ("P2", 1), ("P1", 2)))
+        assert unit.tolist() == [1000, 3000, 1000]
+        assert total == 8000
+
+    def test_unknown_products(self, price_catalog):
+        with pytest.raises(UnknownProducts) as exc:
+            price_catalog.reprice(items(("P1", 1), ("NOPE", 1), ("GONE", 2), ("NOPE", 1)))
+        assert exc.value.product_ids == ["GONE", "NOPE"]
+
+    def test_not_loaded(self):
+        with pytest.raises(CatalogUnavailable):
+            PriceCatalog().reprice(items(("P1", 1)))
+
+    def test_overflow(self, price_catalog):
+        with pytest.raises(OverflowError):
+            price_catalog.reprice(items(("P1", 2**62), ("P2", 2**62)))
+
+    def test_set_price_grows_and_deletes(self, price_catalog):
+        for i in range(20):
+            price_catalog.set_price(f"NEW-{i}", 100 + i)
+        assert price_catalog.products == 23
+        assert price_catalog.price_cents("NEW-19") == 119
+        assert price_catalog.price_cents("P1") == 1000
+
+        price_catalog.set_price("P1", None)
+        price_catalog.set_price("MISSING", None)
+        assert price_catalog.products == 22
+        with pytest.raises(UnknownProducts):
+            price_catalog.reprice(items(("P1", 1)))
+        price_catalog.set_price("P1", 1200)
+        assert price_catalog.reprice(items(("P1", 1)))[1] == 1200
+
+    def test_notification(self, price_catalog):
+        payload = json.dumps({"id": "P2", "price_cents": 2500})
+        price_catalog.on_notification(None, 1, "product_changes", payload)
+        assert price_catalog.price_cents("P2") == 2500
+        price_catalog.on_notification(None, 1, "product_changes", "not json")
+        assert price_catalog.price_cents("P2") == 2500
+
+    def test_price_order_uses_catalog_prices(self, price_catalog):
+        priced, total = price_catalog.price_order(items(("P1", 2), ("P2", 1)), 50.0)
+        assert total == 50.0
+        assert priced == [
+            {"product_id": "P1", "quantity": 2, "price": 10.0},
+            {"product_id": "P2", "quantity": 1, "price": 30.0},
+        ]
+        with pytest.raises(PriceMismatch) as exc:
+            price_catalog.price_order(items(("P1", 2)), 19.99)
+        assert exc.value.expected_total == 20.0
+
+
+class TestCreateOrderPricing:
+    @pytest.mark.asyncio
+    async def test_total_mismatch(self, client, mock_db):
+        response = await client.post(
+            "/orders/",
+            json={
+                "items": [{"product_id": "P1", "quantity": 2, "price": 5.0}],
+                "total_price": 10.0,
+            },
+        )
+        assert response.status_code == 409
+        assert "20.00" in response.json()["detail"]
+        mock_db.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_unknown_product(self, client):
+        response = await client.post(
+            "/orders/",
+            json={
+                "items": [{"product_id": "PROD-404", "quantity": 1, "price": 5.0}],
+                "total_price": 5.0,
+            },
+        )
+        assert response.status_code == 422
+        assert "PROD-404" in response.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_catalog_not_loaded(self, client, price_catalog):
+        price_catalog.loaded = False
+        response = await client.post(
+            "/orders/",
+            json={
+                "items": [{"product_id": "P1", "quantity": 1, "price": 10.0}],
+                "total_price": 10.0,
+            },
+        )
+        assert response.status_code == 503
+
+    @pytest.mark.asyncio
+    async def test_stored_items_use_catalog_prices(self, client, mock_db):
+        mock_db.commit.side_effect = RuntimeError("stop")
+        with pytest.raises(RuntimeError):
+            await client.post(
+                "/orders/",
+                json={
+                    "items": [{"product_id": "P2", "quantity": 1, "price": 0.01}],
+                    "total_price": 30.0,
+                },
+            )
+        order = mock_db.add.call_args.args[0]
+        assert order.items == [{"product_id": "P2", "quantity": 1, "price": 30.0}]
+        assert order.total_price == 30.0
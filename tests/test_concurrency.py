@@ -0,0 +1,173 @@
+import asyncio
+
+import pytest
+from app.core.concurrency import (
+    CRITICAL,
+    DEFAULT,
+    READ,
+    WRITE,
+    AdaptiveLimiter,
+    ConcurrencyLimitMiddleware,
+    classify,
+)
+from app.core.config import get_settings
+from app.main import create_app
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+ORDER_ID = "a1b2c3d4-e5f6-7890-abcd-ef1234567890"
+
+
+def make_limiter(limit: int = 4, max_wait: float = 0.0, target_latency: float = 0.1):
+    return AdaptiveLimiter(
+        "test",
+        initial=limit,
+        min_limit=2,
+        max_limit=8,
+        target_latency=target_latency,
+        max_wait=max_wait,
+    )
+
+
+class TestClassify:
+    @pytest.mark.parametrize(
+        ("method", "path", "expected"),
+        [
+            ("GET", "/health/ready/", ("other", CRITICAL)),
+            ("GET", "/metrics", ("other", CRITICAL)),
+            ("GET", "/orders/events/", ("other", CRITICAL)),
+            ("GET", f"/orders/{ORDER_ID}/", ("orders", READ)),
+            ("GET", "/orders/user/1/", ("orders", DEFAULT)),
+            ("PATCH", f"/orders/{ORDER_ID}/", ("orders", WRITE)),
+            ("POST", "/token/", ("auth", WRITE)),
+            ("GET", "/unknown/", ("other", DEFAULT)),
+        ],
+    )
+    def test_classify(self, method, path, expected):
+        assert classify(method, path) == expected
+
+
+class TestAdaptiveLimiter:
+    @pytest.mark.asyncio
+    async def test_writes_leave_headroom_for_reads(self):
+        limiter = make_limiter(limit=4)
+        assert [await limiter.acquire(WRITE) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert await limiter.acquire(WRITE) is None
+        assert await limiter.acquire(READ) == 0.0
+        assert await limiter.acquire(READ) is None
+        assert limiter.inflight == 4
+
+    @pytest.mark.asyncio
+    async def test_waiters_are_woken_by_priority(self):
+        limiter = make_limiter(limit=2, max_wait=1.0)
+        await limiter.acquire(READ)
+        await limiter.acquire(READ)
+        write = asyncio.create_task(limiter.acquire(WRITE))
+        read = asyncio.create_task(limiter.acquire(READ))
+        await asyncio.sleep(0)
+
+        limiter.release(0.01)
+        await asyncio.sleep(0.01)
+        assert read.done() and not write.done()
+
+        limiter.release(0.01)
+        limiter.release(0.01)
+        assert await write is not None
+        assert await read is not None
+
+    @pytest.mark.asyncio
+    async def test_queue_wait_is_bounded(self):
+        limiter = make_limiter(limit=2, max_wait=0.01)
+        await limiter.acquire(READ)
+        await limiter.acquire(READ)
+        assert await limiter.acquire(READ) is None
+        assert limiter.waiters == []
+
+    def test_backs_off_when_slow_and_grows_under_load(self):
+        limiter = make_limiter(limit=4)
+        limiter.inflight = 3
+        limiter.release(0.5)
+        limiter.inflight += 1
+        limiter.release(0.5)
+        assert limiter.limit == pytest.approx(3.6)
+
+        limiter.last_decrease = 0.0
+        for _ in range(10):
+            limiter.update(0.5)
+            limiter.last_decrease = 0.0
+        assert limiter.limit == 2
+
+        limiter.inflight = 4
+        for _ in range(100):
+            limiter.update(0.01)
+        assert limiter.limit == 8
+
+    def test_does_not_grow_when_idle(self):
+        limiter = make_limiter(limit=6)
+        for _ in range(10):
+            limiter.update(0.01)
+        assert limiter.limit == 6
+
+
+class TestConcurrencyLimitMiddleware:
+    @pytest.mark.asyncio
+    async def test_sheds_excess_requests(self):
+        app = FastAPI()
+        release = asyncio.Event()
+
+        @app.post("/orders/")
+        async def create() -> dict:
+            await release.wait()
+            return {}
+
+        @app.get("/health/live/")
+        async def live() -> dict:
+            return {"status": "ok"}
+
+        app.add_middleware(
+            ConcurrencyLimitMiddleware,
+            initial=1,
+            min_limit=1,
+            max_limit=1,
+            target_latency=1.0,
+            max_wait=0.0,
+            retry_after=2,
+        )
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            first = asyncio.create_task(ac.post("/orders/"))
+            await asyncio.sleep(0.01)
+            shed = await ac.post("/orders/")
+            health = await ac.get("/health/live/")
+            release.set()
+            assert (await first).status_code == 200
+
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == "2"
+        assert health.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_shed_response_has_cors_headers(self, monkeypatch):
+        for name in ("INITIAL", "MIN", "MAX"):
+            monkeypatch.setenv(f"CONCURRENCY_LIMIT_{name}", "1")
+        get_settings.cache_clear()
+        try:
+            app = create_app()
+        finally:
+            get_settings.cache_clear()
+
+        release = asyncio.Event()
+
+        @app.get("/slow/")
+        async def slow() -> dict:
+            await release.wait()
+            return {}
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            first = asyncio.create_task(ac.get("/slow/"))
+            await asyncio.sleep(0.01)
+            shed = await ac.post("/slow/", headers={"Origin": "https://shop.example"})
+            release.set()
+            await first
+
+        assert shed.status_code == 503
+        assert shed.headers["access-control-allow-origin"] == "https://shop.example"
@@ -0,0 +1,262 @@
+from datetime import date, datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import UUID, uuid4
+
+import pytest
+from app.db.partitions import (
+    FIND_DEFAULT_PARTITION,
+    add_months,
+    create_partition,
+    create_partitions,
+    partition_name,
+)
+from app.db.routing import ReplicaRouter, recent_write_key
+from app.db.session import RoutingAsyncSession, RoutingSession, get_engine, read_only
+from app.models.order import new_order_id, order_id_timestamp
+from app.services.orders import get_order
+
+
+def make_router(
+    replicas: int = 2, read_your_writes: float = 10.0, redis: AsyncMock | None = None
+) -> ReplicaRouter:
+    engines = [MagicMock(name=f"replica-{i}") for i in range(replicas)]
+    return ReplicaRouter(engines, max_lag=5.0, read_your_writes=read_your_writes, redis=redis)
+
+
+class SharedMarks:
+    # Stands in for the Redis keys every process of the API sees.
+    def __init__(self) -> None:
+        self.keys: dict[str, int] = {}
+        self.redis = AsyncMock()
+        self.redis.set.side_effect = self.set
+        self.redis.exists.side_effect = lambda key: int(key in self.keys)
+
+    async def set(self, key: str, value: int, px: int) -> bool:
+        self.keys[key] = px
+        return True
+
+
+class TestReplicaRouter:
+    def test_no_replicas(self):
+        router = make_router(replicas=0)
+        assert router.choose() is None
+
+    def test_unchecked_replicas_are_skipped(self):
+        router = make_router()
+        assert router.choose() is None
+
+    def test_round_robin_over_healthy(self):
+        router = make_router()
+        for replica in router.replicas:
+            replica.healthy = True
+        chosen = {router.choose() for _ in range(4)}
+        assert chosen == {replica.engine for replica in router.replicas}
+
+    def test_unhealthy_replica_skipped(self):
+        router = make_router()
+        router.replicas[0].healthy = True
+        assert all(router.choose() is router.replicas[0].engine for _ in range(3))
+
+    @pytest.mark.asyncio
+    async def test_read_your_writes_window(self):
+        router = make_router()
+        await router.record_write(1)
+        assert await router.wrote_recently(1)
+        assert not await router.wrote_recently(2)
+
+    @pytest.mark.asyncio
+    async def test_read_your_writes_window_expires(self):
+        router = make_router(read_your_writes=0.0)
+        await router.record_write(1)
+        assert not await router.wrote_recently(1)
+
+    @pytest.mark.asyncio
+    async def test_write_is_seen_by_other_processes(self):
+        marks = SharedMarks()
+        writer = make_router(read_your_writes=2.5, redis=marks.redis)
+        reader = make_router(read_your_writes=2.5, redis=marks.redis)
+
+        await writer.record_write(1)
+        assert marks.keys == {recent_write_key(1): 2500}
+        assert await reader.wrote_recently(1)
+        assert not await reader.wrote_recently(2)
+
+    @pytest.mark.asyncio
+    async def test_reads_stay_on_primary_when_redis_fails(self):
+        redis = AsyncMock()
+        redis.exists.side_effect = ConnectionError("down")
+        router = make_router(redis=redis)
+        assert await router.wrote_recently(1)
+
+    @pytest.mark.asyncio
+    async def test_check_marks_lagging_replica_unhealthy(self):
+        router = make_router(replicas=1)
+        replica = router.replicas[0]
+        result = MagicMock()
+        result.scalar_one.return_value = 30.0
+        conn = AsyncMock()
+        conn.execute.return_value = result
+        replica.engine.connect.return_value.__aenter__.return_value = conn
+        replica.healthy = True
+
+        await router.check_lag()
+        assert replica.lag == 30.0
+        assert not replica.healthy
+
+    @pytest.mark.asyncio
+    async def test_check_marks_unreachable_replica_unhealthy(self):
+        router = make_router(replicas=1)
+        replica = router.replicas[0]
+        replica.engine.connect.side_effect = ConnectionError("down")
+        replica.healthy = True
+
+        await router.check_lag()
+        assert replica.lag is None
+        assert not replica.healthy
+
+
+class TestRoutingSession:
+    def test_writes_go_to_primary(self):
+        session = RoutingSession()
+        assert session.get_bind() is get_engine().sync_engine
+
+    def test_read_only_falls_back_to_primary(self):
+        session = RoutingSession()
+        session.info["read_only"] = True
+        assert session.get_bind() is get_engine().sync_engine
+
+    def test_read_only_uses_replica(self):
+        replica = MagicMock()
+        session = RoutingSession()
+        session.info["read_only"] = True
+        with patch("app.db.session.get_replica_router") as get_router:
+            get_router.return_value.choose.return_value = replica
+            assert session.get_bind() is replica.sync_engine
+
+    def test_primary_reads_skip_replicas(self):
+        session = RoutingSession()
+        session.info.update(read_only=True, primary_reads=True)
+        with patch("app.db.session.get_replica_router") as get_router:
+            assert session.get_bind() is get_engine().sync_engine
+            get_router.return_value.choose.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_read_only_checks_recent_writes_once(self):
+        db = MagicMock()
+        db.info = {"user_id": 1}
+
+        @read_only
+        async def query(session):
+            return session.info["primary_reads"]
+
+        with patch("app.db.session.get_replica_router") as get_router:
+            get_router.return_value.wrote_recently = AsyncMock(return_value=True)
+            assert await query(db) is True
+            assert await query(db) is True
+            get_router.return_value.wrote_recently.assert_awaited_once_with(1)
+
+    @pytest.mark.asyncio
+    async def test_commit_marks_write(self):
+        session = RoutingAsyncSession()
+        session.info["user_id"] = 7
+        session.info["wrote"] = True
+        with (
+            patch("sqlalchemy.ext.asyncio.AsyncSession.commit", AsyncMock()),
+            patch("app.db.session.get_replica_router") as get_router,
+        ):
+            get_router.return_value.record_write = AsyncMock()
+            await session.commit()
+            get_router.return_value.record_write.assert_awaited_once_with(7)
+        assert session.info["primary_reads"] is True
+        assert "wrote" not in session.info
+
+    @pytest.mark.asyncio
+    async def test_read_only_decorator_restores_flag(self):
+        db = MagicMock()
+        db.info = {}
+
+        @read_only
+        async def query(session):
+            return session.info["read_only"]
+
+        assert await query(db) is True
+        assert db.info["read_only"] is False
+
+
+class TestPartitions:
+    def test_add_months_wraps_year(self):
+        assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+
+    def test_partition_name(self):
+        assert partition_name(date(2026, 3, 1)) == "orders_p202603"
+
+    @pytest.mark.asyncio
+    async def test_create_partitions(self):
+        async def execute(statement, *args):
+            parent = None if statement is FIND_DEFAULT_PARTITION else "orders"
+            return MagicMock(**{"scalar_one_or_none.return_value": parent})
+
+        conn = AsyncMock()
+        conn.execute.side_effect = execute
+
+        names = await create_partitions(conn, months_ahead=2, today=date(2026, 12, 15))
+        assert names == ["orders_p202612", "orders_p202701", "orders_p202702"]
+        statement = str(conn.execute.await_args_list[-1].args[0])
+        assert "PARTITION OF orders" in statement
+        assert "FROM ('2027-02-01') TO ('2027-03-01')" in statement
+
+    @pytest.mark.asyncio
+    async def test_rows_in_default_partition_move_to_new_partition(self):
+        async def execute(statement, *args):
+            default = "orders_default" if statement is FIND_DEFAULT_PARTITION else None
+            return MagicMock(
+                **{"scalar_one_or_none.return_value": default, "scalar.return_value": True}
+            )
+
+        conn = AsyncMock()
+        conn.execute.side_effect = execute
+
+        assert await create_partition(conn, "orders", date(2031, 5, 1)) == "orders_p203105"
+        statements = [str(call.args[0]) for call in conn.execute.await_args_list[2:]]
+        assert statements[0] == "ALTER TABLE orders DETACH PARTITION orders_default"
+        assert "PARTITION OF orders" in statements[1]
+        assert statements[2].startswith("INSERT INTO orders_p203105")
+        assert "created_at >= '2031-05-01' AND created_at < '2031-06-01'" in statements[2]
+        assert statements[3].startswith("DELETE FROM orders_default")
+        assert statements[4] == "ALTER TABLE orders ATTACH PARTITION orders_default DEFAULT"
+
+    @pytest.mark.asyncio
+    async def test_create_partitions_requires_partitioned_table(self):
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = None
+        conn = AsyncMock()
+        conn.execute.return_value = result
+
+        with pytest.raises(RuntimeError):
+            await create_partitions(conn, months_ahead=1)
+
+
+class TestOrderIds:
+    def test_id_carries_creation_time(self):
+        created_at = datetime(2026, 5, 17, 12, 30, tzinfo=timezone.utc)
+        order_id = new_order_id(created_at)
+        assert UUID(order_id).version == 7
+        assert order_id_timestamp(order_id) == created_at
+
+    def test_ids_sort_by_time(self):
+        first = new_order_id(datetime(2026, 1, 1, tzinfo=timezone.utc))
+        second = new_order_id(datetime(2026, 1, 2, tzinfo=timezone.utc))
+        assert first < second
+
+    def test_random_ids_have_no_timestamp(self):
+        assert order_id_timestamp(str(uuid4())) is None
+
+    @pytest.mark.asyncio
+    async def test_get_order_prunes_by_id_time(self):
+        db = AsyncMock()
+        db.info = {}
+        db.execute.return_value = MagicMock()
+        await get_order(db, new_order_id())
+        statement = str(db.execute.await_args.args[0])
+        assert "orders.created_at >=" in statement
+        assert "orders.created_at <" in statement
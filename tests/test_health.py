@@ -1,43 +1,146 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
 import pytest
+from app.api.routes import health
+from app.services.health import HealthMonitor, Probe, ProbeResult
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+
+@pytest.fixture
+def postgres_check():
+    return AsyncMock()
+
+
+@pytest.fixture
+def redis_check():
+    return AsyncMock()
+
+
+@pytest.fixture
+def monitor(postgres_check, redis_check):
+    return HealthMonitor(
+        [Probe("postgres", postgres_check, 0.05), Probe("redis", redis_check, 0.05)],
+        interval=5,
+    )
+
+
+@pytest.fixture
+async def health_client(monitor):
+    application = FastAPI()
+    application.include_router(health)
+    application.state.health_monitor = monitor
+    async with AsyncClient(
+        transport=ASGITransport(app=application),
+        base_url="http://test",
+    ) as ac:
+        yield ac
 
 
 class TestHealth:
     @pytest.mark.asyncio
-    async def test_healthy(self, client, mock_db, mock_redis):
-        response = await client.get("/health/")
+    async def test_healthy(self, health_client, monitor):
+        await monitor.refresh()
+
+        response = await health_client.get("/health/")
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "healthy"
         assert data["services"]["postgres"] == "ok"
         assert data["services"]["redis"] == "ok"
+        assert data["checks"]["postgres"]["latency_ms"] is not None
 
     @pytest.mark.asyncio
-    async def test_postgres_down(self, client, mock_db, mock_redis):
-        mock_db.execute.side_effect = ConnectionError("pg down")
+    async def test_postgres_down(self, health_client, monitor, postgres_check):
+        postgres_check.side_effect = ConnectionError("pg down")
+        await monitor.refresh()
 
-        response = await client.get("/health/")
+        response = await health_client.get("/health/")
         data = response.json()
         assert data["status"] == "degraded"
         assert data["services"]["postgres"] == "unavailable"
         assert data["services"]["redis"] == "ok"
 
     @pytest.mark.asyncio
-    async def test_redis_down(self, client, mock_db, mock_redis):
-        mock_redis.ping.side_effect = ConnectionError("redis down")
+    async def test_redis_down(self, health_client, monitor, redis_check):
+        redis_check.side_effect = ConnectionError("redis down")
+        await monitor.refresh()
 
-        response = await client.get("/health/")
+        response = await health_client.get("/health/")
         data = response.json()
         assert data["status"] == "degraded"
         assert data["services"]["postgres"] == "ok"
         assert data["services"]["redis"] == "unavailable"
 
     @pytest.mark.asyncio
-    async def test_all_down(self, client, mock_db, mock_redis):
-        mock_db.execute.side_effect = ConnectionError("pg down")
-        mock_redis.ping.side_effect = ConnectionError("redis down")
+    async def test_all_down(self, health_client, monitor, postgres_check, redis_check):
+        postgres_check.side_effect = ConnectionError("pg down")
+        redis_check.side_effect = ConnectionError("redis down")
+        await monitor.refresh()
 
-        response = await client.get("/health/")
+        response = await health_client.get("/health/")
         data = response.json()
         assert data["status"] == "degraded"
         assert data["services"]["postgres"] == "unavailable"
         assert data["services"]["redis"] == "unavailable"
+
+    @pytest.mark.asyncio
+    async def test_hung_dependency_times_out(self, health_client, monitor, postgres_check):
+        async def hang():
+            await asyncio.sleep(10)
+
+        postgres_check.side_effect = hang
+        await asyncio.wait_for(monitor.refresh(), timeout=1)
+
+        data = (await health_client.get("/health/")).json()
+        assert data["checks"]["postgres"]["status"] == "timeout"
+        assert data["checks"]["redis"]["status"] == "ok"
+
+    @pytest.mark.asyncio
+    async def test_served_from_cache(self, health_client, monitor, postgres_check):
+        await monitor.refresh()
+        await health_client.get("/health/")
+        await health_client.get("/health/ready/")
+        postgres_check.assert_awaited_once()
+
+
+class TestProbes:
+    @pytest.mark.asyncio
+    async def test_live(self, health_client):
+        response = await health_client.get("/health/live/")
+        assert response.status_code == 200
+        assert response.json() == {"status": "alive"}
+
+    @pytest.mark.asyncio
+    async def test_not_ready_before_first_check(self, health_client):
+        response = await health_client.get("/health/ready/")
+        assert response.status_code == 503
+        assert response.json()["checks"]["postgres"]["status"] == "unknown"
+
+    @pytest.mark.asyncio
+    async def test_ready(self, health_client, monitor):
+        await monitor.refresh()
+        assert (await health_client.get("/health/ready/")).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_optional_dependency_does_not_gate_readiness(self, monitor):
+        kafka_check = AsyncMock(side_effect=ConnectionError("kafka down"))
+        monitor.probes.append(Probe("kafka", kafka_check, 0.05, critical=False))
+        monitor.results["kafka"] = ProbeResult("unknown", None, None)
+        await monitor.refresh()
+
+        results = monitor.current()
+        assert results["kafka"].status == "unavailable"
+        assert monitor.is_ready(results)
+
+    @pytest.mark.asyncio
+    async def test_stale_results_not_ready(self, health_client, monitor):
+        await monitor.refresh()
+        checked_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+        monitor.results["redis"] = ProbeResult("ok", 1.0, checked_at)
+
+        response = await health_client.get("/health/ready/")
+        assert response.status_code == 503
+        assert response.json()["checks"]["redis"]["status"] == "unknown"
@@ -0,0 +1,187 @@
+import json
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from app.models.order import OrderStatus
+from app.services.idempotency import (
+    IdempotencyKeyInProgress,
+    begin_request,
+    request_fingerprint,
+    stored_response_key,
+)
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+ORDER_BODY = {
+    "items": [{"product_id": "PROD-001", "quantity": 2, "price": 50.0}],
+    "total_price": 100.0,
+}
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+def set_order_attrs(obj):
+    obj.id = "a1b2c3d4-e5f6-7890-abcd-ef1234567890"
+    obj.user_id = 1
+    obj.items = ORDER_BODY["items"]
+    obj.total_price = 100.0
+    obj.status = OrderStatus.PENDING
+    obj.created_at = datetime.now(timezone.utc)
+
+
+@pytest.fixture
+def fake_redis(mock_redis):
+    fake = FakeRedis()
+    mock_redis.set = AsyncMock(side_effect=fake.set)
+    mock_redis.get = AsyncMock(side_effect=fake.get)
+    mock_redis.delete = AsyncMock(side_effect=fake.delete)
+    return fake
+
+
+class TestIdempotentCreate:
+    @pytest.mark.asyncio
+    @patch("app.messaging.producer.get_kafka_producer")
+    async def test_replay_returns_stored_response(
+        self, mock_get_producer, client, mock_db, fake_redis
+    ):
+        mock_producer = AsyncMock()
+        mock_get_producer.return_value = mock_producer
+        mock_db.refresh.side_effect = set_order_attrs
+        headers = {"Idempotency-Key": "retry-1"}
+
+        first = await client.post("/orders/", json=ORDER_BODY, headers=headers)
+        assert first.status_code == 201
+        stored = json.loads(fake_redis.data[stored_response_key(1, "retry-1")])
+        assert stored["state"] == "done"
+
+        second = await client.post("/orders/", json=ORDER_BODY, headers=headers)
+        assert second.status_code == 201
+        assert second.json() == first.json()
+        assert second.headers["Idempotent-Replayed"] == "true"
+        mock_db.commit.assert_awaited_once()
+        mock_producer.send_and_wait.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    @patch("app.messaging.producer.get_kafka_producer")
+    async def test_key_reused_with_other_body(self, mock_get_producer, client, mock_db, fake_redis):
+        mock_get_producer.return_value = AsyncMock()
+        mock_db.refresh.side_effect = set_order_attrs
+        headers = {"Idempotency-Key": "retry-2"}
+
+        await client.post("/orders/", json=ORDER_BODY, headers=headers)
+        response = await client.post(
+            "/orders/", json={**ORDER_BODY, "total_price": 200.0}, headers=headers
+        )
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_failed_request_releases_key(self, client, mock_db, fake_redis):
+        mock_db.commit.side_effect = ConnectionError("pg down")
+
+        with pytest.raises(ConnectionError):
+            await client.post("/orders/", json=ORDER_BODY, headers={"Idempotency-Key": "retry-3"})
+        assert stored_response_key(1, "retry-3") not in fake_redis.data
+
+    @pytest.mark.asyncio
+    @patch("app.messaging.producer.get_kafka_producer")
+    async def test_publish_failure_keeps_stored_response(
+        self, mock_get_producer, client, mock_db, fake_redis, event_spool
+    ):
+        mock_producer = AsyncMock()
+        mock_producer.send_and_wait.side_effect = ConnectionError("kafka down")
+        mock_get_producer.return_value = mock_producer
+        mock_db.refresh.side_effect = set_order_attrs
+
+        response = await client.post(
+            "/orders/", json=ORDER_BODY, headers={"Idempotency-Key": "retry-4"}
+        )
+        assert response.status_code == 201
+        assert stored_response_key(1, "retry-4") in fake_redis.data
+        assert event_spool.active.exists()
+
+    @pytest.mark.asyncio
+    async def test_unavailable_store_rejects_before_creating(self, client, mock_db, mock_redis):
+        mock_redis.set = AsyncMock(side_effect=RedisConnectionError("redis down"))
+
+        response = await client.post(
+            "/orders/", json=ORDER_BODY, headers={"Idempotency-Key": "retry-5"}
+        )
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "30"
+        mock_db.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    @patch("app.messaging.producer.get_kafka_producer")
+    async def test_store_failure_after_commit_still_returns_order(
+        self, mock_get_producer, client, mock_db, fake_redis, mock_redis
+    ):
+        mock_get_producer.return_value = AsyncMock()
+        mock_db.refresh.side_effect = set_order_attrs
+        marker = fake_redis.set
+
+        async def set_once(key, value, nx=False, ex=None):
+            if not nx:
+                raise RedisConnectionError("redis down")
+            return await marker(key, value, nx=nx, ex=ex)
+
+        mock_redis.set = AsyncMock(side_effect=set_once)
+        response = await client.post(
+            "/orders/", json=ORDER_BODY, headers={"Idempotency-Key": "retry-6"}
+        )
+        assert response.status_code == 201
+        stored = json.loads(fake_redis.data[stored_response_key(1, "retry-6")])
+        assert stored["state"] == "in_progress"
+
+
+class TestBeginRequest:
+    @pytest.mark.asyncio
+    async def test_in_flight_duplicate_times_out(self):
+        redis = FakeRedis()
+        fingerprint = request_fingerprint("{}")
+        assert await begin_request(redis, "key", fingerprint, 30, 0) is None
+
+        with pytest.raises(IdempotencyKeyInProgress):
+            await begin_request(redis, "key", fingerprint, 30, 0.1, poll_interval=0.01)
+
+    @pytest.mark.asyncio
+    async def test_waits_for_in_flight_request(self):
+        redis = FakeRedis()
+        fingerprint = request_fingerprint("{}")
+        await begin_request(redis, "key", fingerprint, 30, 0)
+
+        async def finish_later():
+            await redis.set(
+                "key",
+                json.dumps(
+                    {"state": "done", "fingerprint": fingerprint, "status_code": 201, "body": "{}"}
+                ),
+            )
+
+        original_get = redis.get
+        calls = 0
+
+        async def get(key):
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                await finish_later()
+            return await original_get(key)
+
+        redis.get = get
+        stored = await begin_request(redis, "key", fingerprint, 30, 1, poll_interval=0.01)
+        assert stored.status_code == 201
@@ -0,0 +1,138 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from app.core.metrics import (
+    MetricsMiddleware,
+    instrument_engine,
+    instrument_redis,
+    observe,
+    statement_kind,
+)
+from app.core.resilience import CircuitBreaker
+from app.services.cache import get_cached_order
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def request_count(route: str, status: str) -> float:
+    return sample("http_request_duration_seconds_count", method="GET", route=route, status=status)
+
+
+class TestMetricsMiddleware:
+    @pytest.mark.asyncio
+    async def test_labels_by_route_template(self):
+        app = FastAPI()
+
+        @app.get("/things/{thing_id}/")
+        async def read_thing(thing_id: int) -> dict:
+            return {"id": thing_id}
+
+        app.add_middleware(MetricsMiddleware)
+        before = request_count("/things/{thing_id}/", "200")
+        unmatched = request_count("unmatched", "404")
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            await ac.get("/things/1/")
+            await ac.get("/things/2/")
+            await ac.get("/missing/")
+
+        assert request_count("/things/{thing_id}/", "200") == before + 2
+        assert request_count("unmatched", "404") == unmatched + 1
+        assert sample("http_requests_in_progress", method="GET") == 0
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint(self, client):
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert b"dependency_call_duration_seconds" in response.content
+
+
+class TestCircuitBreakerState:
+    @pytest.mark.asyncio
+    async def test_state_is_exported(self, client):
+        breaker = CircuitBreaker(
+            "metrics-test", failure_threshold=1, reset_timeout=0, call_timeout=1
+        )
+
+        async def state() -> str:
+            response = await client.get("/metrics")
+            (line,) = [
+                line
+                for line in response.text.splitlines()
+                if line.startswith('circuit_breaker_state{breaker="metrics-test"}')
+            ]
+            return line.split()[-1]
+
+        assert await state() == "0.0"
+        breaker.record_failure()
+        assert await state() == "2.0"
+        assert breaker.allow()
+        assert await state() == "1.0"
+        breaker.record_success(trial=True)
+        assert await state() == "0.0"
+
+
+class TestDependencyTimings:
+    def test_observe_counts_failures(self):
+        errors = sample("dependency_call_errors_total", dependency="kafka", operation="send")
+        with pytest.raises(ConnectionError), observe("kafka", "send"):
+            raise ConnectionError("no broker")
+        assert sample("dependency_call_errors_total", dependency="kafka", operation="send") == (
+            errors + 1
+        )
+
+    @pytest.mark.asyncio
+    async def test_redis_commands_are_timed(self):
+        redis = SimpleNamespace(execute_command=AsyncMock(return_value="v"))
+        before = sample(
+            "dependency_call_duration_seconds_count", dependency="redis", operation="GET"
+        )
+
+        instrument_redis(redis)
+        assert await redis.execute_command("GET", "key") == "v"
+
+        assert sample(
+            "dependency_call_duration_seconds_count", dependency="redis", operation="GET"
+        ) == (before + 1)
+
+    def test_sql_statements_are_timed(self):
+        engine = create_engine("sqlite://")
+        instrument_engine(SimpleNamespace(sync_engine=engine))
+        labels = {"dependency": "postgres", "operation": "SELECT"}
+        before = sample("dependency_call_duration_seconds_count", **labels)
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT missing FROM nowhere"))
+
+        assert sample("dependency_call_duration_seconds_count", **labels) == before + 2
+        assert sample("dependency_call_errors_total", **labels) >= 1
+
+    def test_statement_kind(self):
+        assert statement_kind("\n  insert into orders values (1)") == "INSERT"
+        assert statement_kind("") == "EMPTY"
+
+
+class TestCacheMetrics:
+    @pytest.mark.asyncio
+    async def test_hit_miss_and_skipped(self, mock_redis):
+        results = ("hit", "miss", "skipped")
+        counts = {result: sample("order_cache_requests_total", result=result) for result in results}
+
+        await get_cached_order(mock_redis, "o1")
+        mock_redis.get.side_effect = ConnectionError("redis down")
+        await get_cached_order(mock_redis, "o1")
+
+        assert sample("order_cache_requests_total", result="miss") == counts["miss"] + 1
+        assert sample("order_cache_requests_total", result="skipped") == counts["skipped"] + 1
+        assert sample("order_cache_requests_total", result="hit") == counts["hit"]
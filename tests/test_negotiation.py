@@ -0,0 +1,128 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import msgpack
+import pytest
+from app.api.negotiation import choose_encoding, parse_quality_list
+from app.models.order import OrderStatus
+
+
+def mock_orders(mock_db, orders):
+    mock_scalars = MagicMock()
+    mock_scalars.all.return_value = orders
+    mock_result = MagicMock()
+    mock_result.scalars.return_value = mock_scalars
+    mock_db.execute.return_value = mock_result
+
+
+class TestHeaderParsing:
+    def test_quality_list(self):
+        assert parse_quality_list("gzip;q=0.5, br , identity;q=x") == {
+            "gzip": 0.5,
+            "br": 1.0,
+            "identity": 0.0,
+        }
+
+    def test_prefers_brotli(self):
+        assert choose_encoding("gzip, br") == "br"
+        assert choose_encoding("gzip, br;q=0") == "gzip"
+        assert choose_encoding("*") == "br"
+        assert choose_encoding("identity") is None
+        assert choose_encoding("") is None
+
+
+class TestResponseNegotiation:
+    @pytest.mark.asyncio
+    async def test_msgpack_response(self, client, mock_db, test_order):
+        mock_orders(mock_db, [test_order])
+
+        response = await client.get("/orders/user/1/", headers={"Accept": "application/msgpack"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/msgpack"
+        data = msgpack.unpackb(response.content)
+        assert data[0]["id"] == test_order.id
+        assert data[0]["items"] == test_order.items
+
+    @pytest.mark.asyncio
+    async def test_json_by_default(self, client, mock_db, test_order):
+        mock_orders(mock_db, [test_order])
+
+        response = await client.get("/orders/user/1/")
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["vary"] == "Accept, Accept-Encoding"
+        assert "content-encoding" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_large_response_compressed(self, client, mock_db, test_order):
+        mock_orders(mock_db, [test_order] * 50)
+
+        response = await client.get("/orders/user/1/", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert int(response.headers["content-length"]) < len(response.content)
+        assert len(response.json()) == 50
+
+    @pytest.mark.asyncio
+    async def test_small_response_not_compressed(self, client, mock_db, test_order):
+        mock_orders(mock_db, [test_order])
+
+        response = await client.get("/orders/user/1/", headers={"Accept-Encoding": "gzip, br"})
+        assert "content-encoding" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_compressed_msgpack(self, client, mock_db, test_order):
+        mock_orders(mock_db, [test_order] * 50)
+
+        response = await client.get(
+            "/orders/user/1/",
+            headers={"Accept": "application/msgpack", "Accept-Encoding": "gzip"},
+        )
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(msgpack.unpackb(response.content)) == 50
+
+
+class TestMsgpackRequest:
+    @pytest.mark.asyncio
+    @patch("app.messaging.producer.get_kafka_producer")
+    async def test_create_order_from_msgpack(self, mock_get_producer, client, mock_db):
+        mock_get_producer.return_value = AsyncMock()
+
+        async def set_order_attrs(obj):
+            obj.id = "a1b2c3d4-e5f6-7890-abcd-ef1234567890"
+            obj.status = OrderStatus.PENDING
+            obj.created_at = datetime.now(timezone.utc)
+
+        mock_db.refresh.side_effect = set_order_attrs
+        body = msgpack.packb(
+            {
+                "items": [{"product_id": "PROD-001", "quantity": 2, "price": 50.0}],
+                "total_price": 100.0,
+            }
+        )
+
+        response = await client.post(
+            "/orders/",
+            content=body,
+            headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"},
+        )
+        assert response.status_code == 201
+        data = msgpack.unpackb(response.content)
+        assert data["total_price"] == 100.0
+        assert data["items"][0]["product_id"] == "PROD-001"
+
+    @pytest.mark.asyncio
+    async def test_invalid_msgpack_body(self, client):
+        response = await client.post(
+            "/orders/",
+            content=b"\xc1",
+            headers={"Content-Type": "application/msgpack"},
+        )
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_msgpack_validation_error(self, client):
+        response = await client.post(
+            "/orders/",
+            content=msgpack.packb({"items": [], "total_price": 100.0}),
+            headers={"Content-Type": "application/msgpack"},
+        )
+        assert response.status_code == 422
@@ -0,0 +1,130 @@
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from app.services.order_events import OrderEventHub, encode_event, order_channel
+
+
+def status_event(order_id: str) -> str:
+    return encode_event("status", {"id": order_id, "status": "PAID"})
+
+
+class TestOrderEventHub:
+    def test_dispatch_fans_out_per_user(self):
+        hub = OrderEventHub(redis=None, buffer_size=10, heartbeat_seconds=15)
+        first = hub.subscribe(1)
+        second = hub.subscribe(1)
+        other = hub.subscribe(2)
+
+        hub.dispatch(order_channel(1), status_event("o1"))
+        for subscription in (first, second):
+            frame = subscription.queue.get_nowait()
+            assert frame.startswith("event: status\ndata: ")
+            assert json.loads(frame.splitlines()[1].removeprefix("data: "))["id"] == "o1"
+        assert other.queue.empty()
+
+    def test_unsubscribe(self):
+        hub = OrderEventHub(redis=None, buffer_size=10, heartbeat_seconds=15)
+        subscription = hub.subscribe(1)
+        assert hub.client_count == 1
+        hub.unsubscribe(subscription)
+        assert hub.client_count == 0
+        hub.dispatch(order_channel(1), status_event("o1"))
+
+    def test_ignores_foreign_channels(self):
+        hub = OrderEventHub(redis=None, buffer_size=10, heartbeat_seconds=15)
+        hub.subscribe(1)
+        hub.dispatch("order_events:abc", status_event("o1"))
+
+    @pytest.mark.asyncio
+    async def test_malformed_event_is_skipped(self, caplog):
+        messages = [
+            {"type": "psubscribe", "channel": "order_events:*", "data": 1},
+            {"type": "pmessage", "channel": order_channel(1), "data": "not json"},
+            {"type": "pmessage", "channel": order_channel(1), "data": '{"event": "status"}'},
+            {"type": "pmessage", "channel": order_channel(1), "data": "[]"},
+            {"type": "pmessage", "channel": order_channel(1), "data": status_event("o1")},
+        ]
+
+        class PubSub:
+            async def psubscribe(self, pattern):
+                pass
+
+            async def listen(self):
+                for message in messages:
+                    yield message
+
+            async def aclose(self):
+                pass
+
+        redis = MagicMock()
+        redis.pubsub.return_value = PubSub()
+        hub = OrderEventHub(redis=redis, buffer_size=10, heartbeat_seconds=15)
+        subscription = hub.subscribe(1)
+
+        await hub.listen()
+
+        assert subscription.queue.qsize() == 1
+        assert '"id": "o1"' in subscription.queue.get_nowait()
+        assert caplog.text.count("Ignoring malformed order event") == 3
+
+    @pytest.mark.asyncio
+    async def test_stream_heartbeat_and_cleanup(self):
+        hub = OrderEventHub(redis=None, buffer_size=10, heartbeat_seconds=0.01)
+        stream = hub.stream(1)
+
+        assert (await anext(stream)).startswith("retry:")
+        assert await anext(stream) == ": heartbeat\n\n"
+        hub.dispatch(order_channel(1), status_event("o1"))
+        assert (await anext(stream)).startswith("event: status")
+        await stream.aclose()
+        assert hub.client_count == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_client_overflow_ends_stream(self):
+        hub = OrderEventHub(redis=None, buffer_size=2, heartbeat_seconds=15)
+        stream = hub.stream(1)
+        await anext(stream)
+        for order_id in ("o1", "o2", "o3"):
+            hub.dispatch(order_channel(1), status_event(order_id))
+
+        frames = [frame async for frame in stream]
+        assert len(frames) == 3
+        assert frames[-1].startswith("event: overflow")
+        assert hub.client_count == 0
+
+    @pytest.mark.asyncio
+    async def test_run_reconnects(self, monkeypatch):
+        hub = OrderEventHub(redis=None, buffer_size=2, heartbeat_seconds=15)
+        attempts = 0
+
+        async def listen():
+            nonlocal attempts
+            attempts += 1
+            if attempts < 3:
+                raise ConnectionError("redis down")
+            await asyncio.sleep(3600)
+
+        monkeypatch.setattr(hub, "listen", listen)
+        monkeypatch.setattr("app.services.order_events.RECONNECT_DELAY_SECONDS", 0)
+        task = asyncio.create_task(hub.run())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert attempts == 3
+
+    @pytest.mark.asyncio
+    async def test_close_ends_open_streams(self):
+        hub = OrderEventHub(redis=None, buffer_size=1, heartbeat_seconds=15)
+        stream = hub.stream(1)
+        await anext(stream)
+        hub.dispatch(order_channel(1), status_event("o1"))
+
+        hub.close()
+
+        assert [frame async for frame in stream] == []
+        assert hub.client_count == 0
+        late = hub.stream(2)
+        assert [frame async for frame in late] == ["retry: 3000\n\n"]
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -7,8 +8,10 @@ from app.models.order import OrderStatus
 
 class TestCreateOrder:
     @pytest.mark.asyncio
-    @patch("app.api.routes.orders.get_kafka_producer")
-    async def test_create_order_success(self, mock_get_producer, client, mock_db, mock_redis):
+    @patch("app.messaging.producer.get_kafka_producer")
+    async def test_create_order_success(
+        self, mock_get_producer, client, mock_db, mock_redis, session_budget
+    ):
         mock_producer = AsyncMock()
         mock_get_producer.return_value = mock_producer
 
@@ -22,13 +25,14 @@ class TestCreateOrder:
 
         mock_db.refresh.side_effect = set_order_attrs
 
-        response = await client.post(
-            "/orders/",
-            json={
-                "items": [{"product_id": "PROD-001", "quantity": 2, "price": 50.0}],
-                "total_price": 100.0,
-            },
-        )
+        with session_budget(2):
+            response = await client.post(
+                "/orders/",
+                json={
+                    "items": [{"product_id": "PROD-001", "quantity": 2, "price": 50.0}],
+                    "total_price": 100.0,
+                },
+            )
         assert response.status_code == 201
         data = response.json()
         assert data["id"] == "a1b2c3d4-e5f6-7890-abcd-ef1234567890"
@@ -37,6 +41,10 @@ class TestCreateOrder:
         assert data["status"] == "PENDING"
         mock_producer.send_and_wait.assert_awaited_once()
         mock_redis.setex.assert_awaited_once()
+        event = json.loads(mock_producer.send_and_wait.await_args.args[1])
+        assert event["order_id"] == data["id"]
+        assert event["total_price"] == 100.0
+        assert "created_at" in event
 
     @pytest.mark.asyncio
     async def test_create_order_invalid_items(self, client):
@@ -60,17 +68,29 @@ class TestCreateOrder:
 
 class TestGetOrder:
     @pytest.mark.asyncio
-    async def test_get_order_success(self, client, mock_db, test_order):
+    async def test_get_order_success(self, client, mock_db, test_order, session_budget):
         mock_result = MagicMock()
         mock_result.scalar_one_or_none.return_value = test_order
         mock_db.execute.return_value = mock_result
 
-        response = await client.get(f"/orders/{test_order.id}/")
+        with session_budget(1):
+            response = await client.get(f"/orders/{test_order.id}/")
         assert response.status_code == 200
         data = response.json()
         assert data["id"] == test_order.id
         assert data["user_id"] == 1
 
+    @pytest.mark.asyncio
+    async def test_get_order_with_legacy_items(self, client, mock_db, test_order):
+        test_order.items = [{"sku": "PROD-001", "qty": 2}]
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none.return_value = test_order
+        mock_db.execute.return_value = mock_result
+
+        response = await client.get(f"/orders/{test_order.id}/")
+        assert response.status_code == 200
+        assert response.json()["items"] == [{"sku": "PROD-001", "qty": 2}]
+
     @pytest.mark.asyncio
     async def test_get_order_not_found(self, client, mock_db):
         mock_result = MagicMock()
@@ -99,8 +119,6 @@ class TestGetOrder:
 
     @pytest.mark.asyncio
     async def test_get_order_from_cache(self, client, mock_redis, test_order):
-        import json
-
         cached_data = {
             "id": test_order.id,
             "user_id": 1,
@@ -119,7 +137,9 @@ class TestGetOrder:
 
 class TestUpdateOrder:
     @pytest.mark.asyncio
-    async def test_update_order_status(self, client, mock_db, test_order, mock_redis):
+    async def test_update_order_status(
+        self, client, mock_db, test_order, mock_redis, session_budget
+    ):
         mock_result = MagicMock()
         mock_result.scalar_one_or_none.return_value = test_order
         mock_db.execute.return_value = mock_result
@@ -129,11 +149,15 @@ class TestUpdateOrder:
 
         mock_db.refresh.side_effect = apply_status_change
 
-        response = await client.patch(
-            f"/orders/{test_order.id}/",
-            json={"status": "PAID"},
-        )
+        with session_budget(3):
+            response = await client.patch(
+                f"/orders/{test_order.id}/",
+                json={"status": "PAID"},
+            )
         assert response.status_code == 200
+        channel, message = mock_redis.publish.await_args.args
+        assert channel == "order_events:1"
+        assert json.loads(message)["data"]["status"] == "PAID"
 
     @pytest.mark.asyncio
     async def test_update_order_not_found(self, client, mock_db):
@@ -171,14 +195,15 @@ class TestUpdateOrder:
 
 class TestGetUserOrders:
     @pytest.mark.asyncio
-    async def test_get_user_orders_success(self, client, mock_db, test_order):
+    async def test_get_user_orders_success(self, client, mock_db, test_order, session_budget):
         mock_scalars = MagicMock()
         mock_scalars.all.return_value = [test_order]
         mock_result = MagicMock()
         mock_result.scalars.return_value = mock_scalars
         mock_db.execute.return_value = mock_result
 
-        response = await client.get("/orders/user/1/")
+        with session_budget(1):
+            response = await client.get("/orders/user/1/")
         assert response.status_code == 200
         data = response.json()
         assert len(data) == 1
@@ -201,3 +226,42 @@ class TestGetUserOrders:
         response = await client.get("/orders/user/999/")
         assert response.status_code == 403
         assert response.json()["detail"] == "Not allowed"
+
+
+class TestProductOrders:
+    @pytest.mark.asyncio
+    async def test_get_product_orders(self, client, mock_db, test_order):
+        mock_scalars = MagicMock()
+        mock_scalars.all.return_value = [test_order]
+        mock_result = MagicMock()
+        mock_result.scalars.return_value = mock_scalars
+        mock_db.execute.return_value = mock_result
+
+        response = await client.get("/orders/product/PROD-001/")
+        assert response.status_code == 200
+        assert response.json()[0]["id"] == test_order.id
+        compiled = str(mock_db.execute.await_args.args[0])
+        assert "@>" in compiled
+        assert "orders.user_id" in compiled
+
+    @pytest.mark.asyncio
+    async def test_admin_product_orders_forbidden(self, client):
+        response = await client.get("/orders/admin/product/PROD-001/")
+        assert response.status_code == 403
+        assert response.json()["detail"] == "Admin privileges required"
+
+    @pytest.mark.asyncio
+    async def test_admin_product_orders(self, client, mock_db, test_user, test_order):
+        test_user.is_admin = True
+        test_order.user_id = 999
+        mock_scalars = MagicMock()
+        mock_scalars.all.return_value = [test_order]
+        mock_result = MagicMock()
+        mock_result.scalars.return_value = mock_scalars
+        mock_db.execute.return_value = mock_result
+
+        response = await client.get("/orders/admin/product/PROD-001/")
+        assert response.status_code == 200
+        assert response.json()[0]["user_id"] == 999
+        compiled = str(mock_db.execute.await_args.args[0])
+        assert "orders.user_id" not in compiled.split("WHERE", 1)[1]
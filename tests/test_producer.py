@@ -0,0 +1,57 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.messaging import producer as producer_module
+from app.messaging.producer import (
+    close_kafka_producer,
+    connect_kafka_producer,
+    get_kafka_producer,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_producer():
+    yield
+    producer_module.kafka_producer = None
+
+
+class TestConnectKafkaProducer:
+    @pytest.mark.asyncio
+    async def test_retries_with_backoff(self):
+        attempts = [MagicMock(), MagicMock(), MagicMock()]
+        attempts[0].start = AsyncMock(side_effect=ConnectionError("no broker"))
+        attempts[1].start = AsyncMock(side_effect=ConnectionError("no broker"))
+        for attempt in attempts:
+            attempt.stop = AsyncMock()
+        attempts[2].start = AsyncMock()
+        sleep = AsyncMock()
+
+        with (
+            patch("app.messaging.producer.AIOKafkaProducer", side_effect=attempts),
+            patch("app.messaging.producer.asyncio.sleep", sleep),
+        ):
+            await connect_kafka_producer("kafka:9092", initial_backoff=1, max_backoff=1.5)
+
+        assert get_kafka_producer() is attempts[2]
+        attempts[0].stop.assert_awaited_once()
+        delays = [call.args[0] for call in sleep.await_args_list]
+        assert 0.5 <= delays[0] <= 1
+        assert 0.75 <= delays[1] <= 1.5
+
+    @pytest.mark.asyncio
+    async def test_not_connected(self):
+        with pytest.raises(RuntimeError):
+            get_kafka_producer()
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_before_stop(self):
+        producer = MagicMock()
+        producer.flush = AsyncMock(side_effect=TimeoutError)
+        producer.stop = AsyncMock()
+        producer_module.kafka_producer = producer
+
+        await close_kafka_producer(flush_timeout=1)
+
+        producer.flush.assert_awaited_once()
+        producer.stop.assert_awaited_once()
+        assert producer_module.kafka_producer is None
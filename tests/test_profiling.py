@@ -0,0 +1,83 @@
+import asyncio
+import os
+
+import pytest
+from app.core.profiling import ProfileStore, ProfilingMiddleware
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+
+def profiled_app(store: ProfileStore, sample_rate: float = 0.0, token: str = "") -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/slow/")
+    async def slow() -> dict:
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    app.add_middleware(
+        ProfilingMiddleware, store=store, sample_rate=sample_rate, token=token, interval=0.001
+    )
+    return app
+
+
+async def get(app: FastAPI, headers: dict[str, str] | None = None):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        return await ac.get("/slow/", headers=headers)
+
+
+class TestProfilingMiddleware:
+    @pytest.mark.asyncio
+    async def test_sampled_request_is_stored(self, tmp_path):
+        store = ProfileStore(str(tmp_path), max_profiles=10)
+
+        response = await get(profiled_app(store, sample_rate=1.0))
+
+        assert response.json() == {"ok": True}
+        profile_id = response.headers["x-profile-id"]
+        assert "slow" in store.path(profile_id, ".txt").read_text()
+        assert store.path(profile_id, ".html") is not None
+
+    @pytest.mark.asyncio
+    async def test_debug_header_requires_token(self, tmp_path):
+        store = ProfileStore(str(tmp_path), max_profiles=10)
+        app = profiled_app(store, token="secret")
+
+        assert "x-profile-id" in (await get(app, {"X-Profile": "secret"})).headers
+        assert "x-profile-id" not in (await get(app, {"X-Profile": "guess"})).headers
+        assert "x-profile-id" not in (await get(app)).headers
+
+    @pytest.mark.asyncio
+    async def test_off_by_default(self, tmp_path):
+        store = ProfileStore(str(tmp_path / "profiles"), max_profiles=10)
+
+        response = await get(profiled_app(store, token=""), {"X-Profile": ""})
+
+        assert "x-profile-id" not in response.headers
+        assert not (tmp_path / "profiles").exists()
+
+
+class TestProfileStore:
+    def test_prunes_oldest(self, tmp_path):
+        store = ProfileStore(str(tmp_path), max_profiles=2)
+        ids = [f"{index:032x}" for index in range(3)]
+        for index, profile_id in enumerate(ids):
+            store.save(profile_id, "text", "<html>")
+            os.utime(tmp_path / f"{profile_id}.txt", (index, index))
+        store.prune()
+
+        assert store.path(ids[0], ".txt") is None
+        assert store.path(ids[0], ".html") is None
+        assert store.path(ids[2], ".txt") is not None
+
+    def test_rejects_paths_outside_store(self, tmp_path):
+        store = ProfileStore(str(tmp_path / "profiles"), max_profiles=2)
+        (tmp_path / "secret.txt").write_text("x")
+        assert store.path("../secret", ".txt") is None
+
+
+class TestProfileRoute:
+    @pytest.mark.asyncio
+    async def test_requires_admin(self, client):
+        response = await client.get(f"/debug/profiles/{'0' * 32}/")
+        assert response.status_code == 403
@@ -0,0 +1,94 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+from app.db.querylog import (
+    QueryBudgetExceeded,
+    QueryCountMiddleware,
+    log_queries,
+    query_budget,
+    redact,
+    track_queries,
+)
+from app.models.order import Order
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.exc import OperationalError
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    log_queries(SimpleNamespace(sync_engine=engine), slow_threshold=0.0)
+    return engine
+
+
+class TestQueryLog:
+    def test_slow_queries_are_logged_redacted(self, engine, caplog):
+        with caplog.at_level(logging.WARNING, logger="app.db.querylog"), engine.connect() as conn:
+            conn.execute(text("SELECT :email, :age"), {"email": "secret@example.com", "age": 42})
+
+        (record,) = caplog.records
+        assert "SELECT ?, ?" in record.getMessage()
+        assert "parameters=['str', 'int']" in record.getMessage()
+        assert "secret@example.com" not in record.getMessage()
+
+    def test_nested_logs_count(self, engine):
+        with track_queries() as outer, engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            with track_queries() as inner:
+                conn.execute(text("SELECT 2"))
+                with pytest.raises(OperationalError):
+                    conn.execute(text("SELECT missing FROM nowhere"))
+
+        assert inner.count == 2
+        assert outer.count == 3
+
+    def test_redact(self):
+        assert redact(("a", 1)) == ["str", "int"]
+        assert redact({"email": "a"}) == {"email": "str"}
+        assert redact([{"a": 1}, {"a": 2}]) == "<2 parameter sets>"
+
+
+class TestQueryBudget:
+    def test_within_budget(self, engine):
+        with query_budget(1) as log, engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert log.count == 1
+
+    def test_over_budget_lists_statements(self, engine):
+        with pytest.raises(QueryBudgetExceeded, match="2 queries issued, budget is 1"):
+            with query_budget(1), engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+    @pytest.mark.asyncio
+    async def test_session_budget(self, session_budget, mock_db):
+        with pytest.raises(QueryBudgetExceeded, match="FROM orders"):
+            with session_budget(1):
+                await mock_db.execute(select(Order).where(Order.user_id == 1))
+                await mock_db.commit()
+
+
+class TestQueryCountMiddleware:
+    @pytest.mark.asyncio
+    async def test_logs_requests_over_budget(self, engine, caplog):
+        app = FastAPI()
+
+        @app.get("/items/{count}/")
+        def items(count: int) -> dict:
+            with engine.connect() as conn:
+                for _ in range(count):
+                    conn.execute(text("SELECT 1"))
+            return {}
+
+        app.add_middleware(QueryCountMiddleware, budget=2)
+        transport = ASGITransport(app=app)
+        with caplog.at_level(logging.WARNING, logger="app.db.querylog"):
+            async with AsyncClient(transport=transport, base_url="http://test") as ac:
+                await ac.get("/items/2/")
+                await ac.get("/items/3/")
+
+        (warning,) = [r.getMessage() for r in caplog.records if "budget" in r.getMessage()]
+        assert warning.startswith("GET /items/{count}/ issued 3 queries (budget 2)")
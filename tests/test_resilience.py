@@ -0,0 +1,181 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.core.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    call_or_skip,
+    kafka_breaker,
+    redis_breaker,
+)
+from app.messaging.producer import drain_event_spool, publish_event
+from app.messaging.spool import EventSpool
+from app.services.cache import get_cached_order
+
+
+async def fail():
+    raise ConnectionError("down")
+
+
+async def succeed():
+    return "ok"
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_opens_after_threshold(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60, call_timeout=1)
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await breaker.call(fail)
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(succeed)
+
+    @pytest.mark.asyncio
+    async def test_half_open_trial(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0, call_timeout=1)
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+        assert breaker.allow()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow()
+        breaker.trial_in_flight = False
+
+        assert await breaker.call(succeed) == "ok"
+        assert breaker.state == CLOSED
+        assert breaker.failures == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=0, call_timeout=1)
+        breaker.state = OPEN
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+        assert breaker.state == OPEN
+
+    @pytest.mark.asyncio
+    async def test_stragglers_leave_trial_alone(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0, call_timeout=1)
+        release = asyncio.Event()
+
+        async def slow(result):
+            await release.wait()
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        # Started while closed, finishing only once the trial is running.
+        stragglers = [
+            asyncio.create_task(breaker.call(lambda: slow("late"))),
+            asyncio.create_task(breaker.call(lambda: slow(ConnectionError("late")))),
+        ]
+        await asyncio.sleep(0)
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+        trial_release = asyncio.Event()
+
+        async def trial():
+            await trial_release.wait()
+            return "ok"
+
+        trial_task = asyncio.create_task(breaker.call(trial))
+        await asyncio.sleep(0)
+        assert breaker.state == HALF_OPEN
+
+        release.set()
+        await asyncio.gather(*stragglers, return_exceptions=True)
+        assert breaker.state == HALF_OPEN
+        assert breaker.trial_in_flight
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(succeed)
+
+        trial_release.set()
+        assert await trial_task == "ok"
+        assert breaker.state == CLOSED
+
+    @pytest.mark.asyncio
+    async def test_deadline(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60, call_timeout=0.01)
+        with pytest.raises(TimeoutError):
+            await breaker.call(lambda: asyncio.sleep(1))
+        assert breaker.state == OPEN
+
+    @pytest.mark.asyncio
+    async def test_call_or_skip(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60, call_timeout=1)
+        assert await call_or_skip(breaker, fail, default="fallback") == "fallback"
+        assert await call_or_skip(breaker, succeed, default="fallback") == "fallback"
+
+
+class TestCacheFallback:
+    @pytest.mark.asyncio
+    async def test_slow_redis_reads_miss(self, mock_redis):
+        async def hang(key):
+            await asyncio.sleep(1)
+
+        mock_redis.get.side_effect = hang
+        assert await get_cached_order(mock_redis, "order-1") is None
+        assert redis_breaker().failures == 1
+
+    @pytest.mark.asyncio
+    async def test_update_survives_redis_outage(self, client, mock_db, mock_redis, test_order):
+        mock_redis.setex.side_effect = ConnectionError("redis down")
+        mock_redis.eval.side_effect = ConnectionError("redis down")
+        mock_redis.publish.side_effect = ConnectionError("redis down")
+        mock_redis.pipeline = MagicMock(side_effect=ConnectionError("redis down"))
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none.return_value = test_order
+        mock_db.execute.return_value = mock_result
+
+        response = await client.patch(f"/orders/{test_order.id}/", json={"status": "PAID"})
+        assert response.status_code == 200
+
+
+class TestEventSpool:
+    @pytest.mark.asyncio
+    async def test_publish_failure_is_spooled_and_replayed(self, event_spool):
+        producer = AsyncMock()
+        producer.send_and_wait.side_effect = ConnectionError("kafka down")
+        with patch("app.messaging.producer.get_kafka_producer", return_value=producer):
+            await publish_event("new_order", b'{"order_id": "1"}')
+            await publish_event("new_order", b'{"order_id": "2"}')
+            assert event_spool.active.exists()
+
+            producer.send_and_wait.side_effect = None
+            kafka_breaker().reset()
+            assert await drain_event_spool() == 2
+
+        producer.send_and_wait.assert_any_await("new_order", b'{"order_id": "2"}')
+        assert not event_spool.pending_files()
+        assert not event_spool.active.exists()
+
+    @pytest.mark.asyncio
+    async def test_partial_drain_keeps_remaining_events(self, tmp_path):
+        spool = EventSpool(str(tmp_path))
+        for index in range(3):
+            await spool.append("new_order", str(index).encode())
+        sent = []
+
+        async def send(topic, payload, headers):
+            if payload == b"1":
+                raise ConnectionError("kafka down")
+            sent.append(payload)
+
+        assert await spool.drain(send) == 1
+        await spool.append("new_order", b"3")
+        sent.clear()
+
+        async def send_all(topic, payload, headers):
+            sent.append(payload)
+
+        assert await spool.drain(send_all) == 3
+        assert sent == [b"1", b"2", b"3"]
+
+    @pytest.mark.asyncio
+    async def test_drain_without_spool(self, tmp_path):
+        assert await EventSpool(str(tmp_path / "missing")).drain(AsyncMock()) == 0
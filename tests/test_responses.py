@@ -0,0 +1,54 @@
+import json
+from datetime import datetime, timezone
+
+import msgpack
+from app.api.negotiation import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+from app.api.responses import order_list_response, order_response
+from app.main import app
+from app.models.order import Order, OrderStatus, new_order_id
+from app.schemas.order import OrderRead
+
+
+def make_order() -> Order:
+    return Order(
+        id=new_order_id(),
+        user_id=1,
+        items=[{"product_id": "PROD-001", "quantity": 2, "price": 50.0}],
+        total_price=100.0,
+        status=OrderStatus.PAID,
+        created_at=datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+    )
+
+
+class TestOrderResponses:
+    def test_list_matches_order_read(self):
+        orders = [make_order(), make_order()]
+        response = order_list_response(orders)
+        expected = [OrderRead.model_validate(order).model_dump(mode="json") for order in orders]
+        assert response.media_type == "application/json"
+        assert json.loads(response.render_as(JSON_MEDIA_TYPE)) == expected
+
+    def test_msgpack_matches_json(self):
+        response = order_list_response([make_order()])
+        packed = msgpack.unpackb(response.render_as(MSGPACK_MEDIA_TYPE))
+        assert packed == json.loads(response.render_as(JSON_MEDIA_TYPE))
+
+    def test_empty_list(self):
+        assert order_list_response([]).render_as(JSON_MEDIA_TYPE) == b"[]"
+
+    def test_single_order(self):
+        order_read = OrderRead.model_validate(make_order())
+        response = order_response(order_read, 201)
+        assert response.status_code == 201
+        assert response.render_as(JSON_MEDIA_TYPE) == order_read.model_dump_json().encode()
+
+    def test_openapi_keeps_order_read_schema(self):
+        paths = app.openapi()["paths"]
+        single = paths["/orders/{order_id}/"]["get"]["responses"]["200"]
+        listed = paths["/orders/user/{user_id}/"]["get"]["responses"]["200"]
+        assert single["content"]["application/json"]["schema"] == {
+            "$ref": "#/components/schemas/OrderRead"
+        }
+        assert listed["content"]["application/json"]["schema"]["items"] == {
+            "$ref": "#/components/schemas/OrderRead"
+        }
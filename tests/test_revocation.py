@@ -0,0 +1,135 @@
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from app.core.config import get_settings
+from app.core.revocation import BloomFilter, token_key, user_key
+from app.core.security import create_access_token
+from jose import jwt
+
+
+def mock_pipeline(redis, results=None) -> MagicMock:
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=results or [])
+    redis.pipeline = MagicMock()
+    redis.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+    redis.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+    return pipe
+
+
+def claims_of(token: str) -> dict:
+    settings = get_settings()
+    return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"item-{i}")
+        assert all(f"item-{i}" in bloom for i in range(1000))
+
+    def test_false_positive_rate_at_capacity(self):
+        bloom = BloomFilter(5000, 0.01)
+        for i in range(5000):
+            bloom.add(f"revoked-{i}")
+        false_positives = sum(f"other-{i}" in bloom for i in range(20000))
+        assert false_positives / 20000 < 0.02
+        assert bloom.false_positive_rate == pytest.approx(0.01, rel=0.2)
+
+
+class TestTokenRevocations:
+    @pytest.mark.asyncio
+    async def test_clear_token_skips_redis(self, mock_redis, token_revocations):
+        claims = claims_of(create_access_token("1"))
+        assert not await token_revocations.is_revoked(claims)
+        mock_redis.mget.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_revoked_token_confirmed(self, mock_redis, token_revocations):
+        claims = claims_of(create_access_token("1"))
+        pipe = mock_pipeline(mock_redis)
+        await token_revocations.revoke_token(claims["jti"], claims["exp"])
+        pipe.set.assert_called_once_with(token_key(claims["jti"]), "1", exat=claims["exp"])
+
+        mock_redis.mget = AsyncMock(return_value=["1"])
+        assert await token_revocations.is_revoked(claims)
+        mock_redis.mget.assert_awaited_once_with([token_key(claims["jti"])])
+
+    @pytest.mark.asyncio
+    async def test_false_positive_is_accepted(self, mock_redis, token_revocations):
+        claims = claims_of(create_access_token("1"))
+        token_revocations.filter.add(token_key(claims["jti"]))
+        mock_redis.mget = AsyncMock(return_value=[None])
+        assert not await token_revocations.is_revoked(claims)
+
+    @pytest.mark.asyncio
+    async def test_user_revocation_covers_older_tokens(self, mock_redis, token_revocations):
+        claims = claims_of(create_access_token("7"))
+        token_revocations.filter.add(user_key(7))
+        mock_redis.mget = AsyncMock(return_value=[str(claims["iat"])])
+        assert await token_revocations.is_revoked(claims)
+        mock_redis.mget = AsyncMock(return_value=[str(claims["iat"] - 1)])
+        assert not await token_revocations.is_revoked(claims)
+
+    @pytest.mark.asyncio
+    async def test_fails_closed_when_redis_is_down(self, mock_redis, token_revocations):
+        claims = claims_of(create_access_token("1"))
+        token_revocations.filter.add(token_key(claims["jti"]))
+        mock_redis.mget = AsyncMock(side_effect=ConnectionError)
+        assert await token_revocations.is_revoked(claims)
+
+    @pytest.mark.asyncio
+    async def test_sync_rebuilds_on_new_version(self, mock_redis, token_revocations):
+        pipe = mock_pipeline(mock_redis, [0, [token_key("abc")]])
+        mock_redis.get = AsyncMock(return_value="3")
+        await token_revocations.sync()
+        assert token_key("abc") in token_revocations.filter
+        assert token_revocations.version == "3"
+        assert token_revocations.synced_at == pytest.approx(time.time(), abs=5)
+
+        await token_revocations.sync()
+        pipe.execute.assert_awaited_once()
+
+
+class TestLogout:
+    @pytest.mark.asyncio
+    async def test_logout_revokes_token(self, unauth_client, mock_db, mock_redis, test_user):
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none.return_value = test_user
+        mock_db.execute.return_value = mock_result
+        mock_pipeline(mock_redis)
+        mock_redis.mget = AsyncMock(
+            side_effect=lambda keys: [
+                "1" if key.startswith("revoked_token:") else None for key in keys
+            ]
+        )
+        headers = {"Authorization": f"Bearer {create_access_token('1')}"}
+
+        response = await unauth_client.post("/logout/", headers=headers)
+        assert response.status_code == 204
+        response = await unauth_client.post("/logout/", headers=headers)
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_admin_revokes_user_tokens(
+        self, unauth_client, mock_db, mock_redis, test_user, token_revocations
+    ):
+        test_user.is_admin = True
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none.return_value = test_user
+        mock_db.execute.return_value = mock_result
+        pipe = mock_pipeline(mock_redis)
+        headers = {"Authorization": f"Bearer {create_access_token('1')}"}
+
+        response = await unauth_client.post("/users/5/revoke-tokens/", headers=headers)
+        assert response.status_code == 204
+        key, issued_before = pipe.set.call_args.args
+        assert key == user_key(5)
+        assert int(issued_before) == pytest.approx(time.time(), abs=5)
+        assert user_key(5) in token_revocations.filter
+
+    @pytest.mark.asyncio
+    async def test_revoke_requires_admin(self, client):
+        response = await client.post("/users/5/revoke-tokens/")
+        assert response.status_code == 403
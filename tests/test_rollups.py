@@ -0,0 +1,230 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.db.sharding import parse_shard_map
+from app.messaging.consumer import handle_message
+from app.models.rollup import OrderRollup
+from app.services.rollups import (
+    Granularity,
+    RollupAggregator,
+    RollupRangeArchived,
+    RollupRangeTooRecent,
+    bucket_start,
+    rebuild_range,
+)
+from sqlalchemy.dialects import postgresql
+
+CREATED_AT = datetime(2026, 3, 14, 15, 9, 26, tzinfo=timezone.utc)
+
+
+class TestAggregator:
+    def test_bucket_start(self):
+        assert bucket_start(CREATED_AT, Granularity.MINUTE) == datetime(
+            2026, 3, 14, 15, 9, tzinfo=timezone.utc
+        )
+        assert bucket_start(CREATED_AT, Granularity.HOUR) == datetime(
+            2026, 3, 14, 15, tzinfo=timezone.utc
+        )
+        assert bucket_start(CREATED_AT, Granularity.DAY) == datetime(
+            2026, 3, 14, tzinfo=timezone.utc
+        )
+
+    def test_add_accumulates_every_granularity(self):
+        rollups = RollupAggregator()
+        rollups.add(CREATED_AT, 10.0)
+        rollups.add(CREATED_AT.replace(minute=50), 5.0)
+
+        assert rollups.pending_events == 2
+        hour = (Granularity.HOUR, datetime(2026, 3, 14, 15, tzinfo=timezone.utc))
+        assert rollups.buckets[hour] == [2, 15.0]
+        minutes = [key for key in rollups.buckets if key[0] is Granularity.MINUTE]
+        assert len(minutes) == 2
+
+    @pytest.mark.asyncio
+    async def test_flush_upserts_and_clears(self):
+        rollups = RollupAggregator()
+        rollups.add(CREATED_AT, 10.0)
+        db = AsyncMock()
+
+        assert await rollups.flush(db) == 1
+        assert rollups.pending_events == 0
+        assert not rollups.buckets
+        assert "ON CONFLICT" in str(
+            db.execute.await_args.args[0].compile(dialect=postgresql.dialect())
+        )
+        db.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_deltas(self):
+        rollups = RollupAggregator()
+        rollups.add(CREATED_AT, 10.0)
+        db = AsyncMock()
+        db.execute.side_effect = ConnectionError("pg down")
+
+        with pytest.raises(ConnectionError):
+            await rollups.flush(db)
+        assert rollups.pending_events == 1
+        assert len(rollups.buckets) == 3
+        assert not rollups.is_applied("new_order", 0, 0)
+
+
+class TestRebuild:
+    @pytest.mark.asyncio
+    @patch("app.services.rollups.get_shard_map", return_value=parse_shard_map("512-1023:1", 2))
+    async def test_sums_shards_before_replacing(self, _, mock_db):
+        day = bucket_start(datetime.now(timezone.utc), Granularity.DAY) - timedelta(days=1)
+        shards = []
+        inserted = []
+
+        async def execute(statement, params=None):
+            if params is not None:
+                inserted.extend(params)
+            elif statement.is_select:
+                shards.append(mock_db.info["order_shard"])
+                counts = [(day, 2, 30.0)] if shards[-1] == 0 else [(day, 3, 12.5)]
+                return MagicMock(**{"all.return_value": counts})
+            return MagicMock()
+
+        mock_db.execute.side_effect = execute
+        await rebuild_range(mock_db, day, day + timedelta(days=1))
+        assert shards == [0, 1] * len(Granularity)
+        assert {row["granularity"] for row in inserted} == {g.value for g in Granularity}
+        assert all(row["order_count"] == 5 and row["revenue"] == 42.5 for row in inserted)
+
+    @pytest.mark.asyncio
+    async def test_refuses_archived_range(self, mock_db):
+        start = datetime.now(timezone.utc) - timedelta(days=365)
+        with pytest.raises(RollupRangeArchived):
+            await rebuild_range(mock_db, start, start + timedelta(days=1))
+        mock_db.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_refuses_range_the_consumer_still_updates(self, mock_db):
+        end = datetime.now(timezone.utc) - timedelta(minutes=10)
+        with pytest.raises(RollupRangeTooRecent):
+            await rebuild_range(mock_db, end - timedelta(days=1), end)
+        mock_db.execute.assert_not_awaited()
+
+
+class TestConsumer:
+    @patch("app.messaging.consumer.process_order")
+    def test_handle_message(self, mock_process_order):
+        message = MagicMock(topic="new_order", partition=0, offset=7)
+        message.value = {
+            "order_id": "a1b2c3d4-e5f6-7890-abcd-ef1234567890",
+            "user_id": 1,
+            "total_price": 100.0,
+            "created_at": CREATED_AT.isoformat(),
+        }
+        rollups = RollupAggregator()
+
+        handle_message(message, rollups)
+        mock_process_order.delay.assert_called_once_with(message.value["order_id"], 1)
+        assert rollups.buckets[(Granularity.DAY, datetime(2026, 3, 14, tzinfo=timezone.utc))] == [
+            1,
+            100.0,
+        ]
+
+    @pytest.mark.asyncio
+    @patch("app.messaging.consumer.process_order")
+    async def test_redelivered_message_is_not_counted_twice(self, mock_process_order):
+        message = MagicMock(topic="new_order", partition=2, offset=41)
+        message.value = {
+            "order_id": "a1b2c3d4",
+            "total_price": 10.0,
+            "created_at": CREATED_AT.isoformat(),
+        }
+        rollups = RollupAggregator()
+        handle_message(message, rollups)
+        db = AsyncMock()
+
+        await rollups.flush(db)
+        offsets = db.execute.await_args_list[1].args[0].compile(dialect=postgresql.dialect())
+        assert "rollup_offsets" in str(offsets)
+        assert offsets.params["offset_m0"] == 41
+        db.commit.assert_awaited_once()
+
+        handle_message(message, rollups)
+        assert rollups.pending_events == 0
+        message.offset = 42
+        handle_message(message, rollups)
+        assert rollups.pending_events == 1
+
+    @pytest.mark.asyncio
+    async def test_offsets_loaded_on_start(self):
+        rollups = RollupAggregator()
+        db = AsyncMock()
+        db.execute.return_value = MagicMock(
+            **{"scalars.return_value": [MagicMock(topic="new_order", partition=0, offset=9)]}
+        )
+        await rollups.load_offsets(db)
+        assert rollups.is_applied("new_order", 0, 9)
+        assert not rollups.is_applied("new_order", 0, 10)
+        assert not rollups.is_applied("new_order", 1, 0)
+
+    @patch("app.messaging.consumer.process_order")
+    def test_legacy_message_skips_rollups(self, mock_process_order):
+        message = MagicMock()
+        message.value = {"order_id": "a1b2c3d4-e5f6-7890-abcd-ef1234567890"}
+        rollups = RollupAggregator()
+
+        handle_message(message, rollups)
+        mock_process_order.delay.assert_called_once()
+        assert rollups.pending_events == 0
+
+
+class TestRollupEndpoint:
+    @pytest.mark.asyncio
+    async def test_requires_admin(self, client):
+        response = await client.get("/stats/orders/")
+        assert response.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_series(self, client, mock_db, test_user):
+        test_user.is_admin = True
+        rollup = OrderRollup(
+            granularity="hour",
+            bucket_start=datetime(2026, 3, 14, 15, tzinfo=timezone.utc),
+            order_count=3,
+            revenue=42.5,
+        )
+        mock_scalars = MagicMock()
+        mock_scalars.all.return_value = [rollup]
+        mock_result = MagicMock()
+        mock_result.scalars.return_value = mock_scalars
+        mock_db.execute.return_value = mock_result
+
+        response = await client.get("/stats/orders/", params={"granularity": "hour"})
+        assert response.status_code == 200
+        assert response.json() == [
+            {"bucket_start": "2026-03-14T15:00:00Z", "order_count": 3, "revenue": 42.5}
+        ]
+
+    @pytest.mark.asyncio
+    async def test_naive_range_is_utc(self, client, mock_db, test_user):
+        test_user.is_admin = True
+        mock_db.execute.return_value = MagicMock()
+
+        response = await client.get("/stats/orders/", params={"start": "2026-01-01T00:00:00"})
+        assert response.status_code == 200
+        response = await client.get(
+            "/stats/orders/",
+            params={"start": "2026-01-01T00:00:00", "end": "2026-01-01T12:00:00"},
+        )
+        assert response.status_code == 200
+        statement = mock_db.execute.await_args.args[0].compile()
+        assert datetime(2026, 1, 1, tzinfo=timezone.utc) in statement.params.values()
+
+    @pytest.mark.asyncio
+    async def test_range_too_large(self, client, test_user):
+        test_user.is_admin = True
+        response = await client.get(
+            "/stats/orders/",
+            params={
+                "granularity": "minute",
+                "start": "2025-01-01T00:00:00Z",
+                "end": "2026-01-01T00:00:00Z",
+            },
+        )
+        assert response.status_code == 400
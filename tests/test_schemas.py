@@ -1,6 +1,6 @@
 import pytest
 from app.models.order import OrderStatus
-from app.schemas.order import OrderCreate, OrderItem, OrderUpdate
+from app.schemas.order import OrderCreate, OrderItem, OrderRead, OrderUpdate, StoredOrderRead
 from app.schemas.token import Token
 from app.schemas.user import UserCreate
 from pydantic import ValidationError
@@ -83,6 +83,22 @@ class TestOrderUpdate:
             OrderUpdate(status="INVALID")
 
 
+class TestStoredOrderRead:
+    def test_matches_order_read(self, test_order):
+        stored = StoredOrderRead.model_validate(test_order)
+        assert stored.items == [{"product_id": "PROD-001", "quantity": 2, "price": 50.0}]
+        assert stored.model_dump_json() == OrderRead.model_validate(test_order).model_dump_json()
+
+    def test_round_trips_cached_json(self, test_order):
+        cached = OrderRead.model_validate(test_order).model_dump_json()
+        assert StoredOrderRead.model_validate_json(cached).model_dump_json() == cached
+
+    def test_keeps_items_stored_under_older_rules(self, test_order):
+        test_order.items = [{"product_id": "PROD-001", "quantity": 1, "price": 0}]
+        stored = StoredOrderRead.model_validate(test_order)
+        assert stored.model_dump_json() == OrderRead.model_validate(test_order).model_dump_json()
+
+
 class TestUserCreate:
     def test_valid(self):
         user = UserCreate(email="user@example.com", password="secure123")
@@ -0,0 +1,102 @@
+import socket
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import uvicorn
+from app.server import GracefulServer, Supervisor, bind_socket
+
+
+class FakeProcess:
+    def __init__(self, alive: bool = True, drains: bool = True) -> None:
+        self.pid = id(self)
+        self.exitcode = None if alive else 1
+        self.alive = alive
+        self.drains = drains
+        self.killed = False
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def terminate(self) -> None:
+        if self.drains:
+            self.alive = False
+
+    def join(self, timeout: float | None = None) -> None:
+        pass
+
+    def kill(self) -> None:
+        self.killed = True
+        self.alive = False
+
+
+class TestBindSocket:
+    def test_reuse_port_allows_a_listener_per_worker(self):
+        first = bind_socket("127.0.0.1", 0, reuse_port=True)
+        port = first.getsockname()[1]
+        second = bind_socket("127.0.0.1", port, reuse_port=True)
+        try:
+            assert second.getsockname()[1] == port
+            assert second.get_inheritable()
+        finally:
+            first.close()
+            second.close()
+
+    def test_shared_socket_is_exclusive(self):
+        first = bind_socket("127.0.0.1", 0, reuse_port=False)
+        try:
+            with pytest.raises(OSError):
+                bind_socket("127.0.0.1", first.getsockname()[1], reuse_port=False)
+        finally:
+            first.close()
+
+
+class TestSupervisor:
+    def test_restarts_dead_workers(self):
+        replacement = FakeProcess()
+        supervisor = Supervisor(lambda: replacement, workers=2)
+        healthy = FakeProcess()
+        supervisor.processes = [healthy, FakeProcess(alive=False)]
+
+        supervisor.restart_dead()
+
+        assert supervisor.processes == [healthy, replacement]
+
+    def test_stop_terminates_then_kills_stragglers(self):
+        supervisor = Supervisor(FakeProcess, workers=2)
+        drained, stuck = FakeProcess(), FakeProcess(drains=False)
+        supervisor.processes = [drained, stuck]
+
+        supervisor.stop(timeout=0)
+
+        assert not drained.alive and not drained.killed
+        assert stuck.killed
+
+    def test_run_stops_workers_on_signal(self):
+        started = []
+
+        def start_worker():
+            process = FakeProcess()
+            started.append(process)
+            supervisor.handle_exit(15, None)
+            return process
+
+        supervisor = Supervisor(start_worker, workers=3)
+        with patch("app.server.signal.signal"), patch("app.server.time.sleep"):
+            supervisor.run(graceful_timeout=0)
+
+        assert len(started) == 3
+        assert not any(process.alive for process in started)
+
+
+class TestGracefulServer:
+    @pytest.mark.asyncio
+    async def test_shutdown_closes_event_streams_first(self):
+        hub = MagicMock()
+        app = SimpleNamespace(state=SimpleNamespace(order_events=hub))
+        server = GracefulServer(uvicorn.Config(app))
+        with patch.object(uvicorn.Server, "shutdown", new_callable=AsyncMock) as shutdown:
+            await server.shutdown([socket.socket()])
+
+        hub.close.assert_called_once()
+        shutdown.assert_awaited_once()
@@ -0,0 +1,209 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import UUID, uuid4
+
+import pytest
+from app.db.session import RoutingSession, get_engine, order_shard
+from app.db.sharding import ShardMover, parse_shard_map
+from app.models.archive import ArchivedOrder
+from app.models.order import Order, OrderStatus, new_order_id, order_id_bucket, order_id_timestamp
+from app.models.user import User
+from app.services.orders import (
+    get_order,
+    get_orders_by_product,
+    get_user_orders,
+    update_order_status,
+)
+from app.services.summary import load_totals
+from sqlalchemy import inspect
+
+TWO_SHARDS = parse_shard_map("512-1023:1", 2)
+REBALANCING = parse_shard_map("512-1023:1", 2)
+REBALANCING.previous = parse_shard_map("", 2)
+
+
+class TestShardMap:
+    def test_default_keeps_everything_on_main(self):
+        shard_map = parse_shard_map("", 1)
+        assert shard_map.shard_for_user(12345) == 0
+        assert shard_map.shards_for_order(new_order_id()) == [0]
+
+    def test_ranges(self):
+        shard_map = parse_shard_map("0-9:1, 10:2", 3)
+        assert shard_map.shard_for_user(1024 + 5) == 1
+        assert shard_map.shard_for_user(10) == 2
+        assert shard_map.shard_for_user(11) == 0
+        assert shard_map.buckets_for(2) == [10]
+        assert shard_map.group_users([1, 10, 11, 3]) == {1: [1, 3], 2: [10], 0: [11]}
+
+    @pytest.mark.parametrize("spec", ["0-1024:1", "5-1:1", "0-9:2", "nonsense", "1-2"])
+    def test_invalid(self, spec):
+        with pytest.raises(ValueError):
+            parse_shard_map(spec, 2)
+
+    def test_user_shards_include_previous_owner_during_rebalance(self):
+        assert REBALANCING.shards_for_user(600) == [0, 1]
+        assert REBALANCING.shards_for_user(5) == [0]
+        assert TWO_SHARDS.shards_for_user(600) == [1]
+
+    def test_order_lookup_starts_at_encoded_shard(self):
+        created_at = datetime(2026, 5, 17, tzinfo=timezone.utc)
+        order_id = new_order_id(created_at, 700)
+        assert UUID(order_id).version == 7
+        assert order_id_timestamp(order_id) == created_at
+        assert order_id_bucket(order_id) == 700
+        assert TWO_SHARDS.shards_for_order(order_id) == [1, 0]
+        assert TWO_SHARDS.shards_for_order(str(uuid4())) == [0, 1]
+
+
+class TestShardMover:
+    @pytest.mark.asyncio
+    async def test_batches_continue_after_last_moved_row(self):
+        created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        source, target = MagicMock(), MagicMock()
+        queries = []
+
+        async def execute(query, *args):
+            queries.append(query)
+            rows = [{"id": "b", "created_at": created_at}] if len(queries) == 1 else []
+            return MagicMock(**{"mappings.return_value": rows})
+
+        source.execute.side_effect = execute
+        target.execute = AsyncMock()
+        mover = ShardMover(source, target)
+        mover.ensure_partitions = AsyncMock()
+        assert await mover.move([600], 10) == 1
+        assert await mover.move([600], 10) == 0
+        assert mover.after == (created_at, "b")
+        assert "(orders.created_at, orders.id) >" not in str(queries[0])
+        assert "(orders.created_at, orders.id) >" in str(queries[2])
+
+
+class TestShardRouting:
+    def test_orders_go_to_shard_engine(self):
+        shard_engine = MagicMock()
+        session = RoutingSession()
+        session.info["order_shard"] = 1
+        with patch("app.db.session.get_shard_engines", return_value=[get_engine(), shard_engine]):
+            assert session.get_bind(inspect(Order)) is shard_engine.sync_engine
+            assert session.get_bind(inspect(ArchivedOrder)) is shard_engine.sync_engine
+            assert session.get_bind(inspect(User)) is get_engine().sync_engine
+
+    def test_order_shard_restores(self):
+        db = MagicMock()
+        db.info = {}
+        with order_shard(db, 1):
+            assert db.info["order_shard"] == 1
+        assert db.info["order_shard"] == 0
+
+
+@patch("app.services.orders.get_shard_map", return_value=TWO_SHARDS)
+class TestShardedOrders:
+    @pytest.mark.asyncio
+    async def test_get_order_asks_other_shards_on_miss(self, _, mock_db, test_order):
+        shards = []
+        missing, found = MagicMock(), MagicMock()
+        missing.scalar_one_or_none.return_value = None
+        found.scalar_one_or_none.return_value = test_order
+
+        async def execute(query):
+            shards.append(mock_db.info["order_shard"])
+            return missing if len(shards) == 1 else found
+
+        mock_db.execute.side_effect = execute
+        order = await get_order(mock_db, new_order_id(bucket=600))
+        assert order is test_order
+        assert shards == [1, 0]
+
+    @pytest.mark.asyncio
+    async def test_update_goes_to_shard_the_order_was_read_from(self, _, mock_db, test_order):
+        test_order.user_id = 1024 + 600
+        missing, found = MagicMock(), MagicMock()
+        missing.scalar_one_or_none.return_value = None
+        found.scalar_one_or_none.return_value = test_order
+        mock_db.execute.side_effect = [missing, found]
+        order = await get_order(mock_db, new_order_id(bucket=600))
+
+        commits = []
+        mock_db.commit.side_effect = lambda: commits.append(mock_db.info["order_shard"])
+        await update_order_status(mock_db, order, OrderStatus.PAID)
+        assert commits == [0]
+
+    @pytest.mark.asyncio
+    async def test_archive_index_is_looked_up_on_every_shard(self, _, mock_db):
+        shards = []
+        missing = MagicMock()
+        missing.scalar_one_or_none.return_value = None
+
+        async def execute(query):
+            shards.append(mock_db.info["order_shard"])
+            return missing
+
+        mock_db.execute.side_effect = execute
+        with patch("app.services.archive.get_shard_map", return_value=TWO_SHARDS):
+            assert await get_order(mock_db, new_order_id(bucket=600)) is None
+        assert shards == [1, 0, 1, 0]
+
+    @pytest.mark.asyncio
+    async def test_user_orders_use_one_shard(self, _, mock_db):
+        shards = []
+
+        async def execute(query):
+            shards.append(mock_db.info["order_shard"])
+            return MagicMock()
+
+        mock_db.execute.side_effect = execute
+        await get_user_orders(mock_db, 1024 + 600)
+        assert shards == [1]
+
+    @pytest.mark.asyncio
+    async def test_product_search_merges_shards(self, _, mock_db):
+        def order(day: int) -> MagicMock:
+            return MagicMock(created_at=datetime(2026, 1, day, tzinfo=timezone.utc))
+
+        results = [[order(1), order(3)], [order(2)]]
+        mock_db.execute = AsyncMock(
+            side_effect=[MagicMock(**{"scalars.return_value.all.return_value": r}) for r in results]
+        )
+        orders = await get_orders_by_product(mock_db, "PROD-001", limit=2)
+        assert [o.created_at.day for o in orders] == [3, 2]
+
+    @pytest.mark.asyncio
+    async def test_user_orders_read_both_owners_during_rebalance(self, get_shard_map, mock_db):
+        get_shard_map.return_value = REBALANCING
+        moved = MagicMock(id="a", created_at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+        later = MagicMock(id="b", created_at=datetime(2026, 1, 2, tzinfo=timezone.utc))
+        shards = []
+
+        async def execute(query):
+            shards.append(mock_db.info["order_shard"])
+            # The moved order is seen on both shards mid-batch.
+            found = [moved, later] if len(shards) == 1 else [moved]
+            return MagicMock(**{"scalars.return_value.all.return_value": found})
+
+        mock_db.execute.side_effect = execute
+        assert await get_user_orders(mock_db, 600) == [moved, later]
+        assert shards == [0, 1]
+
+
+class TestRebalancingTotals:
+    @pytest.mark.asyncio
+    async def test_moving_orders_are_counted_once(self, mock_db):
+        shards = []
+
+        async def execute(query):
+            shards.append(mock_db.info["order_shard"])
+            rows = {
+                # Aggregates for settled users and the archive, per shard.
+                1: [(5, "PAID", 2, 20.0)] if shards[-1] == 0 else [],
+                # Rows of the moving user, previous owner first.
+                3: [("a", 600, "PAID", 10.0), ("b", 600, "PAID", 5.0)],
+                4: [("a", 600, "PAID", 10.0)],
+            }.get(len(shards), [])
+            return MagicMock(**{"all.return_value": rows})
+
+        mock_db.execute.side_effect = execute
+        with patch("app.services.summary.get_shard_map", return_value=REBALANCING):
+            totals = await load_totals(mock_db, [5, 600])
+        assert shards == [0, 1, 0, 1]
+        assert totals == {5: {OrderStatus.PAID: (2, 20.0)}, 600: {OrderStatus.PAID: (2, 15.0)}}
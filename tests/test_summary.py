@@ -0,0 +1,164 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from app.models.order import OrderStatus
+from app.schemas.order import OrderRead
+from app.services.summary import (
+    APPLY_DELTAS,
+    STORE_TOTALS,
+    generation_key,
+    record_or_invalidate,
+    record_order_created,
+    record_status_change,
+    summary_key,
+)
+
+
+def make_order_read(status: OrderStatus = OrderStatus.PENDING) -> OrderRead:
+    return OrderRead(
+        id="a1b2c3d4-e5f6-7890-abcd-ef1234567890",
+        user_id=1,
+        items=[{"product_id": "PROD-001", "quantity": 2, "price": 50.0}],
+        total_price=100.0,
+        status=status,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+class TestCounters:
+    @pytest.mark.asyncio
+    async def test_order_created(self, mock_redis):
+        await record_order_created(mock_redis, make_order_read())
+        mock_redis.eval.assert_awaited_once_with(
+            APPLY_DELTAS, 2, summary_key(1), generation_key(1), 86400, "PENDING", 1, 100.0
+        )
+
+    @pytest.mark.asyncio
+    async def test_status_change(self, mock_redis):
+        await record_status_change(
+            mock_redis, make_order_read(OrderStatus.PAID), OrderStatus.PENDING
+        )
+        mock_redis.eval.assert_awaited_once_with(
+            APPLY_DELTAS,
+            2,
+            summary_key(1),
+            generation_key(1),
+            86400,
+            "PENDING",
+            -1,
+            -100.0,
+            "PAID",
+            1,
+            100.0,
+        )
+
+    @pytest.mark.asyncio
+    async def test_same_status_is_noop(self, mock_redis):
+        await record_status_change(mock_redis, make_order_read(), OrderStatus.PENDING)
+        mock_redis.eval.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failed_delta_drops_summary(self, mock_redis):
+        mock_redis.eval.side_effect = ConnectionError("redis down")
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        mock_redis.pipeline = MagicMock()
+        mock_redis.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+        mock_redis.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        await record_or_invalidate(
+            mock_redis, 1, lambda: record_order_created(mock_redis, make_order_read())
+        )
+        pipe.delete.assert_called_once_with(summary_key(1))
+        pipe.incr.assert_called_once_with(generation_key(1))
+        pipe.expire.assert_called_once_with(generation_key(1), 86400)
+
+    @pytest.mark.asyncio
+    async def test_applied_delta_keeps_summary(self, mock_redis):
+        mock_redis.pipeline = MagicMock()
+
+        await record_or_invalidate(
+            mock_redis, 1, lambda: record_order_created(mock_redis, make_order_read())
+        )
+        mock_redis.eval.assert_awaited_once()
+        mock_redis.pipeline.assert_not_called()
+
+
+class TestSummaryEndpoint:
+    @pytest.mark.asyncio
+    async def test_served_from_counters(self, client, mock_db, mock_redis):
+        mock_redis.hgetall = AsyncMock(
+            return_value={"PENDING:count": "2", "PENDING:total": "150.5", "PAID:count": "1"}
+        )
+
+        response = await client.get("/orders/user/1/summary/")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["statuses"]["PENDING"] == {"count": 2, "total_price": 150.5}
+        assert data["statuses"]["PAID"]["count"] == 1
+        assert data["statuses"]["SHIPPED"] == {"count": 0, "total_price": 0.0}
+        mock_db.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_built_from_db_on_miss(self, client, mock_db, mock_redis):
+        mock_redis.hgetall = AsyncMock(return_value={})
+        mock_redis.mget = AsyncMock(return_value=["7"])
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[1])
+        mock_redis.pipeline = MagicMock()
+        mock_redis.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+        mock_redis.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+        mock_result = MagicMock()
+        mock_result.all.return_value = [
+            (1, "PAID", 2, 80.0),
+            (1, "SHIPPED", 1, 20.0),
+            (1, "SHIPPED", 3, 60.0),
+        ]
+        mock_db.execute.return_value = mock_result
+
+        response = await client.get("/orders/user/1/summary/")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["statuses"]["PAID"] == {"count": 2, "total_price": 80.0}
+        assert data["statuses"]["SHIPPED"] == {"count": 4, "total_price": 80.0}
+        mock_redis.mget.assert_awaited_once_with([generation_key(1)])
+        script, numkeys, key, generation, expected, ttl, *fields = pipe.eval.call_args.args
+        assert (script, numkeys, key, generation) == (
+            STORE_TOTALS,
+            2,
+            summary_key(1),
+            generation_key(1),
+        )
+        assert expected == "7"
+        assert ttl == 86400
+        mapping = dict(zip(fields[::2], fields[1::2], strict=True))
+        assert mapping["SHIPPED:count"] == 4
+        assert mapping["PENDING:count"] == 0
+        pipe.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_build_is_not_stored_when_a_delta_arrived(self, client, mock_db, mock_redis):
+        mock_redis.hgetall = AsyncMock(return_value={})
+        mock_redis.mget = AsyncMock(return_value=[None])
+        pipe = MagicMock()
+        # STORE_TOTALS returns 0 when the generation moved during the build.
+        pipe.execute = AsyncMock(return_value=[0])
+        mock_redis.pipeline = MagicMock()
+        mock_redis.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+        mock_redis.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+        mock_result = MagicMock()
+        mock_result.all.return_value = [(1, "PAID", 1, 10.0)]
+        mock_db.execute.return_value = mock_result
+
+        response = await client.get("/orders/user/1/summary/")
+        assert response.status_code == 200
+        assert response.json()["statuses"]["PAID"] == {"count": 1, "total_price": 10.0}
+        assert pipe.eval.call_args.args[4] == "0"
+        pipe.delete.assert_not_called()
+        pipe.hset.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_forbidden(self, client):
+        response = await client.get("/orders/user/999/summary/")
+        assert response.status_code == 403
@@ -0,0 +1,217 @@
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.core import tracing
+from app.core.tracing import (
+    CONSUMER,
+    FileSpanExporter,
+    SpanContext,
+    Tracer,
+    TracingMiddleware,
+    current_traceparent,
+    parse_traceparent,
+    start_span,
+)
+from app.messaging import producer as producer_module
+from app.messaging.consumer import handle_message
+from app.messaging.producer import publish_event
+from app.services.rollups import RollupAggregator
+from app.tasks import worker
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+TRACEPARENT = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+
+
+@pytest.fixture
+def spans_file(tmp_path, monkeypatch):
+    path = tmp_path / "spans.json"
+    monkeypatch.setattr(tracing, "tracer", Tracer(FileSpanExporter(str(path), "test", 100), 1.0))
+    return path
+
+
+def exported_spans(path) -> list[dict]:
+    tracing.tracer.exporter.flush()
+    lines = path.read_text().splitlines() if path.exists() else []
+    return [
+        span
+        for line in lines
+        for resource in json.loads(line)["resourceSpans"]
+        for scope in resource["scopeSpans"]
+        for span in scope["spans"]
+    ]
+
+
+class TestTraceparent:
+    def test_round_trip(self):
+        context = parse_traceparent(TRACEPARENT)
+        assert context == SpanContext(TRACE_ID, "00f067aa0ba902b7", True)
+        assert context.traceparent == TRACEPARENT
+        assert parse_traceparent(TRACEPARENT.encode()) == context
+
+    @pytest.mark.parametrize(
+        "value",
+        [None, "", "garbage", f"00-{'0' * 32}-00f067aa0ba902b7-01", f"00-{TRACE_ID}-xyz-01"],
+    )
+    def test_invalid(self, value):
+        assert parse_traceparent(value) is None
+
+
+class TestFileSpanExporter:
+    def test_writes_on_background_thread(self, tmp_path, monkeypatch):
+        exporter = FileSpanExporter(str(tmp_path / "spans.json"), "test", 2)
+        writers = []
+        write = exporter.write
+        monkeypatch.setattr(
+            exporter,
+            "write",
+            lambda spans: writers.append(threading.current_thread()) or write(spans),
+        )
+
+        exporter.export({"name": "a"}, flush=False)
+        exporter.export({"name": "b"}, flush=False)
+        exporter.export({"name": "c"}, flush=False)
+        exporter.flush()
+
+        assert writers == [exporter.writer, exporter.writer]
+        lines = (tmp_path / "spans.json").read_text().splitlines()
+        assert [
+            [
+                span["name"]
+                for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+            ]
+            for line in lines
+        ] == [["a", "b"], ["c"]]
+
+    def test_full_queue_drops_batches(self, tmp_path, monkeypatch, caplog):
+        monkeypatch.setattr(tracing, "MAX_QUEUED_BATCHES", 1)
+        exporter = FileSpanExporter(str(tmp_path / "spans.json"), "test", 1)
+        released = threading.Event()
+        monkeypatch.setattr(exporter, "write", lambda spans: released.wait())
+
+        for name in "abc":
+            exporter.export({"name": name}, flush=True)
+        released.set()
+        exporter.flush()
+        assert "Span export queue is full, dropping 1 spans" in caplog.text
+
+
+class TestTracingMiddleware:
+    @pytest.mark.asyncio
+    async def test_continues_incoming_trace(self, spans_file):
+        app = FastAPI()
+
+        @app.get("/items/{item_id}/")
+        async def item(item_id: int) -> dict:
+            with start_span("lookup"):
+                return {"traceparent": current_traceparent()}
+
+        app.add_middleware(TracingMiddleware)
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.get("/items/1/", headers={"traceparent": TRACEPARENT})
+
+        spans = {span["name"]: span for span in exported_spans(spans_file)}
+        server = spans["GET /items/{item_id}/"]
+        assert server["traceId"] == TRACE_ID
+        assert server["parentSpanId"] == "00f067aa0ba902b7"
+        assert {"key": "http.response.status_code", "value": {"intValue": "200"}} in server[
+            "attributes"
+        ]
+        assert spans["lookup"]["parentSpanId"] == server["spanId"]
+        assert parse_traceparent(response.json()["traceparent"]).trace_id == TRACE_ID
+
+    @pytest.mark.asyncio
+    async def test_disabled_is_noop(self):
+        app = FastAPI()
+
+        @app.get("/")
+        async def index() -> dict:
+            return {"traceparent": current_traceparent()}
+
+        app.add_middleware(TracingMiddleware)
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.get("/")
+
+        assert response.json() == {"traceparent": None}
+
+
+class TestKafkaPropagation:
+    @pytest.fixture(autouse=True)
+    def reset_producer(self):
+        yield
+        producer_module.kafka_producer = None
+
+    @pytest.mark.asyncio
+    async def test_publish_injects_header(self, spans_file):
+        producer = MagicMock()
+        producer.send_and_wait = AsyncMock()
+        producer_module.kafka_producer = producer
+
+        with start_span("request") as request:
+            await publish_event("new_order", b"{}")
+
+        headers = dict(producer.send_and_wait.await_args.kwargs["headers"])
+        context = parse_traceparent(headers["traceparent"])
+        assert context.trace_id == request.context.trace_id
+        send = next(span for span in exported_spans(spans_file) if span["name"] == "send new_order")
+        assert send["spanId"] == context.span_id
+        assert send["parentSpanId"] == request.context.span_id
+
+    @pytest.mark.asyncio
+    async def test_spooled_event_keeps_context(self, spans_file, event_spool):
+        producer = MagicMock()
+        producer.send_and_wait = AsyncMock(side_effect=ConnectionError)
+        producer_module.kafka_producer = producer
+
+        with start_span("request") as request:
+            await publish_event("new_order", b"{}")
+
+        replayed = []
+
+        async def send(topic, payload, headers):
+            replayed.append(dict(headers))
+
+        await event_spool.drain(send)
+        assert parse_traceparent(replayed[0]["traceparent"]).trace_id == request.context.trace_id
+
+    @patch("app.messaging.consumer.process_order")
+    def test_consumer_continues_trace(self, mock_process_order, spans_file):
+        message = MagicMock()
+        message.topic = "new_order"
+        message.headers = [("traceparent", TRACEPARENT.encode())]
+        message.value = {"order_id": "a1b2c3d4-e5f6-7890-abcd-ef1234567890"}
+
+        handle_message(message, RollupAggregator())
+
+        (span,) = exported_spans(spans_file)
+        assert span["name"] == "process new_order"
+        assert span["kind"] == CONSUMER
+        assert span["traceId"] == TRACE_ID
+
+
+class TestCeleryPropagation:
+    def test_header_round_trip(self, spans_file):
+        headers: dict = {}
+        with start_span("process new_order") as parent:
+            worker.inject_trace_context(headers=headers)
+
+        task = SimpleNamespace(name="process_order", request=SimpleNamespace(**headers))
+        worker.record_task_start(task_id="t1", task=task)
+        assert parse_traceparent(current_traceparent()).trace_id == parent.context.trace_id
+        worker.record_task_end(task_id="t1", task=task, state="SUCCESS")
+
+        run = next(
+            span for span in exported_spans(spans_file) if span["name"] == "run process_order"
+        )
+        assert run["traceId"] == parent.context.trace_id
+        assert run["parentSpanId"] == parent.context.span_id
+        assert current_traceparent() is None
+
+    def test_no_context_without_tracer(self):
+        headers: dict = {}
+        worker.inject_trace_context(headers=headers)
+        assert headers == {}